@@ -66,6 +66,12 @@ INSTALLED_APPS = [
 # ------------------------------------------------------------
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Answers /static/ requests before anything below runs (SERVE_STATIC_ASSETS).
+    "tickets.assets.StaticAssetMiddleware",
+    # Outermost app middleware so it sees the queries of everything below it.
+    "tickets.middleware.QueryMetricsMiddleware",
+    # Outside the session middleware, so session writes also pin to the primary.
+    "tickets.routing.ReplicaPinMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -108,8 +114,56 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Take the write lock when a transaction starts and wait for it,
+        # instead of failing with "database is locked" under concurrent submissions.
+        "OPTIONS": {
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+        },
+        # A file-backed test database so threaded tests get real locking
+        # instead of shared-cache "table is locked" errors.
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
+    }
+}
+
+# Optional read replica for reporting reads: the dashboard CSV export and
+# admin changelists (tickets.routing). Locally, DJANGO_REPLICA_DB_NAME=
+# replica.sqlite3 plus `manage.py sync_replica` stands in for one.
+REPLICA_DB_NAME = os.getenv("DJANGO_REPLICA_DB_NAME")
+if REPLICA_DB_NAME:
+    DATABASES["replica"] = {
+        "ENGINE": os.getenv("DJANGO_REPLICA_DB_ENGINE", "django.db.backends.sqlite3"),
+        "NAME": REPLICA_DB_NAME,
+        "HOST": os.getenv("DJANGO_REPLICA_DB_HOST", ""),
+        "PORT": os.getenv("DJANGO_REPLICA_DB_PORT", ""),
+        "USER": os.getenv("DJANGO_REPLICA_DB_USER", ""),
+        "PASSWORD": os.getenv("DJANGO_REPLICA_DB_PASSWORD", ""),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICA = "replica" if REPLICA_DB_NAME else None
+DATABASE_ROUTERS = ["tickets.routing.PrimaryReplicaRouter"]
+# After a write, the user's reads stay on the primary this long (replication lag).
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv("DATABASE_REPLICA_PIN_SECONDS", "10"))
+
+
+# ------------------------------------------------------------
+# Cache
+# ------------------------------------------------------------
+# Shared by all worker processes in production (e.g. DJANGO_CACHE_BACKEND=
+# django.core.cache.backends.redis.RedisCache, DJANGO_CACHE_LOCATION=redis://...),
+# so version bumps reach every process. Local memory is per process.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("DJANGO_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("DJANGO_CACHE_LOCATION", ""),
     }
 }
+# Each process keeps its own copy of categories and the staff directory
+# (tickets.reference). Saves bump a version in the cache, which other
+# processes only see through a shared backend; with a per-process one their
+# copies are reloaded at least this often instead.
+_PER_PROCESS_CACHE = CACHES["default"]["BACKEND"].endswith(("LocMemCache", "DummyCache"))
+REFERENCE_CACHE_MAX_AGE = 30 if _PER_PROCESS_CACHE else None
 
 
 # ------------------------------------------------------------
@@ -143,6 +197,20 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 _static_dir = BASE_DIR / "static"
 STATICFILES_DIRS = [_static_dir] if _static_dir.exists() else []
 
+# collectstatic writes content-hashed copies, a manifest ({% static %} needs
+# it when DEBUG is off) and .br/.gz variants of each (tickets.assets).
+# STATIC_ROOT is build output: run collectstatic on every deploy.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "tickets.assets.CompressedManifestStaticFilesStorage"},
+}
+
+# Serve STATIC_ROOT from the app (StaticAssetMiddleware): hashed files are
+# cached as immutable for a year, anything else for STATIC_MAX_AGE seconds.
+# With DEBUG on, runserver serves static files from the source folders instead.
+SERVE_STATIC_ASSETS = env_bool("DJANGO_SERVE_STATIC", not DEBUG)
+STATIC_MAX_AGE = 60
+
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
@@ -167,6 +235,128 @@ DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "DISCO Complaints <no-reply
 # Handy for building absolute links in emails
 SITE_BASE_URL = os.getenv("SITE_BASE_URL", "http://127.0.0.1:8000")
 
+# Outbox delivery (manage.py deliver_outbox)
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "100"))
+EMAIL_OUTBOX_MAX_ATTEMPTS = 8             # then the email is marked DEAD
+EMAIL_OUTBOX_BACKOFF_SECONDS = 30         # doubled after every failed attempt
+EMAIL_OUTBOX_MAX_BACKOFF_SECONDS = 3600
+EMAIL_OUTBOX_LEASE_SECONDS = 300          # claimed rows become due again after this
+
+
+# ------------------------------------------------------------
+# Ticket IDs
+# ------------------------------------------------------------
+# How many sequence numbers each worker process reserves at a time.
+# 1 keeps IDs gap-free; larger blocks cut contention on the counter row
+# during outage spikes at the cost of gaps when a worker restarts.
+TICKET_ID_BLOCK_SIZE = int(os.getenv("TICKET_ID_BLOCK_SIZE", "1"))
+
+# Attempts before giving up when an allocated ticket ID already exists.
+TICKET_ID_MAX_ATTEMPTS = 5
+
+
+# ------------------------------------------------------------
+# Staff portal
+# ------------------------------------------------------------
+STAFF_QUEUE_PAGE_SIZE = 50
+
+# History entries shown on a ticket page before "Load older entries"
+STAFF_TIMELINE_PAGE_SIZE = 20
+
+# Admin changelists for the large tables count rows exactly up to this
+# many, then use the database's estimate; ticket search in the admin goes
+# through the full-text index and shows at most ADMIN_SEARCH_LIMIT matches.
+ADMIN_EXACT_COUNT_LIMIT = 10000
+ADMIN_SEARCH_LIMIT = 1000
+
+# Bulk actions on the staff queue: tickets read, locked and written per batch.
+BULK_ACTION_BATCH_SIZE = 500
+
+# SLA scanner (manage.py scan_sla): targets for tickets without a category;
+# categories set their own in Category.sla_hours / escalation_role.
+SLA_DEFAULT_HOURS = 72
+SLA_DEFAULT_ESCALATION_ROLE = "Supervisor"
+SLA_SCAN_BATCH_SIZE = 500
+
+# Outage incidents (tickets.incidents): complaints in a coalescing category
+# from the same region and feeder join the open incident while reports keep
+# arriving less than this many minutes apart. Resolving the incident
+# resolves its tickets this many per statement.
+INCIDENT_WINDOW_MINUTES = int(os.getenv("INCIDENT_WINDOW_MINUTES", "30"))
+INCIDENT_RESOLVE_BATCH_SIZE = 500
+
+# Leadership dashboard: computed context is cached per filter set until the
+# next ticket write, or at most this long. One worker recomputes at a time;
+# a request with no earlier entry to serve waits about as long as the last
+# compute took, at most DASHBOARD_CACHE_WAIT_SECONDS, then computes itself.
+DASHBOARD_CACHE_SECONDS = 300
+DASHBOARD_CACHE_LOCK_SECONDS = 10
+DASHBOARD_CACHE_WAIT_SECONDS = 2
+
+# Full-text ticket search (/staff/search/)
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGES = 50
+
+# Escalation staff picker (/staff/picker/?q=...)
+STAFF_PICKER_LIMIT = 10
+STAFF_PICKER_MAX_LIMIT = 25
+STAFF_PICKER_CACHE_SECONDS = 30
+
+# How new tickets are spread across staff with the category's first-level role:
+# LeastLoadedStrategy, RoundRobinStrategy or WeightedStrategy (tickets.assignment).
+TICKET_ASSIGNMENT_STRATEGY = os.getenv(
+    "TICKET_ASSIGNMENT_STRATEGY", "tickets.assignment.LeastLoadedStrategy"
+)
+
+
+# ------------------------------------------------------------
+# Archive
+# ------------------------------------------------------------
+# manage.py archive_tickets moves CLOSED tickets older than this (and their
+# history) into the archive tables, this many per transaction.
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+ARCHIVE_BATCH_SIZE = 1000
+
+
+# ------------------------------------------------------------
+# Change feed (/staff/feed/, manage.py tail_feed)
+# ------------------------------------------------------------
+# Bearer tokens for downstream systems; staff sessions work too.
+CHANGE_FEED_TOKENS = env_list("CHANGE_FEED_TOKENS")
+FEED_PAGE_SIZE = 100
+FEED_MAX_PAGE_SIZE = 1000
+# Events younger than this are held back so slower transactions can commit
+# lower ids first; keep it above the longest ticket-writing transaction.
+FEED_SETTLE_SECONDS = float(os.getenv("FEED_SETTLE_SECONDS", "5"))
+# Long polls (?wait=) re-check this often, for at most FEED_MAX_WAIT_SECONDS.
+FEED_POLL_SECONDS = 1.0
+FEED_MAX_WAIT_SECONDS = 25
+
+
+# ------------------------------------------------------------
+# Logging / request metrics
+# ------------------------------------------------------------
+# QueryMetricsMiddleware logs one JSON line per request on "tickets.perf":
+# INFO for every request, WARNING when a request goes over these limits.
+# Set DJANGO_PERF_LOG_LEVEL=INFO to see every request.
+QUERY_METRICS_WARN_QUERIES = 50
+QUERY_METRICS_WARN_DB_MS = 500
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "tickets.perf": {
+            "handlers": ["console"],
+            "level": os.getenv("DJANGO_PERF_LOG_LEVEL", "WARNING"),
+            "propagate": False,
+        },
+    },
+}
+
 
 # ------------------------------------------------------------
 # Security settings for production (when DEBUG=False)
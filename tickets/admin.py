@@ -1,34 +1,232 @@
+from django.conf import settings
 from django.contrib import admin
-from .models import Customer, Category, StaffUser, Ticket, TicketHistory
+from django.db import transaction
+from django.shortcuts import redirect
+from django.urls import reverse
+from django.utils import timezone
+
+from . import assignment, customers, incidents, routing, search, tracking
+from .pagination import EstimatedCountPaginator
+from .models import (
+    ArchivedTicket, ArchivedTicketHistory, Customer, CustomerIdentity, Category, Incident, SlaBreach,
+    StaffUser, Ticket, TicketHistory, EmailOutbox,
+)
+from .ticket_ids import PREFIX
+
+
+class ReportingChangelistMixin:
+    """Serve changelist pages (not their actions) from the read replica, if one is set."""
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'GET':
+            return super().changelist_view(request, extra_context)
+        with routing.reporting():
+            response = super().changelist_view(request, extra_context)
+            # The result list is read while rendering, so render here.
+            if hasattr(response, 'render'):
+                response.render()
+        return response
+
+
+class LargeTableAdminMixin:
+    """
+    Changelists for tables with millions of rows: no exact COUNT(*) per
+    page, no second count of the unfiltered table and no facet counts.
+    Subclasses also join what list_display shows (list_select_related).
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+
+def ticket_id_term(term):
+    """`term` as a ticket ID if it looks like one, for an exact match on the unique index."""
+    term = term.strip().upper()
+    return term if term.startswith(f"{PREFIX}-") else None
+
+
+class CustomerIdentityInline(admin.TabularInline):
+    model = CustomerIdentity
+    extra = 0
+    readonly_fields = ('kind', 'value')
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Customer)
-class CustomerAdmin(admin.ModelAdmin):
+class CustomerAdmin(ReportingChangelistMixin, admin.ModelAdmin):
     list_display = ('name', 'email', 'phone', 'account_number', 'meter_number')
     search_fields = ('name', 'email', 'phone', 'account_number', 'meter_number')
+    inlines = [CustomerIdentityInline]
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            customers.add_keys(obj, customers.customer_keys(obj))
+            search.index_customer(obj)
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('name', 'default_first_level_role')
+    list_display = ('name', 'default_first_level_role', 'sla_hours', 'escalation_role', 'coalesce_incidents')
     search_fields = ('name',)
 
 
 @admin.register(StaffUser)
 class StaffUserAdmin(admin.ModelAdmin):
-    list_display = ('user', 'role', 'department', 'region')
+    list_display = ('user', 'role', 'department', 'region', 'open_tickets', 'assignment_weight')
     search_fields = ('user__username', 'user__first_name', 'user__last_name', 'role')
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(open_tickets=assignment.open_tickets())
+
+    @admin.display(description="Open tickets", ordering='open_tickets')
+    def open_tickets(self, obj):
+        return obj.open_tickets
+
 
 @admin.register(Ticket)
-class TicketAdmin(admin.ModelAdmin):
+class TicketAdmin(LargeTableAdminMixin, ReportingChangelistMixin, admin.ModelAdmin):
     list_display = ('ticket_id', 'customer', 'category', 'status',
                     'current_assigned_to', 'created_at', 'resolved_at')
-    list_filter = ('status', 'category', 'created_at', 'resolved_at')
+    list_select_related = ('customer', 'category', 'current_assigned_to__user')
+    # Served by the created_at and (status, created_at) indexes.
+    list_filter = ('status', 'category')
+    date_hierarchy = 'created_at'
+    ordering = ('-created_at',)
+    # Shown as the search box's scope; see get_search_results.
     search_fields = ('ticket_id', 'customer__name', 'customer__email')
+    raw_id_fields = ('customer', 'current_assigned_to', 'incident')
+
+    def get_search_results(self, request, queryset, search_term):
+        # A ticket ID on the unique index, anything else through the
+        # full-text index (best ADMIN_SEARCH_LIMIT matches), never icontains.
+        if not search_term.strip():
+            return queryset, False
+        ticket_id = ticket_id_term(search_term)
+        if ticket_id:
+            return queryset.filter(ticket_id=ticket_id), False
+        ids = search.get_backend().search_ids(search_term, settings.ADMIN_SEARCH_LIMIT, 0)
+        return queryset.filter(pk__in=ids), False
+
+    def change_view(self, request, object_id, form_url='', extra_context=None):
+        # Old links to a ticket that has since been archived.
+        if object_id.isdigit() and not Ticket.objects.filter(pk=object_id).exists():
+            if ArchivedTicket.objects.filter(pk=object_id).exists():
+                return redirect(reverse('admin:tickets_archivedticket_change', args=[object_id]))
+        return super().change_view(request, object_id, form_url, extra_context)
+
+    # Keep the dashboard rollups in step with edits made through the admin,
+    # and resolve an incident with its lead ticket as the ticket page does.
+    def save_model(self, request, obj, form, change):
+        before = None
+        if change:
+            before = tracking.snapshot(Ticket.objects.get(pk=obj.pk))
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            if before:
+                tracking.tickets_changed([(before, obj)])
+            else:
+                tracking.tickets_created([obj])
+            if obj.status in incidents.FINISHING_STATUSES and (before is None or before.status != obj.status):
+                incident = Incident.objects.filter(lead_ticket=obj, resolved_at__isnull=True).first()
+                if incident:
+                    staff = StaffUser.objects.filter(user=request.user).first()
+                    incidents.resolve(incident, obj.status, staff=staff)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            tracking.tickets_deleted([tracking.snapshot(obj)])
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            tracking.tickets_deleted(tracking.snapshot(t) for t in queryset)
+            super().delete_queryset(request, queryset)
+
+
+class ArchivedTicketHistoryInline(admin.TabularInline):
+    model = ArchivedTicketHistory
+    fields = ('created_at', 'action_type', 'from_staff', 'to_staff', 'comment')
+    readonly_fields = fields
+    ordering = ('id',)
+    extra = 0
+    can_delete = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('from_staff__user', 'to_staff__user')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedTicket)
+class ArchivedTicketAdmin(LargeTableAdminMixin, ReportingChangelistMixin, admin.ModelAdmin):
+    """Read-only: archived tickets only change by being archived."""
+    list_display = ('ticket_id', 'customer', 'category', 'status', 'created_at', 'archived_at')
+    list_select_related = ('customer', 'category')
+    search_fields = ('ticket_id',)
+    inlines = [ArchivedTicketHistoryInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Incident)
+class IncidentAdmin(ReportingChangelistMixin, admin.ModelAdmin):
+    list_display = ('__str__', 'category', 'lead_ticket', 'report_count', 'opened_at',
+                    'last_report_at', 'resolved_at')
+    list_select_related = ('category', 'lead_ticket')
+    list_filter = ('category',)
+    search_fields = ('region', 'feeder', 'lead_ticket__ticket_id')
+    raw_id_fields = ('lead_ticket',)
+    readonly_fields = ('report_count', 'opened_at', 'last_report_at', 'resolved_at')
 
 
 @admin.register(TicketHistory)
-class TicketHistoryAdmin(admin.ModelAdmin):
+class TicketHistoryAdmin(LargeTableAdminMixin, ReportingChangelistMixin, admin.ModelAdmin):
     list_display = ('ticket', 'action_type', 'from_staff', 'to_staff', 'created_at')
-    list_filter = ('action_type', 'created_at')
\ No newline at end of file
+    list_select_related = ('ticket', 'from_staff__user', 'to_staff__user')
+    # Served by the (action_type, id) and created_at indexes.
+    list_filter = ('action_type',)
+    date_hierarchy = 'created_at'
+    search_fields = ('ticket__ticket_id',)
+    raw_id_fields = ('ticket', 'from_staff', 'to_staff')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Entries of one ticket, looked up by its exact ID.
+        if not search_term.strip():
+            return queryset, False
+        ticket_id = ticket_id_term(search_term) or search_term.strip()
+        return queryset.filter(ticket__ticket_id=ticket_id), False
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(ReportingChangelistMixin, admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    raw_id_fields = ('ticket',)
+    actions = ('requeue',)
+
+    @admin.action(description="Requeue selected emails")
+    def requeue(self, request, queryset):
+        updated = queryset.exclude(status='SENT').update(
+            status='PENDING', attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f"{updated} email(s) requeued.")
+
+
+@admin.register(SlaBreach)
+class SlaBreachAdmin(ReportingChangelistMixin, admin.ModelAdmin):
+    list_display = ('ticket', 'category', 'due_at', 'breached_at', 'escalated_from', 'escalated_to')
+    list_select_related = ('ticket', 'category', 'escalated_from__user', 'escalated_to__user')
+    list_filter = ('category',)
+    raw_id_fields = ('ticket', 'escalated_from', 'escalated_to')
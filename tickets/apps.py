@@ -4,3 +4,25 @@ from django.apps import AppConfig
 class TicketsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tickets'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_save
+
+        from . import directory, reference
+        from .middleware import install_query_recorder
+        from .models import Category, StaffUser
+
+        connection_created.connect(install_query_recorder, dispatch_uid='query-metrics')
+
+        User = get_user_model()
+        for signal in (post_save, post_delete):
+            signal.connect(reference.invalidate_categories, sender=Category,
+                           dispatch_uid=f'reference-categories-{signal is post_save}')
+            for model in (StaffUser, User):
+                signal.connect(reference.invalidate_staff, sender=model,
+                               dispatch_uid=f'reference-staff-{model.__name__}-{signal is post_save}')
+        # Deletes cascade to the search tokens; only saves need re-indexing.
+        post_save.connect(directory.staff_saved, sender=StaffUser, dispatch_uid='directory-staff')
+        post_save.connect(directory.user_saved, sender=User, dispatch_uid='directory-user')
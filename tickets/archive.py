@@ -0,0 +1,111 @@
+# tickets/archive.py
+"""
+Hot/cold archival of closed tickets (`manage.py archive_tickets`).
+
+CLOSED tickets created more than ARCHIVE_AFTER_DAYS ago move, with their
+history, from Ticket/TicketHistory to ArchivedTicket/ArchivedTicketHistory,
+keeping their primary keys and ticket IDs. Each batch is one transaction
+that copies and then deletes, so an interrupted run loses nothing and the
+next run carries on with whatever is still in the hot table.
+
+Dashboard rollups keep counting archived tickets (archiving is not a
+delete as far as tracking is concerned) and `rollups.rebuild()` reads both
+tables. Archived tickets leave the search index and the SLA breach list.
+
+A ticket that leads an incident stays until the incident's reports have
+all been archived; the incident is then deleted with it, so no incident
+is ever left without its lead.
+
+Views that look a ticket up by ticket_id go through `find_ticket()`, which
+falls back to the archive.
+"""
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
+from django.utils import timezone
+
+from . import search
+from .models import (
+    ArchivedTicket, ArchivedTicketHistory, EmailOutbox, Incident, SlaBreach, Ticket, TicketHistory,
+)
+
+TICKET_FIELDS = (
+    'id', 'ticket_id', 'customer_id', 'category_id', 'description', 'status',
+    'current_assigned_to_id', 'created_at', 'updated_at', 'resolved_at',
+    'satisfaction_rating', 'satisfaction_comment',
+)
+HISTORY_FIELDS = (
+    'id', 'ticket_id', 'from_staff_id', 'to_staff_id', 'action_type', 'comment', 'created_at',
+)
+
+
+def cutoff(days=None):
+    days = settings.ARCHIVE_AFTER_DAYS if days is None else days
+    return timezone.now() - timedelta(days=days)
+
+
+def archive_batch(before, batch_size=None):
+    """Move up to batch_size CLOSED tickets created before `before`. Returns the number moved."""
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    now = timezone.now()
+    with transaction.atomic():
+        # Oldest first on the (status, created_at) index.
+        tickets = list(
+            Ticket.objects.filter(status='CLOSED', created_at__lt=before)
+            .exclude(led_incident__tickets__isnull=False)
+            .order_by('created_at', 'pk').select_for_update()
+            .values(*TICKET_FIELDS)[:batch_size]
+        )
+        if not tickets:
+            return 0
+        ids = [t['id'] for t in tickets]
+        history = TicketHistory.objects.filter(ticket_id__in=ids).values(*HISTORY_FIELDS)
+
+        ArchivedTicket.objects.bulk_create(
+            [ArchivedTicket(archived_at=now, **t) for t in tickets], ignore_conflicts=True,
+        )
+        ArchivedTicketHistory.objects.bulk_create(
+            [ArchivedTicketHistory(**h) for h in history.iterator()], ignore_conflicts=True,
+        )
+
+        TicketHistory.objects.filter(ticket_id__in=ids).delete()
+        SlaBreach.objects.filter(ticket_id__in=ids).delete()
+        EmailOutbox.objects.filter(ticket_id__in=ids).update(ticket=None)
+        Incident.objects.filter(lead_ticket_id__in=ids).delete()
+        Ticket.objects.filter(pk__in=ids).delete()
+        search.remove_tickets(ids)
+    return len(ids)
+
+
+def archive(days=None, batch_size=None, max_batches=None):
+    """Archive in batches until nothing is left (or max_batches). Yields each batch's count."""
+    before = cutoff(days)
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(before, batch_size)
+        if not moved:
+            return
+        batches += 1
+        yield moved
+
+
+def find_ticket(ticket_id, queryset=None, archived_queryset=None):
+    """The live Ticket, else the ArchivedTicket, with this ticket_id; Http404 if neither."""
+    queryset = Ticket.objects.all() if queryset is None else queryset
+    ticket = queryset.filter(ticket_id=ticket_id).first()
+    if ticket is None:
+        archived = ArchivedTicket.objects.all() if archived_queryset is None else archived_queryset
+        ticket = archived.filter(ticket_id=ticket_id).first()
+    if ticket is None:
+        raise Http404(f"No ticket {ticket_id}")
+    return ticket
+
+
+afind_ticket = sync_to_async(find_ticket)
+
+
+def is_archived(ticket):
+    return isinstance(ticket, ArchivedTicket)
@@ -0,0 +1,204 @@
+# tickets/assets.py
+"""
+Static assets: fingerprinted, precompressed at collectstatic, served by
+the app itself.
+
+`CompressedManifestStaticFilesStorage` is the STATICFILES storage. On top
+of Django's manifest storage (content-hashed copies such as
+`bootstrap.min.3a1b2c3d4e5f.css` and `staticfiles.json`, which `{% static %}`
+resolves through) it writes a `.gz` and, when the `brotli` package is
+installed, a `.br` next to every compressible file it collects, kept only
+when it is meaningfully smaller.
+
+`StaticAssetMiddleware` serves STATIC_ROOT under STATIC_URL when
+SERVE_STATIC_ASSETS is on, so no reverse proxy is needed: the smallest
+variant the client's Accept-Encoding allows (br, then gzip), with
+`Vary: Accept-Encoding`. Hashed names never change content, so they are
+cached for a year as `immutable` and a repeat visit makes no request for
+them at all; any other file gets STATIC_MAX_AGE and an ETag to revalidate
+against.
+"""
+import gzip
+import mimetypes
+import os
+import re
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:  # gzip variants only
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.mjs', '.svg', '.txt', '.json', '.html', '.xml', '.map',
+                '.ttf', '.otf', '.eot')
+# A variant must save at least this share of the original to be worth a file.
+MIN_SAVING = 0.05
+# ManifestStaticFilesStorage puts 12 hex digits of the MD5 before the extension.
+HASHED_RE = re.compile(r'\.[0-9a-f]{12}(\.[^./]+)?$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def compressors():
+    """[(suffix, compress)] for the encodings this install can write, best first."""
+    available = []
+    if brotli is not None:
+        available.append(('.br', lambda data: brotli.compress(data, quality=11)))
+    available.append(('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)))
+    return available
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also writes .br and .gz variants of compressible files."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set(paths)
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if isinstance(hashed_name, str):
+                names.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(names):
+            if name.lower().endswith(COMPRESSIBLE) and self.exists(name):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as original:
+            data = original.read()
+        for suffix, compress in compressors():
+            variant = name + suffix
+            if self.exists(variant):
+                self.delete(variant)
+            compressed = compress(data)
+            if len(compressed) <= len(data) * (1 - MIN_SAVING):
+                self._save(variant, ContentFile(compressed))
+
+
+def accepted_encodings(header):
+    """{coding: q} from an Accept-Encoding header."""
+    accepted = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(header, available):
+    """The best of `available` ('br', 'gzip') the client accepts, or None for identity."""
+    accepted = accepted_encodings(header)
+    best, best_q = None, 0.0
+    for coding in available:
+        q = accepted.get(coding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def is_hashed(name):
+    return bool(HASHED_RE.search(name))
+
+
+def _static_prefix():
+    prefix = urlsplit(settings.STATIC_URL or '').path
+    return prefix if prefix.startswith('/') and prefix != '/' else None
+
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat if os.path.isfile(path) else None
+
+
+def serve(request):
+    """The response for a static asset request, or None if it is not one."""
+    prefix = _static_prefix()
+    if (not settings.SERVE_STATIC_ASSETS or request.method not in ('GET', 'HEAD')
+            or not prefix or not request.path_info.startswith(prefix)):
+        return None
+    name = request.path_info[len(prefix):]
+    try:
+        path = safe_join(settings.STATIC_ROOT, name)
+    except (SuspiciousFileOperation, ValueError):
+        return None
+    original = _stat(path)
+    if original is None:
+        return None
+
+    variants = {}
+    for coding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        stat = _stat(path + suffix)
+        if stat is not None:
+            variants[coding] = stat
+    coding = negotiate(request.headers.get('Accept-Encoding'), list(variants))
+    served, stat = path, original
+    if coding:
+        served, stat = path + ('.br' if coding == 'br' else '.gz'), variants[coding]
+
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    response = get_conditional_response(request, etag=etag, last_modified=int(original.st_mtime))
+    if response is None:
+        if request.method == 'HEAD':
+            response = HttpResponse()
+        else:
+            with open(served, 'rb') as handle:
+                response = HttpResponse(handle.read())
+        response['Content-Length'] = stat.st_size
+    content_type, _ = mimetypes.guess_type(name)
+    response['Content-Type'] = content_type or 'application/octet-stream'
+    if coding:
+        response['Content-Encoding'] = coding
+    if variants:
+        response['Vary'] = 'Accept-Encoding'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(original.st_mtime)
+    response['Cache-Control'] = IMMUTABLE if is_hashed(name) else f'public, max-age={settings.STATIC_MAX_AGE}'
+    return response
+
+
+class StaticAssetMiddleware:
+    """Serve STATIC_ROOT under STATIC_URL (see the module docstring); other requests pass through."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = serve(request)
+        return self.get_response(request) if response is None else response
+
+    async def __acall__(self, request):
+        prefix = _static_prefix()
+        if settings.SERVE_STATIC_ASSETS and prefix and request.path_info.startswith(prefix):
+            response = await sync_to_async(serve)(request)
+            if response is not None:
+                return response
+        return await self.get_response(request)
@@ -0,0 +1,168 @@
+# tickets/assignment.py
+"""
+Automatic assignment of new tickets to staff.
+
+Every strategy picks among staff whose role matches the category's
+`default_first_level_role`, preferring staff in the customer's region when
+it is known. Load is each officer's open tickets summed from their
+StaffWorkload rows (tickets.workload, kept in step by tickets.tracking),
+never from counting tickets, so picking an officer reads a few counter
+rows per eligible officer however many tickets there are.
+
+Call `assign` inside the transaction that creates the ticket: the chosen
+row stays locked until commit, and concurrent submissions skip locked rows
+(on PostgreSQL) instead of piling onto the same officer.
+
+The strategy is configured with settings.TICKET_ASSIGNMENT_STRATEGY.
+"""
+import heapq
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import F, FloatField, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import StaffUser, StaffWorkload, Ticket
+
+
+def open_tickets():
+    """Each staff member's open tickets, from their StaffWorkload rows; for annotate()."""
+    total = (
+        StaffWorkload.objects.filter(staff=OuterRef('pk'), status__in=Ticket.OPEN_STATUSES)
+        .order_by().values('staff').annotate(total=Sum('ticket_count')).values('total')
+    )
+    return Coalesce(Subquery(total), 0)
+
+
+class AssignmentStrategy:
+    """Base class: subclasses define `order` over eligible staff."""
+
+    def order(self, staff):
+        raise NotImplementedError
+
+    def after_pick(self, staff_user):
+        pass
+
+    def after_pick_many(self, staff_users):
+        pass
+
+    def batch_load(self, position, staff_user):
+        """Starting load used to spread a batch; lower is picked first."""
+        return staff_user.open_tickets
+
+    def next_load(self, load, staff_user, eligible_count):
+        """Load after one more ticket from the batch went to `staff_user`."""
+        return load + 1
+
+    def _first(self, staff):
+        ordered = self.order(staff)
+        # Skip officers another transaction is assigning to right now; if all
+        # of them are busy, wait for the best one instead of giving up.
+        return (
+            ordered.select_for_update(skip_locked=True, of=('self',)).first()
+            or ordered.select_for_update(of=('self',)).first()
+        )
+
+    def pick(self, role, region=None):
+        eligible = StaffUser.objects.filter(role=role)
+        staff_user = None
+        if region:
+            staff_user = self._first(eligible.filter(region=region))
+        if staff_user is None:
+            staff_user = self._first(eligible)
+        if staff_user is not None:
+            self.after_pick(staff_user)
+        return staff_user
+
+    def pick_many(self, role, region, count):
+        """
+        Spread `count` new tickets over eligible staff with one query,
+        e.g. for bulk imports where the counters only move after the batch
+        is written. Returns a list of StaffUser (or None) of length `count`.
+        """
+        eligible = StaffUser.objects.filter(role=role)
+        staff = []
+        if region:
+            staff = list(self.order(eligible.filter(region=region)).select_for_update(of=('self',)))
+        if not staff:
+            staff = list(self.order(eligible).select_for_update(of=('self',)))
+        if not staff:
+            return [None] * count
+
+        heap = [(self.batch_load(n, s), n, s) for n, s in enumerate(staff)]
+        heapq.heapify(heap)
+        picks = []
+        for _ in range(count):
+            load, n, staff_user = heapq.heappop(heap)
+            picks.append(staff_user)
+            heapq.heappush(heap, (self.next_load(load, staff_user, len(staff)), n, staff_user))
+        self.after_pick_many({s.pk: s for s in picks}.values())
+        return picks
+
+
+class LeastLoadedStrategy(AssignmentStrategy):
+    """Fewest open tickets first."""
+
+    def order(self, staff):
+        return staff.annotate(open_tickets=open_tickets()).order_by('open_tickets', 'id')
+
+
+class RoundRobinStrategy(AssignmentStrategy):
+    """Whoever was assigned least recently; served by (role, last_assigned_at)."""
+
+    def order(self, staff):
+        return staff.order_by(F('last_assigned_at').asc(nulls_first=True), 'id')
+
+    def after_pick(self, staff_user):
+        # update(), not save(): a timestamp is no reason to fire post_save.
+        staff_user.last_assigned_at = timezone.now()
+        StaffUser.objects.filter(pk=staff_user.pk).update(last_assigned_at=staff_user.last_assigned_at)
+
+    def after_pick_many(self, staff_users):
+        StaffUser.objects.filter(pk__in=[s.pk for s in staff_users]).update(
+            last_assigned_at=timezone.now()
+        )
+
+    def batch_load(self, position, staff_user):
+        return position
+
+    def next_load(self, load, staff_user, eligible_count):
+        return load + eligible_count
+
+
+class WeightedStrategy(AssignmentStrategy):
+    """
+    Open tickets relative to `assignment_weight`, so an officer with weight 2
+    carries twice the queue of one with weight 1. The ratio cannot use an
+    index, but it is computed over one role's staff only.
+    """
+
+    def order(self, staff):
+        return staff.annotate(open_tickets=open_tickets()).annotate(
+            load=Cast('open_tickets', FloatField()) / F('assignment_weight')
+        ).order_by('load', 'id')
+
+    def batch_load(self, position, staff_user):
+        return staff_user.open_tickets / staff_user.assignment_weight
+
+    def next_load(self, load, staff_user, eligible_count):
+        return load + 1 / staff_user.assignment_weight
+
+
+@lru_cache(maxsize=None)
+def _strategy(path):
+    return import_string(path)()
+
+
+def get_strategy():
+    return _strategy(getattr(
+        settings, 'TICKET_ASSIGNMENT_STRATEGY', 'tickets.assignment.LeastLoadedStrategy'
+    ))
+
+
+def assign(category, region=None):
+    """The StaffUser a new ticket in `category` should go to, or None."""
+    return get_strategy().pick(category.default_first_level_role, region)
+
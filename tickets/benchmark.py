@@ -0,0 +1,269 @@
+# tickets/benchmark.py
+"""
+Route benchmark runner (`manage.py bench_routes`).
+
+Drives every named route in tickets.urls either in-process through the
+Django test client or against a running deployment over HTTP, logged in
+as a staff member, and reports latency percentiles, throughput and SQL
+queries per request. Query counts come from the Server-Timing header
+QueryMetricsMiddleware adds, so both modes measure the same thing (for
+streamed responses, such as the CSV export, only the queries made before
+the first byte).
+
+Results are plain dicts (see `summarize()`), written as JSON by the
+command so runs can be compared with `--compare`.
+"""
+import http.cookiejar
+import queue
+import re
+import statistics
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import namedtuple
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from . import assignment
+from .models import StaffUser, Ticket, TicketHistory
+
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+# method, URL name, args and query/form data built from the fixtures;
+# `writes` routes change data (rolled back in-process, opt-in over HTTP).
+Route = namedtuple('Route', 'label method name args data writes')
+
+ROUTES = (
+    Route('home', 'GET', 'home', lambda f: [], lambda f: {}, False),
+    Route('create_complaint', 'GET', 'create_complaint', lambda f: [], lambda f: {}, False),
+    Route('create_complaint:post', 'POST', 'create_complaint', lambda f: [], lambda f: {
+        'name': "Bench Customer", 'email': f"bench-{f['n']}@example.com",
+        'phone': f"0807{f['n']:07d}", 'category': f['category_id'],
+        'description': "Benchmark submission",
+    }, True),
+    Route('post_login_redirect', 'GET', 'post_login_redirect', lambda f: [], lambda f: {}, False),
+    Route('staff_ticket_list', 'GET', 'staff_ticket_list', lambda f: [], lambda f: {}, False),
+    Route('staff_bulk_action:post', 'POST', 'staff_bulk_action', lambda f: [], lambda f: {
+        'action': 'status', 'status': ('IN_PROGRESS', 'RESOLVED')[f['n'] % 2],
+        'tickets': f['queue_pks'], 'comment': "Benchmark bulk update",
+    }, True),
+    Route('staff_search', 'GET', 'staff_search', lambda f: [], lambda f: {'q': "transformer"}, False),
+    Route('staff_picker', 'GET', 'staff_picker', lambda f: [], lambda f: {'q': "sup"}, False),
+    Route('staff_ticket_detail', 'GET', 'staff_ticket_detail',
+          lambda f: [f['ticket_id']], lambda f: {}, False),
+    Route('staff_ticket_history', 'GET', 'staff_ticket_history',
+          lambda f: [f['ticket_id']], lambda f: {'before': f['history_before']}, False),
+    Route('change_feed', 'GET', 'change_feed', lambda f: [], lambda f: {'cursor': f['feed_cursor']}, False),
+    Route('dashboard', 'GET', 'dashboard', lambda f: [], lambda f: {}, False),
+    Route('dashboard_export', 'GET', 'dashboard_export', lambda f: [], lambda f: {}, False),
+    Route('ticket_feedback', 'GET', 'ticket_feedback', lambda f: [f['resolved_ticket_id']], lambda f: {}, False),
+)
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def fixtures(staff):
+    """The tickets and ids the routes are driven with, picked from the database."""
+    ticket = (
+        Ticket.objects.filter(current_assigned_to=staff).order_by('-created_at').first()
+        or Ticket.objects.order_by('-created_at').first()
+    )
+    resolved = Ticket.objects.filter(status='RESOLVED').order_by('-created_at').first()
+    if ticket is None or resolved is None:
+        raise BenchmarkError("No tickets to benchmark against; run manage.py seed_load first.")
+    last_history = TicketHistory.objects.filter(ticket=ticket).aggregate(last=Max('id'))['last']
+    queue = Ticket.objects.filter(current_assigned_to=staff).order_by('-created_at')
+    latest = TicketHistory.objects.aggregate(last=Max('id'))['last'] or 0
+    return {
+        'n': 0,
+        'ticket_id': ticket.ticket_id,
+        # One queue page, as selected on the staff queue's bulk form.
+        'queue_pks': list(queue.values_list('pk', flat=True)[:50]) or [ticket.pk],
+        'resolved_ticket_id': resolved.ticket_id,
+        'history_before': last_history or 0,
+        # A consumer one full page behind.
+        'feed_cursor': max(latest - settings.FEED_PAGE_SIZE, 0),
+        'category_id': ticket.category_id or '',
+    }
+
+
+def default_staff():
+    """The staff member with the most open tickets who can also see the dashboard."""
+    staff = StaffUser.objects.filter(user__is_staff=True).select_related('user').annotate(
+        open_tickets=assignment.open_tickets()
+    ).order_by('-open_tickets', 'pk').first()
+    if staff is None:
+        raise BenchmarkError("No staff member with is_staff set; run manage.py seed_load first.")
+    return staff
+
+
+def query_count(server_timing):
+    match = QUERIES_RE.search(server_timing or '')
+    return int(match.group(1)) if match else None
+
+
+def summarize(route, samples, elapsed):
+    """Percentiles, throughput and mean queries for [(ok, seconds, queries), ...]."""
+    latencies = sorted(seconds * 1000 for _, seconds, _ in samples)
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    queries = [count for _, _, count in samples if count is not None]
+    return {
+        'route': route.label,
+        'method': route.method,
+        'requests': len(samples),
+        'errors': sum(1 for ok, _, _ in samples if not ok),
+        'p50_ms': round(cuts[49], 2),
+        'p95_ms': round(cuts[94], 2),
+        'p99_ms': round(cuts[98], 2),
+        'mean_ms': round(statistics.fmean(latencies), 2),
+        'requests_per_second': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        'queries_per_request': round(statistics.fmean(queries), 1) if queries else None,
+    }
+
+
+def selected(names=None, writes=True):
+    routes = [r for r in ROUTES if writes or not r.writes]
+    if names:
+        routes = [r for r in routes if r.label in names or r.name in names]
+    return routes
+
+
+def run_client(routes, requests, staff, warmup=1):
+    """Benchmark in-process with the test client. Writes are rolled back."""
+    try:
+        setup_test_environment()
+        owns_environment = True
+    except RuntimeError:
+        # Already set up, e.g. when run from the test suite.
+        owns_environment = False
+    try:
+        client = Client()
+        client.force_login(staff.user)
+        fixture = fixtures(staff)
+        results = []
+        for route in routes:
+            url = reverse(route.name, args=route.args(fixture))
+            request = client.post if route.method == 'POST' else client.get
+            samples = []
+            with transaction.atomic() if route.writes else nullcontext():
+                for n in range(warmup + requests):
+                    fixture['n'] = n
+                    data = route.data(fixture)
+                    start = time.perf_counter()
+                    response = request(url, data)
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+                    seconds = time.perf_counter() - start
+                    if n >= warmup:
+                        samples.append((
+                            response.status_code < 400, seconds,
+                            query_count(response.get('Server-Timing')),
+                        ))
+                if route.writes:
+                    transaction.set_rollback(True)
+            elapsed = sum(seconds for _, seconds, _ in samples)
+            results.append(summarize(route, samples, elapsed))
+        return results
+    finally:
+        if owns_environment:
+            teardown_test_environment()
+
+
+def http_login(base_url, username, password):
+    """A cookie-carrying opener logged in through the staff login form."""
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    login_url = f"{base_url}/accounts/login/"
+    token = CSRF_RE.search(opener.open(login_url, timeout=30).read().decode())
+    if not token:
+        raise BenchmarkError(f"{login_url} did not return the login form")
+    data = urllib.parse.urlencode({
+        'csrfmiddlewaretoken': token.group(1), 'username': username, 'password': password,
+    }).encode()
+    response = opener.open(urllib.request.Request(login_url, data=data, headers={'Referer': login_url}))
+    if '/accounts/login/' in response.geturl():
+        raise BenchmarkError(f"Could not log in to {base_url} as {username}")
+    return opener
+
+
+def csrf_cookie(opener):
+    for handler in opener.handlers:
+        if isinstance(handler, urllib.request.HTTPCookieProcessor):
+            for cookie in handler.cookiejar:
+                if cookie.name == 'csrftoken':
+                    return cookie.value
+    return None
+
+
+def send(opener, route, url, fixture):
+    """(ok, seconds, queries) for one request over HTTP."""
+    data = dict(route.data(fixture))
+    if route.method == 'POST':
+        # The session's CSRF cookie is accepted as the form token, so
+        # POST-only routes work without fetching a form first.
+        token = csrf_cookie(opener)
+        if token is None:
+            match = CSRF_RE.search(opener.open(url, timeout=30).read().decode())
+            token = match.group(1) if match else ''
+        data['csrfmiddlewaretoken'] = token
+        request = urllib.request.Request(
+            url, data=urllib.parse.urlencode(data, doseq=True).encode(), headers={'Referer': url},
+        )
+    else:
+        query = urllib.parse.urlencode(data, doseq=True)
+        request = urllib.request.Request(f"{url}?{query}" if data else url)
+    start = time.perf_counter()
+    try:
+        with opener.open(request, timeout=60) as response:
+            response.read()
+            return True, time.perf_counter() - start, query_count(response.headers.get('Server-Timing'))
+    except urllib.error.URLError:
+        return False, time.perf_counter() - start, None
+
+
+def run_http(base_url, routes, requests, concurrency, staff, password):
+    """Benchmark a running deployment with `concurrency` logged-in clients per route."""
+    base_url = base_url.rstrip('/')
+    fixture = fixtures(staff)
+    # One logged-in session per client, taken by whichever thread sends next.
+    sessions = queue.SimpleQueue()
+    for _ in range(concurrency):
+        sessions.put(http_login(base_url, staff.user.username, password))
+
+    results = []
+    for route in routes:
+        url = base_url + reverse(route.name, args=route.args(fixture))
+
+        def fetch(n, route=route, url=url):
+            opener = sessions.get()
+            try:
+                return send(opener, route, url, {**fixture, 'n': n})
+            finally:
+                sessions.put(opener)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(fetch, range(requests)))
+        results.append(summarize(route, samples, time.perf_counter() - started))
+    return results
+
+
+def compare(previous, current):
+    """[(route, p95 before, p95 after, queries before, queries after)] for routes in both runs."""
+    before = {r['route']: r for r in previous}
+    return [
+        (r['route'], before[r['route']]['p95_ms'], r['p95_ms'],
+         before[r['route']]['queries_per_request'], r['queries_per_request'])
+        for r in current if r['route'] in before
+    ]
@@ -0,0 +1,111 @@
+# tickets/bulk.py
+"""
+Bulk staff actions on many tickets at once (the staff queue's bulk form).
+
+`apply()` changes status, reassigns or escalates a set of tickets in one
+transaction, BULK_ACTION_BATCH_SIZE tickets at a time: the batch is read
+and locked with one query, written back with bulk_update of only the
+fields the action touches, its history rows go in with one bulk_create,
+and tracking sees the whole batch at once. Customer emails are queued with
+one enqueue_emails call at the end. Resolving or closing a ticket that
+leads an incident resolves the incident's tickets too (tickets.incidents).
+"""
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import incidents, tracking
+from .models import Ticket, TicketHistory
+from .outbox import enqueue_emails
+from .utils import escalation_email, resolved_email
+
+ACTIONS = (
+    ('status', "Change status"),
+    ('reassign', "Reassign"),
+    ('escalate', "Escalate"),
+)
+
+
+def _change(ticket, action, status, to_staff, now):
+    """Apply the action to one ticket; returns (fields, history action) or None if a no-op."""
+    if action == 'status':
+        if ticket.status == status:
+            return None
+        ticket.status = status
+        fields = ['status', 'updated_at']
+        if status == 'RESOLVED' and ticket.resolved_at is None:
+            ticket.resolved_at = now
+            fields.append('resolved_at')
+        return fields, 'RESOLVED' if status == 'RESOLVED' else 'STATUS_CHANGED'
+    if action == 'reassign':
+        if ticket.current_assigned_to_id == to_staff.pk:
+            return None
+        ticket.current_assigned_to = to_staff
+        return ['current_assigned_to', 'updated_at'], 'ASSIGNED'
+    if ticket.status == 'ESCALATED' and ticket.current_assigned_to_id == to_staff.pk:
+        return None
+    ticket.status = 'ESCALATED'
+    ticket.current_assigned_to = to_staff
+    return ['status', 'current_assigned_to', 'updated_at'], 'ESCALATED'
+
+
+def apply(tickets, action, staff, status=None, to_staff=None, comment="", batch_size=None):
+    """
+    Run `action` ('status', 'reassign' or 'escalate') on the Ticket
+    queryset `tickets` on behalf of `staff`. `status` is the new status for
+    'status'; `to_staff` (with its user loaded) the new assignee otherwise.
+    Tickets already in the requested state are skipped. Returns the number
+    of tickets changed.
+    """
+    batch_size = batch_size or settings.BULK_ACTION_BATCH_SIZE
+    now = timezone.now()
+    changed, emails = 0, []
+
+    with transaction.atomic():
+        pks = list(tickets.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(pks), batch_size):
+            batch = list(
+                Ticket.objects.filter(pk__in=pks[start:start + batch_size])
+                .select_related('customer', 'led_incident')
+                .select_for_update(of=('self',))
+                .order_by('pk')
+            )
+            changes, history, fields, leads = [], [], {'updated_at'}, []
+            for ticket in batch:
+                before = tracking.snapshot(ticket)
+                change = _change(ticket, action, status, to_staff, now)
+                if change is None:
+                    continue
+                touched, action_type = change
+                ticket.updated_at = now
+                fields.update(touched)
+                changes.append((before, ticket))
+                history.append(TicketHistory(
+                    ticket=ticket,
+                    from_staff=staff,
+                    to_staff=to_staff or staff,
+                    action_type=action_type,
+                    comment=comment or f"Bulk {dict(ACTIONS)[action].lower()}",
+                ))
+                if action == 'escalate':
+                    emails.append(escalation_email(ticket, to_staff))
+                elif action == 'status' and status == 'RESOLVED':
+                    emails.append(resolved_email(ticket))
+                incident = incidents.led_by(ticket)
+                if (action == 'status' and status in incidents.FINISHING_STATUSES
+                        and incident and incident.resolved_at is None):
+                    leads.append(incident)
+            if not changes:
+                continue
+
+            # resolved_at is only written for tickets that had none, so its
+            # value is the same as before for the rest of the batch.
+            Ticket.objects.bulk_update([t for _, t in changes], sorted(fields))
+            tracking.tickets_changed(changes)
+            TicketHistory.objects.bulk_create(history)
+            for incident in leads:
+                incidents.resolve(incident, status, staff=staff, comment=comment)
+            changed += len(changes)
+
+        enqueue_emails(emails)
+    return changed
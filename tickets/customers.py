@@ -0,0 +1,263 @@
+# tickets/customers.py
+"""
+Customer identity resolution.
+
+A complaint is matched to an existing customer through any of its
+normalised identity keys (CustomerIdentity rows, unique per key), tried in
+MATCH_ORDER. Every lookup is an indexed equality match on (kind, value).
+
+New customers are created together with their keys inside a savepoint. If
+a concurrent submission registered one of the keys first, the unique
+constraint fails, the savepoint is rolled back and the winner is matched
+instead, so racing submissions never produce duplicate customers.
+
+Only an email match updates a customer's name and email: phone, account
+and meter numbers can be shared or mistyped, so a match on one of them
+fills in blank details and never takes over the contact email.
+"""
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import ArchivedTicket, Customer, CustomerIdentity, Ticket
+
+MATCH_ORDER = ('EMAIL', 'ACCOUNT', 'METER', 'PHONE')
+MIN_PHONE_DIGITS = 7
+
+
+def normalize_email(value):
+    return (value or "").strip().lower()
+
+
+def normalize_phone(value):
+    """Digits only, with the +234 / 234 country code folded to a leading 0."""
+    digits = re.sub(r"\D", "", value or "")
+    if digits.startswith("234") and len(digits) == 13:
+        digits = "0" + digits[3:]
+    elif len(digits) == 10 and not digits.startswith("0"):
+        digits = "0" + digits
+    return digits if len(digits) >= MIN_PHONE_DIGITS else ""
+
+
+def normalize_reference(value):
+    """Account and meter numbers: upper case, letters and digits only."""
+    return re.sub(r"[^0-9A-Z]", "", (value or "").upper())
+
+
+def identity_keys(email=None, phone=None, account_number=None, meter_number=None):
+    """[(kind, value), ...] in MATCH_ORDER, skipping blanks."""
+    values = {
+        'EMAIL': normalize_email(email),
+        'ACCOUNT': normalize_reference(account_number),
+        'METER': normalize_reference(meter_number),
+        'PHONE': normalize_phone(phone),
+    }
+    return [(kind, values[kind]) for kind in MATCH_ORDER if values[kind]]
+
+
+def customer_keys(customer):
+    return identity_keys(
+        customer.email, customer.phone, customer.account_number, customer.meter_number
+    )
+
+
+def lookup(keys):
+    """{(kind, value): customer_id} for the keys that are already registered."""
+    if not keys:
+        return {}
+    match = Q()
+    for kind, value in keys:
+        match |= Q(kind=kind, value=value)
+    return {
+        (kind, value): customer_id
+        for kind, value, customer_id in CustomerIdentity.objects.filter(match)
+        .values_list('kind', 'value', 'customer_id')
+    }
+
+
+def first_match(keys, known):
+    """The first of `keys` that is registered, or None."""
+    for key in keys:
+        if key in known:
+            return key
+    return None
+
+
+def add_keys(customer, keys):
+    """Register `keys` for `customer`; keys already owned by someone else are left alone."""
+    CustomerIdentity.objects.bulk_create(
+        [CustomerIdentity(customer=customer, kind=kind, value=value) for kind, value in keys],
+        ignore_conflicts=True,
+    )
+
+
+def resolve_customer(name, email, phone, account_number=None, meter_number=None,
+                     region=None, attempts=3):
+    """
+    Return (customer, created) for a complaint's contact details.
+
+    A customer matched on email gets the latest details. One matched only on
+    phone, account or meter number (a shared household phone, a mistyped
+    meter) keeps its name and email and only has blank fields filled in; a
+    different email is not registered to it.
+    """
+    keys = identity_keys(email, phone, account_number, meter_number)
+
+    for attempt in range(attempts):
+        known = lookup(keys)
+        match = first_match(keys, known)
+        if match is not None:
+            customer = Customer.objects.get(pk=known[match])
+            if match[0] == 'EMAIL':
+                customer.name = name
+                customer.email = email
+                customer.phone = phone
+                if account_number:
+                    customer.account_number = account_number
+                if meter_number:
+                    customer.meter_number = meter_number
+                if region:
+                    customer.region = region
+            else:
+                for field, value in (('name', name), ('email', email), ('phone', phone),
+                                     ('account_number', account_number),
+                                     ('meter_number', meter_number), ('region', region)):
+                    if value and not getattr(customer, field):
+                        setattr(customer, field, value)
+                own_email = normalize_email(customer.email)
+                keys = [key for key in keys if key[0] != 'EMAIL' or key[1] == own_email]
+            customer.save()
+            add_keys(customer, keys)
+            return customer, False
+
+        try:
+            with transaction.atomic():
+                customer = Customer.objects.create(
+                    name=name,
+                    email=email,
+                    phone=phone,
+                    account_number=account_number or None,
+                    meter_number=meter_number or None,
+                    region=region or None,
+                )
+                CustomerIdentity.objects.bulk_create([
+                    CustomerIdentity(customer=customer, kind=kind, value=value)
+                    for kind, value in keys
+                ])
+            return customer, True
+        except IntegrityError:
+            # Someone registered one of these keys first; match them instead.
+            if attempt == attempts - 1:
+                raise
+
+
+def resolve_customers(records):
+    """
+    Bulk version of `resolve_customer` for imports: one identity lookup for
+    the whole batch and one INSERT for the customers that are new.
+    `records` are dicts with name, email, phone, account_number,
+    meter_number and region. Returns one Customer per record.
+
+    Matched customers are not updated, and should another writer register a
+    key concurrently, the IntegrityError propagates so the batch is retried.
+    """
+    record_keys = [
+        identity_keys(r['email'], r['phone'], r.get('account_number'), r.get('meter_number'))
+        for r in records
+    ]
+    known = lookup({key for keys in record_keys for key in keys})
+
+    existing = Customer.objects.in_bulk(set(known.values()))
+    claimed = {key: existing[cid] for key, cid in known.items()}
+    new_customers = []
+    new_keys = []
+    for record, keys in zip(records, record_keys):
+        if any(key in claimed for key in keys):
+            continue
+        customer = Customer(
+            name=record['name'],
+            email=record['email'],
+            phone=record['phone'],
+            account_number=record.get('account_number') or None,
+            meter_number=record.get('meter_number') or None,
+            region=record.get('region') or None,
+        )
+        new_customers.append(customer)
+        new_keys.append(keys)
+        for key in keys:
+            claimed[key] = customer
+
+    Customer.objects.bulk_create(new_customers)
+    CustomerIdentity.objects.bulk_create([
+        CustomerIdentity(customer=customer, kind=kind, value=value)
+        for customer, keys in zip(new_customers, new_keys)
+        for kind, value in keys
+        if claimed[(kind, value)] is customer
+    ])
+
+    return [
+        claimed[next(key for key in keys if key in claimed)] if keys else None
+        for keys in record_keys
+    ]
+
+
+def duplicate_groups(customers):
+    """
+    Group customers that share any identity key (transitively), given an
+    iterable of Customer rows. Returns lists of ids, lowest id first.
+    """
+    parent = {}
+
+    def root(cid):
+        while parent[cid] != cid:
+            parent[cid] = parent[parent[cid]]
+            cid = parent[cid]
+        return cid
+
+    owner = {}
+    for customer in customers:
+        parent.setdefault(customer.pk, customer.pk)
+        for key in customer_keys(customer):
+            if key in owner:
+                a, b = root(owner[key]), root(customer.pk)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+            else:
+                owner[key] = customer.pk
+
+    groups = {}
+    for cid in parent:
+        groups.setdefault(root(cid), []).append(cid)
+    return [sorted(ids) for ids in groups.values() if len(ids) > 1]
+
+
+def merge_customers(survivor_id, duplicate_ids):
+    """
+    Fold `duplicate_ids` into the customer `survivor_id`: tickets and identity
+    keys move over, blank details are filled in, the duplicates are deleted.
+    """
+    from . import search
+
+    with transaction.atomic():
+        survivor = Customer.objects.select_for_update().get(pk=survivor_id)
+        duplicates = list(Customer.objects.filter(pk__in=duplicate_ids).order_by('pk'))
+        for duplicate in duplicates:
+            for field in ('account_number', 'meter_number', 'region'):
+                if not getattr(survivor, field) and getattr(duplicate, field):
+                    setattr(survivor, field, getattr(duplicate, field))
+        survivor.save()
+
+        moved = Ticket.objects.filter(customer_id__in=duplicate_ids).update(customer=survivor)
+        ArchivedTicket.objects.filter(customer_id__in=duplicate_ids).update(customer=survivor)
+        keys = {
+            (kind, value) for kind, value in
+            CustomerIdentity.objects.filter(customer_id__in=duplicate_ids).values_list('kind', 'value')
+        }
+        keys.update(key for duplicate in duplicates for key in customer_keys(duplicate))
+        keys.update(customer_keys(survivor))
+        CustomerIdentity.objects.filter(customer_id__in=duplicate_ids).delete()
+        add_keys(survivor, sorted(keys))
+        Customer.objects.filter(pk__in=duplicate_ids).delete()
+        search.index_customer(survivor)
+    return moved
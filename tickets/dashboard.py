@@ -0,0 +1,142 @@
+# tickets/dashboard.py
+"""
+Cached leadership dashboard context.
+
+The computed context (totals, status and category breakdowns, average
+resolution time, SLA breaches, open workload, oldest open tickets) is
+cached under a key built from the filters and the global ticket-data
+version. tickets.tracking bumps that
+version on every ticket create, status change, escalation or delete, so
+the next load after a write recomputes. The context is always computed on
+the primary: every viewer shares the entry until the next write, so one
+computed from a lagging replica would keep showing the pre-write numbers.
+
+Only one worker recomputes a given entry at a time: it takes a short lock
+with cache.add(); the others serve the last entry computed for the same
+filters, or, if there is none yet, wait about as long as the last compute
+took (at most DASHBOARD_CACHE_WAIT_SECONDS) and then compute it
+themselves. Hit, miss, stale and wait counts are kept in the cache (see
+`stats()`).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import reference, rollups, routing, sla, workload
+from .models import Ticket
+from .reference import CacheVersion
+
+ticket_data = CacheVersion("tickets:data:version")
+
+STATS = ('hit', 'miss', 'stale', 'wait')
+COMPUTE_SECONDS_KEY = "dashboard:compute_seconds"
+OPEN_TICKETS_SHOWN = 50
+
+
+def ticket_data_changed():
+    ticket_data.invalidate()
+
+
+def _count(outcome):
+    key = f"dashboard:stats:{outcome}"
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def stats():
+    """{'hit': n, 'miss': n, 'stale': n, 'wait': n} since the counters were last reset."""
+    values = cache.get_many([f"dashboard:stats:{outcome}" for outcome in STATS])
+    return {outcome: values.get(f"dashboard:stats:{outcome}", 0) for outcome in STATS}
+
+
+def reset_stats():
+    cache.delete_many([f"dashboard:stats:{outcome}" for outcome in STATS])
+
+
+def compute(tickets, status=None, start=None, end=None):
+    """The dashboard context for `tickets` (already filtered) from the database."""
+    # Counts and averages come from the daily rollups, so their cost depends
+    # on the number of days in range rather than the number of tickets.
+    summary = rollups.dashboard_summary(status=status, start=start, end=end)
+    oldest = tickets.filter(status__in=Ticket.OPEN_STATUSES).order_by('created_at').values_list(
+        'ticket_id', 'customer__name', 'status', 'created_at',
+    )[:OPEN_TICKETS_SHOWN]
+    statuses = dict(Ticket.STATUS_CHOICES)
+    summary['sla_breaches'], summary['sla_breach_total'] = sla.dashboard_breaches()
+    # Current open workload: not filtered by date, read from the counters.
+    names = {category.pk: category.name for category in reference.categories()}
+    summary['open_status_labels'] = [statuses[s] for s in Ticket.OPEN_STATUSES]
+    summary['open_by_category'] = [
+        {'category_name': names.get(key), 'counts': [counts[s] for s in Ticket.OPEN_STATUSES],
+         'total': sum(counts.values())}
+        for key, counts in sorted(workload.category_counts().items())
+    ]
+    summary['open_tickets'] = [
+        {'ticket_id': ticket_id, 'customer_name': name,
+         'status_display': statuses.get(status, status), 'created_at': created_at}
+        for ticket_id, name, status, created_at in oldest
+    ]
+    return summary
+
+
+def _timed_compute(tickets, status, start, end):
+    started = time.monotonic()
+    with routing.primary():
+        context = compute(tickets, status, start, end)
+    cache.set(COMPUTE_SECONDS_KEY, time.monotonic() - started, timeout=None)
+    return context
+
+
+def _wait_seconds():
+    """How long to wait for another worker's compute: twice the last one, within the limit."""
+    limit = settings.DASHBOARD_CACHE_WAIT_SECONDS
+    last = cache.get(COMPUTE_SECONDS_KEY)
+    return limit if last is None else min(limit, max(2 * last, 0.1))
+
+
+def cached_context(tickets, status=None, start=None, end=None):
+    """
+    (context, outcome): `compute()` through the cache; outcome is hit, miss,
+    stale or wait (served another worker's fresh entry after waiting for it).
+    """
+    filters = hashlib.sha1(repr((status, start, end)).encode()).hexdigest()
+    key = f"dashboard:{ticket_data.version()}:{filters}"
+    last_key = f"dashboard:last:{filters}"
+    lock_key = f"dashboard:lock:{filters}"
+
+    context = cache.get(key)
+    outcome = 'hit'
+    if context is None:
+        if cache.add(lock_key, 1, timeout=settings.DASHBOARD_CACHE_LOCK_SECONDS):
+            try:
+                context = _timed_compute(tickets, status, start, end)
+                cache.set_many({key: context, last_key: context}, settings.DASHBOARD_CACHE_SECONDS)
+            finally:
+                cache.delete(lock_key)
+            outcome = 'miss'
+        else:
+            # Someone else is computing this entry: serve the previous one,
+            # or wait for theirs if these filters were never computed.
+            context = cache.get(last_key)
+            outcome = 'stale'
+            if context is None:
+                outcome = 'wait'
+                deadline = time.monotonic() + _wait_seconds()
+                while context is None and time.monotonic() < deadline:
+                    time.sleep(0.05)
+                    context = cache.get(key)
+            if context is None:
+                context = _timed_compute(tickets, status, start, end)
+                outcome = 'miss'
+    _count(outcome)
+
+    # Ages are relative to now, not to when the entry was computed.
+    now = timezone.now()
+    open_tickets = [{**t, 'age': now - t['created_at']} for t in context['open_tickets']]
+    return {**context, 'open_tickets': open_tickets}, outcome
@@ -0,0 +1,112 @@
+# tickets/directory.py
+"""
+Staff typeahead for the escalation picker.
+
+Every word of a staff member's name, username, role, department and
+region is stored lowercased in StaffSearchToken. A query term matches as a
+prefix through a range scan on the (token, staff) index,
+token >= 'ad' AND token < 'ad\\uffff', which SQLite and PostgreSQL both
+serve from the B-tree (a case-insensitive LIKE would not). Every term has
+to match. Results are formatted from the reference-data staff directory
+and cached for a few seconds per directory version, query and limit.
+"""
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import reference
+from .models import StaffSearchToken, StaffUser
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MAX_TERMS = 4
+INDEX_CHUNK_SIZE = 1000
+
+
+def words(*values):
+    return [w[:100] for w in TOKEN_RE.findall(" ".join(v for v in values if v).lower())]
+
+
+def staff_tokens(staff):
+    user = staff.user
+    return sorted(set(words(
+        user.first_name, user.last_name, user.username, staff.role, staff.department, staff.region,
+    )))
+
+
+def index_staff(staff_ids):
+    staff_ids = list(staff_ids)
+    StaffSearchToken.objects.filter(staff_id__in=staff_ids).delete()
+    StaffSearchToken.objects.bulk_create([
+        StaffSearchToken(staff=staff, token=token)
+        for staff in StaffUser.objects.filter(pk__in=staff_ids).select_related('user')
+        for token in staff_tokens(staff)
+    ])
+
+
+def rebuild():
+    """Re-index every staff member. Returns the number indexed."""
+    StaffSearchToken.objects.all().delete()
+    ids = list(StaffUser.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), INDEX_CHUNK_SIZE):
+        index_staff(ids[start:start + INDEX_CHUNK_SIZE])
+    return len(ids)
+
+
+def staff_saved(sender, instance, update_fields=None, **kwargs):
+    if reference.directory_changed(update_fields):
+        index_staff([instance.pk])
+
+
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    if reference.directory_changed(update_fields):
+        index_staff(StaffUser.objects.filter(user=instance).values_list('pk', flat=True))
+
+
+def search_ids(query, limit):
+    terms = words(query)[:MAX_TERMS]
+    if not terms:
+        return []
+    staff = StaffUser.objects.all()
+    for term in terms:
+        matching = StaffSearchToken.objects.filter(token__gte=term, token__lt=term + "\uffff")
+        staff = staff.filter(pk__in=matching.values('staff_id'))
+    return list(
+        staff.order_by('user__first_name', 'user__last_name', 'pk')
+        .values_list('pk', flat=True)[:limit]
+    )
+
+
+def clamp_limit(limit):
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        limit = settings.STAFF_PICKER_LIMIT
+    return max(1, min(limit, settings.STAFF_PICKER_MAX_LIMIT))
+
+
+def search(query, limit=None):
+    """[{'id', 'name', 'role', 'department', 'region', 'label'}, ...] for the picker."""
+    limit = clamp_limit(limit)
+    terms = " ".join(words(query)[:MAX_TERMS])
+    if not terms:
+        return []
+    digest = hashlib.sha1(terms.encode()).hexdigest()
+    key = f"staff-picker:{reference.staff_cache.version()}:{limit}:{digest}"
+    results = cache.get(key)
+    if results is None:
+        results = []
+        for pk in search_ids(terms, limit):
+            entry = reference.get_staff_entry(pk)
+            if entry is not None:
+                results.append({
+                    'id': entry.pk,
+                    'name': entry.name,
+                    'role': entry.role,
+                    'department': entry.department,
+                    'region': entry.region,
+                    'label': f"{entry.name} - {entry.role}",
+                })
+        cache.set(key, results, settings.STAFF_PICKER_CACHE_SECONDS)
+    return results
@@ -0,0 +1,110 @@
+# tickets/feed.py
+"""
+Change feed over TicketHistory for downstream systems (BI, SMS gateway,
+CRM sync): the /staff/feed/ JSON endpoint and `manage.py tail_feed`.
+
+TicketHistory is append-only with an increasing id, so the id of the last
+event a consumer has seen is its cursor. A page is one query: a range
+scan of the primary key after the cursor, with the ticket, customer,
+category and both staff members joined in, at most FEED_MAX_PAGE_SIZE
+rows. The cost is the events since the cursor, whatever the table size.
+
+Ids are handed out at insert but become visible at commit, so a slow
+transaction can commit an id below one a consumer has already passed.
+Pages stop at the first event younger than FEED_SETTLE_SECONDS, which
+gives writers that long to commit before the cursor moves past them.
+
+`ticket` fields are the ticket's current state, not its state when the
+event happened; the event itself carries what changed.
+"""
+import asyncio
+import time
+from datetime import timedelta
+from itertools import takewhile
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from .models import TicketHistory
+
+FIELDS = (
+    'id', 'created_at', 'action_type', 'comment',
+    'ticket__ticket_id', 'ticket__status', 'ticket__category__name', 'ticket__created_at',
+    'ticket__resolved_at', 'ticket__customer__name', 'ticket__customer__email',
+    'ticket__customer__phone', 'ticket__customer__account_number',
+    'ticket__customer__meter_number', 'ticket__customer__region',
+    'from_staff_id', 'from_staff__user__first_name', 'from_staff__user__last_name',
+    'from_staff__role', 'to_staff_id', 'to_staff__user__first_name',
+    'to_staff__user__last_name', 'to_staff__role',
+)
+
+
+def _staff(row, side):
+    if row[f'{side}_id'] is None:
+        return None
+    name = f"{row[f'{side}__user__first_name']} {row[f'{side}__user__last_name']}".strip()
+    return {'id': row[f'{side}_id'], 'name': name, 'role': row[f'{side}__role']}
+
+
+def event(row):
+    """One feed event from a FIELDS row."""
+    return {
+        'id': row['id'],
+        'created_at': row['created_at'],
+        'action': row['action_type'],
+        'comment': row['comment'],
+        'ticket': {
+            'ticket_id': row['ticket__ticket_id'],
+            'status': row['ticket__status'],
+            'category': row['ticket__category__name'],
+            'created_at': row['ticket__created_at'],
+            'resolved_at': row['ticket__resolved_at'],
+            'customer': {
+                key: row[f'ticket__customer__{key}']
+                for key in ('name', 'email', 'phone', 'account_number', 'meter_number', 'region')
+            },
+        },
+        'from_staff': _staff(row, 'from_staff'),
+        'to_staff': _staff(row, 'to_staff'),
+    }
+
+
+def page_size(value=None):
+    """`value` as a page size, clamped to 1..FEED_MAX_PAGE_SIZE."""
+    try:
+        size = int(value) if value else settings.FEED_PAGE_SIZE
+    except (TypeError, ValueError):
+        size = settings.FEED_PAGE_SIZE
+    return max(1, min(size, settings.FEED_MAX_PAGE_SIZE))
+
+
+def page(cursor=0, limit=None):
+    """
+    (events, next_cursor, has_more) for up to `limit` settled events after
+    `cursor`. next_cursor is `cursor` itself when there is nothing new.
+    """
+    limit = page_size(limit)
+    horizon = timezone.now() - timedelta(seconds=settings.FEED_SETTLE_SECONDS)
+    rows = list(
+        TicketHistory.objects.filter(pk__gt=cursor).order_by('pk').values(*FIELDS)[:limit + 1]
+    )
+    settled = list(takewhile(lambda row: row['created_at'] <= horizon, rows))
+    has_more = len(settled) > limit
+    settled = settled[:limit]
+    next_cursor = settled[-1]['id'] if settled else cursor
+    return [event(row) for row in settled], next_cursor, has_more
+
+
+apage = sync_to_async(page)
+
+
+async def wait_for_page(cursor=0, limit=None, wait=0):
+    """`page()`, re-polled every FEED_POLL_SECONDS for up to `wait` seconds while it is empty."""
+    deadline = time.monotonic() + wait
+    while True:
+        events, next_cursor, has_more = await apage(cursor, limit)
+        remaining = deadline - time.monotonic()
+        if events or remaining <= 0:
+            return events, next_cursor, has_more
+        await asyncio.sleep(min(settings.FEED_POLL_SECONDS, remaining))
@@ -1,7 +1,13 @@
 # tickets/forms.py
 
 from django import forms
-from .models import Category, StaffUser
+from . import reference
+from .bulk import ACTIONS
+from .models import StaffUser, Ticket
+
+
+def _category_choices():
+    return [("", "Select Complaint Category")] + reference.category_choices()
 
 
 class ComplaintForm(forms.Form):
@@ -10,15 +16,23 @@ class ComplaintForm(forms.Form):
     phone = forms.CharField(max_length=20, label="Phone Number")
     account_number = forms.CharField(max_length=50, required=False)
     meter_number = forms.CharField(max_length=50, required=False)
-    category = forms.ModelChoiceField(
-        queryset=Category.objects.all(),
-        empty_label="Select Complaint Category"
+    region = forms.CharField(max_length=100, required=False, label="Region / Area")
+    feeder = forms.CharField(
+        max_length=100, required=False, label="Feeder / Transformer (if known)",
     )
+    # Choices come from the reference-data cache, not a query per render.
+    category = forms.ChoiceField(choices=_category_choices)
     description = forms.CharField(
         widget=forms.Textarea,
         label="Complaint Details"
     )
 
+    def clean_category(self):
+        category = reference.get_category(int(self.cleaned_data['category']))
+        if category is None:
+            raise forms.ValidationError("Select a valid complaint category.")
+        return category
+
 
 class TicketStatusForm(forms.Form):
     STATUS_CHOICES = [
@@ -35,15 +49,66 @@ class TicketStatusForm(forms.Form):
 
 
 class EscalationForm(forms.Form):
-    to_staff = forms.ModelChoiceField(
-        queryset=StaffUser.objects.all(),
-        label="Escalate To"
+    # Filled in by the typeahead picker (staff_picker); no options are rendered.
+    to_staff = forms.IntegerField(
+        widget=forms.HiddenInput,
+        label="Escalate To",
+        error_messages={'required': "Choose a staff member to escalate to."},
     )
     comment = forms.CharField(
         widget=forms.Textarea,
         required=False,
         label="Reason / Comment"
     )
+
+    def clean_to_staff(self):
+        # Only the chosen staff member is loaded, and only on submit.
+        try:
+            return StaffUser.objects.select_related('user').get(pk=self.cleaned_data['to_staff'])
+        except StaffUser.DoesNotExist:
+            raise forms.ValidationError("Select a valid staff member.")
+
+class TicketSelectionField(forms.Field):
+    """Ticket primary keys from the queue's checkboxes."""
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        try:
+            return sorted({int(pk) for pk in value or []})
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Invalid ticket selection.")
+
+
+class BulkActionForm(forms.Form):
+    action = forms.ChoiceField(choices=ACTIONS)
+    tickets = TicketSelectionField(required=False)
+    # Instead of the checked tickets: every ticket in the user's queue with
+    # `queue_status` (all statuses if blank), however many pages it spans.
+    whole_queue = forms.BooleanField(required=False)
+    queue_status = forms.ChoiceField(
+        choices=[("", "All")] + Ticket.STATUS_CHOICES, required=False, widget=forms.HiddenInput,
+    )
+    status = forms.ChoiceField(choices=TicketStatusForm.STATUS_CHOICES, required=False)
+    to_staff = forms.IntegerField(widget=forms.HiddenInput, required=False)
+    comment = forms.CharField(widget=forms.Textarea(attrs={'rows': 2}), required=False)
+
+    def clean(self):
+        data = super().clean()
+        if not data.get('tickets') and not data.get('whole_queue'):
+            raise forms.ValidationError("Select at least one ticket.")
+        if data.get('action') == 'status' and not data.get('status'):
+            self.add_error('status', "Choose the new status.")
+        if data.get('action') in ('reassign', 'escalate'):
+            if not data.get('to_staff'):
+                self.add_error('to_staff', "Choose a staff member.")
+            else:
+                try:
+                    data['to_staff'] = StaffUser.objects.select_related('user').get(pk=data['to_staff'])
+                except StaffUser.DoesNotExist:
+                    self.add_error('to_staff', "Select a valid staff member.")
+        return data
+
+
 class FeedbackForm(forms.Form):
     RATING_CHOICES = [
         (1, "1 - Very Dissatisfied"),
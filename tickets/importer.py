@@ -0,0 +1,137 @@
+# tickets/importer.py
+"""
+Bulk complaint import for call-centre and IVR batches (CSV or JSONL).
+
+Records are streamed and written in chunks: each chunk resolves its
+customers with one identity-key lookup, reserves its ticket IDs in one
+sequence bump, spreads assignments with one staff query per role, and
+inserts tickets, initial history and queued acknowledgements with
+bulk_create inside one transaction. Memory use is bounded by the chunk size, not the file size.
+The run's ImportCheckpoint is saved in that same transaction, so a chunk
+and the progress past it are committed together or not at all.
+
+Expected fields: name, email, phone, category (name or id), description,
+and optionally account_number, meter_number, region.
+"""
+import csv
+import json
+from collections import defaultdict
+
+from django.db import transaction
+
+from . import customers, tracking
+from .assignment import get_strategy
+from .models import Category, ImportCheckpoint, Ticket, TicketHistory
+from .outbox import enqueue_emails
+from .ticket_ids import allocate_ticket_ids
+from .utils import acknowledgement_email
+
+REQUIRED_FIELDS = ('name', 'email', 'phone', 'category', 'description')
+OPTIONAL_FIELDS = ('account_number', 'meter_number', 'region')
+
+
+class RecordError(ValueError):
+    pass
+
+
+def read_records(path, fmt=None):
+    """Yield (record_number, dict) from a CSV or JSONL file, one at a time."""
+    fmt = fmt or ('jsonl' if str(path).endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as handle:
+        if fmt == 'csv':
+            for number, row in enumerate(csv.DictReader(handle), start=1):
+                yield number, row
+        else:
+            number = 0
+            for line in handle:
+                if not line.strip():
+                    continue
+                number += 1
+                try:
+                    yield number, json.loads(line)
+                except json.JSONDecodeError as exc:
+                    yield number, RecordError(f"invalid JSON: {exc}")
+
+
+class ComplaintImporter:
+
+    def __init__(self, status='NEW'):
+        self.status = status
+        self.categories = {}
+        for category in Category.objects.all():
+            self.categories[str(category.pk)] = category
+            self.categories[category.name.strip().lower()] = category
+        self.strategy = get_strategy()
+
+    def clean(self, record):
+        if isinstance(record, Exception):
+            raise record
+        values = {}
+        for field in REQUIRED_FIELDS + OPTIONAL_FIELDS:
+            value = record.get(field)
+            values[field] = str(value).strip() if value not in (None, '') else ''
+        missing = [f for f in REQUIRED_FIELDS if not values[f]]
+        if missing:
+            raise RecordError(f"missing {', '.join(missing)}")
+        category = self.categories.get(values['category'].lower())
+        if category is None:
+            raise RecordError(f"unknown category {values['category']!r}")
+        values['category'] = category
+        values['email'] = values['email'].lower()
+        return values
+
+    def resolve_customers(self, rows):
+        """One Customer per row, matched on any identity key or created in bulk."""
+        return customers.resolve_customers(rows)
+
+    def assign(self, rows, resolved):
+        """One staff member (or None) per row, spread per (role, region)."""
+        groups = defaultdict(list)
+        for i, row in enumerate(rows):
+            region = row['region'] or resolved[i].region
+            groups[(row['category'].default_first_level_role, region)].append(i)
+
+        assigned = [None] * len(rows)
+        for (role, region), positions in groups.items():
+            picks = self.strategy.pick_many(role, region, len(positions))
+            for position, staff_user in zip(positions, picks):
+                assigned[position] = staff_user
+        return assigned
+
+    def save_checkpoint(self, source, records_done):
+        ImportCheckpoint.objects.update_or_create(source=source, defaults={'records_done': records_done})
+
+    def import_chunk(self, rows, source=None, records_done=None):
+        """
+        Write one chunk of cleaned rows in a single transaction, recording
+        `records_done` as the checkpoint of `source` in it when given.
+        """
+        ticket_ids = allocate_ticket_ids(len(rows))
+        with transaction.atomic():
+            resolved = self.resolve_customers(rows)
+            assigned = self.assign(rows, resolved)
+            tickets = Ticket.objects.bulk_create([
+                Ticket(
+                    ticket_id=ticket_id,
+                    customer=customer,
+                    category=row['category'],
+                    description=row['description'],
+                    status=self.status,
+                    current_assigned_to=staff_user,
+                )
+                for row, customer, ticket_id, staff_user in zip(rows, resolved, ticket_ids, assigned)
+            ])
+            TicketHistory.objects.bulk_create([
+                TicketHistory(
+                    ticket=ticket,
+                    to_staff=ticket.current_assigned_to,
+                    action_type='ASSIGNED',
+                    comment="Ticket imported and assigned automatically",
+                )
+                for ticket in tickets
+            ])
+            enqueue_emails(acknowledgement_email(ticket) for ticket in tickets)
+            tracking.tickets_created(tickets)
+            if source is not None:
+                self.save_checkpoint(source, records_done)
+        return tickets
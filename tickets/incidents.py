@@ -0,0 +1,136 @@
+# tickets/incidents.py
+"""
+Outage-storm coalescing into incidents.
+
+When a feeder trips, hundreds of customers in one region report the same
+thing within minutes. For categories with `coalesce_incidents` set, a new
+complaint with a known region is matched, inside its submission
+transaction, against open incidents with the same category, region and
+feeder whose last report is under INCIDENT_WINDOW_MINUTES old:
+
+- no match: the ticket is assigned as usual and leads a new Incident;
+- a match: the ticket is attached to the incident (Ticket.incident)
+  unassigned, with no assignment lookup and no history row, and the
+  incident's report count moves with one UPDATE.
+
+Only lead tickets are in a staff queue, and only they are seen by the SLA
+scanner. When staff resolve or close a lead ticket, `resolve()` gives the
+incident's open tickets the same status in batches: one UPDATE, one
+history insert and one outbox insert per INCIDENT_RESOLVE_BATCH_SIZE
+tickets, in the lead ticket's transaction.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import DateTimeField, F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import tracking
+from .models import Incident, Ticket, TicketHistory
+from .outbox import enqueue_emails
+from .utils import resolved_email
+
+FINISHING_STATUSES = ('RESOLVED', 'CLOSED')
+
+
+def _key(region, feeder):
+    return (region or "").strip().lower(), (feeder or "").strip().lower()
+
+
+def coalesces(category, region):
+    """Whether complaints in `category` from `region` are grouped into incidents."""
+    return bool(category and category.coalesce_incidents and _key(region, "")[0])
+
+
+def match(category, region, feeder=""):
+    """The open incident a new complaint belongs to, locked, or None."""
+    if not coalesces(category, region):
+        return None
+    region, feeder = _key(region, feeder)
+    since = timezone.now() - timedelta(minutes=settings.INCIDENT_WINDOW_MINUTES)
+    return (
+        Incident.objects.filter(
+            category=category, region=region, feeder=feeder, last_report_at__gte=since,
+            resolved_at__isnull=True, lead_ticket__status__in=Ticket.OPEN_STATUSES,
+        )
+        .select_for_update(of=('self',))
+        .order_by('-last_report_at')
+        .first()
+    )
+
+
+def start(ticket, region, feeder=""):
+    """A new incident led by `ticket`, if its category coalesces; else None."""
+    if not coalesces(ticket.category, region):
+        return None
+    region, feeder = _key(region, feeder)
+    return Incident.objects.create(
+        category=ticket.category, region=region, feeder=feeder, lead_ticket=ticket,
+        opened_at=ticket.created_at, last_report_at=ticket.created_at,
+    )
+
+
+def attach(incident, ticket):
+    """Count `ticket`, created with incident=`incident`, as one more report."""
+    Incident.objects.filter(pk=incident.pk).update(
+        report_count=F('report_count') + 1, last_report_at=ticket.created_at,
+    )
+
+
+def led_by(ticket):
+    """The incident `ticket` leads, or None (use select_related('led_incident'))."""
+    try:
+        return ticket.led_incident
+    except (AttributeError, ObjectDoesNotExist):
+        return None
+
+
+def resolve(incident, status, staff=None, comment="", batch_size=None):
+    """
+    Give every open ticket of `incident` the lead ticket's new status
+    (RESOLVED or CLOSED) and close the incident. Call in the lead ticket's
+    transaction. Returns the number of tickets changed.
+    """
+    batch_size = batch_size or settings.INCIDENT_RESOLVE_BATCH_SIZE
+    now = timezone.now()
+    comment = comment or f"{status.title()} with incident #{incident.pk}"
+    fields = {'status': status, 'updated_at': now}
+    if status == 'RESOLVED':
+        fields['resolved_at'] = Coalesce('resolved_at', Value(now, output_field=DateTimeField()))
+
+    pending = Ticket.objects.filter(incident=incident, status__in=Ticket.OPEN_STATUSES)
+    changed = 0
+    while True:
+        batch = list(
+            pending.select_related('customer').select_for_update(of=('self',)).order_by('pk')[:batch_size]
+        )
+        if not batch:
+            break
+        changes, history = [], []
+        for ticket in batch:
+            before = tracking.snapshot(ticket)
+            ticket.status = status
+            ticket.updated_at = now
+            if status == 'RESOLVED' and ticket.resolved_at is None:
+                ticket.resolved_at = now
+            changes.append((before, ticket))
+            history.append(TicketHistory(
+                ticket=ticket,
+                from_staff=staff,
+                to_staff=staff,
+                action_type='RESOLVED' if status == 'RESOLVED' else 'STATUS_CHANGED',
+                comment=comment,
+            ))
+
+        Ticket.objects.filter(pk__in=[t.pk for t in batch]).update(**fields)
+        tracking.tickets_changed(changes)
+        TicketHistory.objects.bulk_create(history)
+        if status == 'RESOLVED':
+            enqueue_emails(resolved_email(ticket) for ticket in batch)
+        changed += len(batch)
+
+    Incident.objects.filter(pk=incident.pk).update(resolved_at=now)
+    incident.resolved_at = now
+    return changed
@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tickets.archive import archive, cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        "Move CLOSED tickets older than ARCHIVE_AFTER_DAYS, with their history, "
+        "into the archive tables. Each batch is one transaction; rerun to resume."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+            help="Archive tickets created more than this many days ago.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE,
+            help="Tickets moved per transaction.",
+        )
+        parser.add_argument('--max-batches', type=int, help="Stop after this many batches.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Archiving CLOSED tickets created before {cutoff(options['days']):%Y-%m-%d}")
+        started = time.perf_counter()
+        total = 0
+        for moved in archive(options['days'], options['batch_size'], options['max_batches']):
+            total += moved
+            self.stdout.write(f"  {total} archived ({time.perf_counter() - started:.1f}s)")
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} tickets"))
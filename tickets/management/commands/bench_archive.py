@@ -0,0 +1,85 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from tickets import archive, dashboard
+from tickets.models import Category, Customer, StaffUser, Ticket, TicketHistory
+from tickets.pagination import keyset_page
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the hot ticket queries with a large closed backlog, then again after "
+        "archiving it. Seeds tickets in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--closed', type=int, default=200000, help="Old CLOSED tickets to seed.")
+        parser.add_argument('--open', type=int, default=5000, help="Recent open tickets to seed.")
+        parser.add_argument('--repeat', type=int, default=20, help="Runs per query.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            staff, open_id = self.seed(options['closed'], options['open'])
+            queries = [
+                ("staff queue page", lambda: list(keyset_page(
+                    Ticket.objects.filter(current_assigned_to=staff).select_related('customer', 'category'),
+                    None, 50,
+                )[0])),
+                ("dashboard compute", lambda: dashboard.compute(Ticket.objects.all())),
+                ("ticket lookup", lambda: archive.find_ticket(open_id)),
+                ("ticket count", lambda: Ticket.objects.count()),
+            ]
+            before = {name: self.time(query, options['repeat']) for name, query in queries}
+
+            started = time.perf_counter()
+            moved = sum(archive.archive(days=30))
+            self.stdout.write(f"Archived {moved} tickets in {time.perf_counter() - started:.1f}s")
+
+            self.stdout.write(f"{'query':<20} {'before ms':>10} {'after ms':>10}")
+            for name, query in queries:
+                after = self.time(query, options['repeat'])
+                self.stdout.write(f"{name:<20} {before[name]:>10.2f} {after:>10.2f}")
+            transaction.set_rollback(True)
+
+    def seed(self, closed, open_count):
+        user = User.objects.create(username="bench-archive")
+        staff = StaffUser.objects.create(user=user, role="Bench", region="Bench")
+        category = Category.objects.create(name="Bench", default_first_level_role="Bench")
+        customers = Customer.objects.bulk_create([
+            Customer(name=f"Customer {n}", email=f"archive{n}@example.com", phone=f"0805{n:07d}")
+            for n in range(max(1, (closed + open_count) // 5))
+        ])
+        old = timezone.now() - timedelta(days=400)
+        for start in range(0, closed + open_count, 5000):
+            rows = []
+            for n in range(start, min(start + 5000, closed + open_count)):
+                is_closed = n < closed
+                rows.append(Ticket(
+                    ticket_id=f"BENCH-{n:07d}",
+                    customer=customers[n % len(customers)],
+                    category=category,
+                    description="Bench ticket",
+                    status='CLOSED' if is_closed else 'IN_PROGRESS',
+                    current_assigned_to=staff,
+                    resolved_at=old if is_closed else None,
+                ))
+            tickets = Ticket.objects.bulk_create(rows)
+            TicketHistory.objects.bulk_create([
+                TicketHistory(ticket=t, to_staff=staff, action_type='ASSIGNED', comment="Bench")
+                for t in tickets
+            ])
+        # created_at is auto_now_add, so backdate the closed ones afterwards.
+        Ticket.objects.filter(category=category, status='CLOSED').update(created_at=old, updated_at=old)
+        self.stdout.write(f"Seeded {closed} closed and {open_count} open tickets")
+        return staff, f"BENCH-{closed:07d}"
+
+    def time(self, query, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            query()
+        return (time.perf_counter() - start) / repeat * 1000
@@ -0,0 +1,92 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.test.utils import CaptureQueriesContext
+
+from tickets.assignment import get_strategy
+from tickets.models import Category, Customer, StaffUser, StaffWorkload, Ticket
+
+ROLE = "Bench Officer"
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark automatic assignment as staff and ticket counts grow, against "
+        "counting open tickets per officer. Runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default="10,100,1000",
+            help="Comma-separated staff counts to benchmark.",
+        )
+        parser.add_argument(
+            '--tickets-per-staff', type=int, default=20,
+            help="Open tickets seeded per officer.",
+        )
+        parser.add_argument('--picks', type=int, default=200, help="Assignments timed per size.")
+
+    def handle(self, *args, **options):
+        sizes = [int(n) for n in options['sizes'].split(",")]
+        self.stdout.write(
+            f"{'staff':>8} {'tickets':>10} {'engine ms':>10} {'queries':>8} {'count ms':>10}"
+        )
+        for size in sizes:
+            with transaction.atomic():
+                tickets = self.seed(size, options['tickets_per_staff'])
+                engine_ms, queries = self.time_engine(options['picks'])
+                count_ms = self.time_count_baseline(options['picks'])
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f"{size:>8} {tickets:>10} {engine_ms:>10.3f} {queries:>8.1f} {count_ms:>10.3f}"
+            )
+
+    def seed(self, staff_count, tickets_per_staff):
+        users = User.objects.bulk_create([
+            User(username=f"bench-{staff_count}-{n}") for n in range(staff_count)
+        ])
+        staff = StaffUser.objects.bulk_create([
+            StaffUser(user=user, role=ROLE, region=f"Region {n % 5}")
+            for n, user in enumerate(users)
+        ])
+        StaffWorkload.objects.bulk_create([
+            StaffWorkload(staff=member, status='NEW', ticket_count=tickets_per_staff)
+            for member in staff
+        ])
+        customer = Customer.objects.create(name="Bench", email="bench@example.com", phone="0")
+        category = Category.objects.create(name="Bench", default_first_level_role=ROLE)
+        rows = [
+            Ticket(
+                ticket_id=f"BENCH-{staff_count}-{n}", customer=customer, category=category,
+                description="bench", current_assigned_to=staff[n % staff_count],
+            )
+            for n in range(staff_count * tickets_per_staff)
+        ]
+        Ticket.objects.bulk_create(rows, batch_size=2000)
+        return len(rows)
+
+    def time_engine(self, picks):
+        strategy = get_strategy()
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            for n in range(picks):
+                strategy.pick(ROLE, region=f"Region {n % 5}")
+            elapsed = time.perf_counter() - start
+        return elapsed / picks * 1000, len(ctx.captured_queries) / picks
+
+    def time_count_baseline(self, picks):
+        start = time.perf_counter()
+        for n in range(picks):
+            (
+                StaffUser.objects.filter(role=ROLE, region=f"Region {n % 5}")
+                .annotate(open=Count(
+                    'assigned_tickets',
+                    filter=Q(assigned_tickets__status__in=Ticket.OPEN_STATUSES),
+                ))
+                .order_by('open', 'id')
+                .first()
+            )
+        return (time.perf_counter() - start) / picks * 1000
@@ -0,0 +1,88 @@
+import json
+import platform
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from tickets import benchmark
+from tickets.models import StaffUser, Ticket
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every route in tickets.urls in-process with the test client, or against a "
+        "running deployment with --url, and report p50/p95/p99 latency, requests per second "
+        "and SQL queries per request. Run manage.py seed_load first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help="Requests per route.")
+        parser.add_argument('--route', action='append', help="Only these routes (repeatable).")
+        parser.add_argument('--username', help="Staff member to log in as (default: busiest supervisor).")
+        parser.add_argument(
+            '--url', help="Base URL of a running deployment, e.g. http://127.0.0.1:8000; "
+                          "default is in-process.",
+        )
+        parser.add_argument('--concurrency', type=int, default=10, help="Simultaneous clients with --url.")
+        parser.add_argument('--password', default="loadtest", help="Staff password for --url.")
+        parser.add_argument(
+            '--writes', action='store_true',
+            help="Include routes that create data with --url (in-process they are rolled back).",
+        )
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+        parser.add_argument('--compare', help="A previous --output file to compare p95 and queries with.")
+
+    def handle(self, *args, **options):
+        try:
+            if options['username']:
+                staff = StaffUser.objects.select_related('user').get(user__username=options['username'])
+            else:
+                staff = benchmark.default_staff()
+            routes = benchmark.selected(options['route'], writes=not options['url'] or options['writes'])
+            if options['url']:
+                results = benchmark.run_http(
+                    options['url'], routes, options['requests'], options['concurrency'],
+                    staff, options['password'],
+                )
+            else:
+                results = benchmark.run_client(routes, options['requests'], staff)
+        except StaffUser.DoesNotExist:
+            raise CommandError(f"No staff member {options['username']}")
+        except benchmark.BenchmarkError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(
+            f"{'route':<24} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'queries':>8} {'errors':>7}"
+        )
+        for r in results:
+            queries = '-' if r['queries_per_request'] is None else r['queries_per_request']
+            self.stdout.write(
+                f"{r['route']:<24} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} "
+                f"{r['requests_per_second']:>8.1f} {queries:>8} {r['errors']:>7}"
+            )
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                previous = json.load(f)['routes']
+            self.stdout.write(f"\n{'route':<24} {'p95 before':>11} {'p95 after':>10} {'queries':>16}")
+            for route, p95_before, p95_after, q_before, q_after in benchmark.compare(previous, results):
+                self.stdout.write(
+                    f"{route:<24} {p95_before:>11.1f} {p95_after:>10.1f} {f'{q_before} -> {q_after}':>16}"
+                )
+
+        if options['output']:
+            run = {
+                'started_at': datetime.now(timezone.utc).isoformat(),
+                'mode': 'http' if options['url'] else 'client',
+                'url': options['url'],
+                'concurrency': options['concurrency'] if options['url'] else 1,
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'tickets': Ticket.objects.count(),
+                'staff': staff.user.username,
+                'routes': results,
+            }
+            with open(options['output'], 'w') as f:
+                json.dump(run, f, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
@@ -0,0 +1,67 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from tickets import search
+from tickets.models import Category, Customer, Ticket
+
+WORDS = (
+    "no light since yesterday transformer fault estimated bill too high meter bypass "
+    "prepaid token rejected low voltage feeder tripped pole fell wire sparking"
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare indexed full-text search with the icontains scan used by the admin. "
+        "Seeds tickets in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickets', type=int, default=50000, help="Tickets to seed.")
+        parser.add_argument('--repeat', type=int, default=20, help="Runs per query.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options['tickets'])
+            queries = ["transformer", "Customer 4211", "MTR-0042", "sparking wire"]
+            indexed = search.get_backend()
+            scan = search.IContainsBackend()
+
+            self.stdout.write(f"{'query':<16} {'index ms':>10} {'icontains ms':>14}")
+            for query in queries:
+                index_ms = self.time(indexed, query, options['repeat'])
+                scan_ms = self.time(scan, query, options['repeat'])
+                self.stdout.write(f"{query:<16} {index_ms:>10.2f} {scan_ms:>14.2f}")
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        rng = random.Random(42)
+        category = Category.objects.create(name="Bench", default_first_level_role="Bench")
+        customers = Customer.objects.bulk_create([
+            Customer(
+                name=f"Customer {n}", email=f"customer{n}@example.com", phone=f"0803{n:07d}",
+                meter_number=f"MTR-{n:04d}",
+            )
+            for n in range(count // 5)
+        ])
+        for start in range(0, count, 5000):
+            tickets = Ticket.objects.bulk_create([
+                Ticket(
+                    ticket_id=f"BENCH-{n:07d}",
+                    customer=customers[n % len(customers)],
+                    category=category,
+                    description=" ".join(rng.choices(WORDS, k=12)),
+                )
+                for n in range(start, min(start + 5000, count))
+            ])
+            search.index_tickets([t.pk for t in tickets])
+        self.stdout.write(f"Seeded and indexed {count} tickets")
+
+    def time(self, backend, query, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            backend.search_ids(query, 20, 0)
+        return (time.perf_counter() - start) / repeat * 1000
@@ -0,0 +1,101 @@
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from tickets import benchmark
+from tickets.models import StaffUser
+
+PAGES = (
+    ('login', 'login', False),
+    ('complaint form', 'create_complaint', False),
+    ('dashboard', 'dashboard', True),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Bytes transferred for the login, complaint form and dashboard pages and their static "
+        "assets: uncompressed and revalidated on every visit (before) against precompressed "
+        "with immutable caching (after). Run collectstatic first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help="Staff member for the dashboard (default: busiest supervisor).")
+
+    def handle(self, *args, **options):
+        if not staticfiles_storage.exists(staticfiles_storage.manifest_name):
+            raise CommandError("No static manifest; run manage.py collectstatic first.")
+        try:
+            if options['username']:
+                staff = StaffUser.objects.select_related('user').get(user__username=options['username'])
+            else:
+                staff = benchmark.default_staff()
+        except StaffUser.DoesNotExist:
+            raise CommandError(f"No staff member {options['username']}")
+        except benchmark.BenchmarkError as exc:
+            raise CommandError(str(exc))
+
+        try:
+            setup_test_environment()
+            owns_environment = True
+        except RuntimeError:
+            owns_environment = False
+        try:
+            with override_settings(DEBUG=False, SERVE_STATIC_ASSETS=True):
+                rows = [self.measure(label, reverse(name), staff if login else None)
+                        for label, name, login in PAGES]
+        finally:
+            if owns_environment:
+                teardown_test_environment()
+
+        self.stdout.write(
+            f"{'page':<16} {'html':>8} {'assets':>7} {'first visit before':>19} {'after':>9} "
+            f"{'repeat requests before':>23} {'after':>6}"
+        )
+        for r in rows:
+            self.stdout.write(
+                f"{r['page']:<16} {r['html']:>8} {r['assets']:>7} {r['before']:>19} {r['after']:>9} "
+                f"{r['revalidations_before']:>23} {r['revalidations_after']:>6}"
+            )
+        before = sum(r['before'] for r in rows)
+        after = sum(r['after'] for r in rows)
+        self.stdout.write(f"Total first visit: {before} -> {after} bytes ({1 - after / before:.0%} less)")
+
+    def measure(self, label, url, staff):
+        """Body bytes of one page and its assets, and asset requests on a repeat visit."""
+        client = Client()
+        if staff is not None:
+            client.force_login(staff.user)
+        page = client.get(url, secure=True)
+        if page.status_code != 200:
+            raise CommandError(f"{url} returned {page.status_code}")
+        html = len(page.content)
+        pattern = r'(?:href|src)="(%s[^"]+)"' % re.escape(settings.STATIC_URL)
+        assets = sorted(set(re.findall(pattern, page.content.decode())))
+
+        before = after = html
+        revalidations_after = 0
+        for asset in assets:
+            plain = client.get(asset, secure=True, HTTP_ACCEPT_ENCODING='identity')
+            compressed = client.get(asset, secure=True, HTTP_ACCEPT_ENCODING='br, gzip')
+            if plain.status_code != 200 or compressed.status_code != 200:
+                raise CommandError(f"{asset} is not served; is it in STATIC_ROOT?")
+            before += len(plain.content)
+            after += len(compressed.content)
+            if 'immutable' not in compressed.get('Cache-Control', ''):
+                revalidations_after += 1
+        return {
+            'page': label,
+            'html': html,
+            'assets': len(assets),
+            'before': before,
+            'after': after,
+            # Without immutable every asset is revalidated on the next visit.
+            'revalidations_before': len(assets),
+            'revalidations_after': revalidations_after,
+        }
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from tickets.customers import duplicate_groups, merge_customers
+from tickets.models import Customer
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge customers that share a normalised email, phone, account or meter number. "
+        "The oldest customer of each group keeps the tickets of the others."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report the groups without merging.")
+
+    def handle(self, *args, **options):
+        rows = Customer.objects.only(
+            'pk', 'email', 'phone', 'account_number', 'meter_number'
+        ).order_by('pk').iterator(chunk_size=2000)
+        groups = duplicate_groups(rows)
+
+        merged = moved = 0
+        for survivor_id, *duplicate_ids in groups:
+            self.stdout.write(f"Customer {survivor_id} <- {', '.join(map(str, duplicate_ids))}")
+            if not options['dry_run']:
+                moved += merge_customers(survivor_id, duplicate_ids)
+            merged += len(duplicate_ids)
+
+        if options['dry_run']:
+            self.stdout.write(f"{merged} duplicate customers in {len(groups)} groups (dry run)")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Merged {merged} duplicate customers into {len(groups)}, moving {moved} tickets"
+            ))
@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tickets.outbox import deliver_batch
+
+
+class Command(BaseCommand):
+    help = "Send queued customer emails from the outbox in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 100),
+            help="Emails sent per SMTP connection.",
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="Keep polling for new emails instead of exiting once the outbox is empty.",
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5.0,
+            help="Seconds to sleep between polls when the outbox is empty (with --loop).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total_sent = total_failed = 0
+
+        while True:
+            sent, failed = deliver_batch(batch_size)
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}")
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Outbox drained: {total_sent} sent, {total_failed} failed"
+        ))
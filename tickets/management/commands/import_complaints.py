@@ -0,0 +1,83 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tickets.importer import ComplaintImporter, RecordError, read_records
+from tickets.models import ImportCheckpoint
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream complaints from a CSV or JSONL file into tickets in chunked transactions. "
+        "Progress is checkpointed in the database with every chunk so a failed run can be resumed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV (with a header row) or JSONL file.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Default: from the file extension.")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Records per transaction.")
+        parser.add_argument(
+            '--checkpoint',
+            help="Checkpoint name (default: the file's absolute path). Deleted after a complete run.",
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help="Ignore an existing checkpoint and import from the first record.",
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f"{path} does not exist")
+        source = options['checkpoint'] or os.path.abspath(path)
+        chunk_size = options['chunk_size']
+
+        done = 0
+        if options['restart']:
+            ImportCheckpoint.objects.filter(source=source).delete()
+        else:
+            done = ImportCheckpoint.objects.filter(source=source).values_list('records_done', flat=True).first() or 0
+            if done:
+                self.stdout.write(f"Resuming after record {done}")
+
+        importer = ComplaintImporter()
+        imported = rejected = 0
+        chunk = []
+        last_number = done
+        started = time.perf_counter()
+
+        def flush():
+            nonlocal imported
+            if chunk:
+                importer.import_chunk(chunk, source=source, records_done=last_number)
+                imported += len(chunk)
+                chunk.clear()
+            else:
+                # Nothing to write (all rejected); only the position moves.
+                importer.save_checkpoint(source, last_number)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{last_number} records read, {imported} imported, {rejected} rejected "
+                f"({imported / elapsed if elapsed else 0:.0f} rows/s)"
+            )
+
+        for number, record in read_records(path, options['format']):
+            if number <= done:
+                continue
+            try:
+                chunk.append(importer.clean(record))
+            except RecordError as exc:
+                rejected += 1
+                self.stderr.write(f"Record {number} rejected: {exc}")
+            last_number = number
+            if len(chunk) >= chunk_size:
+                flush()
+        flush()
+
+        ImportCheckpoint.objects.filter(source=source).delete()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} complaints ({rejected} rejected) in {elapsed:.1f}s, "
+            f"{imported / elapsed if elapsed else 0:.0f} rows/s"
+        ))
@@ -0,0 +1,112 @@
+import http.cookiejar
+import json
+import re
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+CATEGORY_RE = re.compile(r'<option value="(\d+)"')
+SUCCESS_MARKER = b"Your Ticket ID is"
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test public complaint submission over HTTP against one or more running "
+        "deployments, e.g. the same box served by gunicorn (WSGI) and by uvicorn (ASGI), "
+        "and report submissions per second and latency for each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', action='append', required=True,
+            help="label=base URL, e.g. wsgi=http://127.0.0.1:8000. Repeat to compare deployments.",
+        )
+        parser.add_argument('--requests', type=int, default=500, help="Submissions per deployment.")
+        parser.add_argument('--concurrency', type=int, default=50, help="Simultaneous clients.")
+        parser.add_argument('--json', action='store_true', help="Print one JSON object per deployment.")
+
+    def handle(self, *args, **options):
+        targets = []
+        for value in options['url']:
+            label, sep, url = value.partition('=')
+            if not sep:
+                label, url = value, value
+            targets.append((label, url.rstrip('/')))
+
+        for label, url in targets:
+            result = self.run(url, options['requests'], options['concurrency'])
+            result['deployment'] = label
+            if options['json']:
+                self.stdout.write(json.dumps(result))
+            else:
+                self.stdout.write(
+                    f"{label:<8} {result['ok']}/{result['requests']} ok in {result['seconds']:.1f}s: "
+                    f"{result['submissions_per_second']:.1f} submissions/s, "
+                    f"p50 {result['p50_ms']:.0f} ms, p95 {result['p95_ms']:.0f} ms, "
+                    f"p99 {result['p99_ms']:.0f} ms"
+                )
+
+    def run(self, base_url, total, concurrency):
+        form_url = f"{base_url}/new/"
+        run_id = uuid.uuid4().hex[:8]
+        local = threading.local()
+
+        def client():
+            # One cookie jar (CSRF cookie) and form token per client thread.
+            if not hasattr(local, 'opener'):
+                jar = http.cookiejar.CookieJar()
+                local.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+                page = local.opener.open(form_url, timeout=30).read().decode()
+                token, category = CSRF_RE.search(page), CATEGORY_RE.search(page)
+                if not token or not category:
+                    raise CommandError(f"{form_url} did not return the complaint form")
+                local.token, local.category = token.group(1), category.group(1)
+            return local
+
+        def submit(n):
+            state = client()
+            data = urllib.parse.urlencode({
+                'csrfmiddlewaretoken': state.token,
+                'name': f"Load Test {n}",
+                'email': f"loadtest-{run_id}-{n}@example.com",
+                'phone': f"0809{n:07d}",
+                'category': state.category,
+                'description': "Load test submission",
+            }).encode()
+            request = urllib.request.Request(form_url, data=data, headers={'Referer': form_url})
+            start = time.perf_counter()
+            try:
+                with state.opener.open(request, timeout=60) as response:
+                    # An invalid form is re-rendered with a 200 too.
+                    ok = SUCCESS_MARKER in response.read()
+            except urllib.error.URLError:
+                ok = False
+            return ok, time.perf_counter() - start
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(submit, range(total)))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(seconds * 1000 for _, seconds in results)
+        cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        ok = sum(1 for success, _ in results if success)
+        return {
+            'url': base_url,
+            'requests': total,
+            'concurrency': concurrency,
+            'ok': ok,
+            'seconds': round(elapsed, 3),
+            'submissions_per_second': round(ok / elapsed, 1) if elapsed else 0.0,
+            'p50_ms': round(cuts[49], 1),
+            'p95_ms': round(cuts[94], 1),
+            'p99_ms': round(cuts[98], 1),
+        }
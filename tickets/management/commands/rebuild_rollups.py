@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from tickets.dashboard import ticket_data_changed
+from tickets.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill or rebuild the dashboard's daily rollups from the Ticket table. "
+        "Without --start/--end every day is rebuilt."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First day to rebuild (YYYY-MM-DD).")
+        parser.add_argument('--end', help="Last day to rebuild (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        bounds = {}
+        for name in ('start', 'end'):
+            value = options[name]
+            if value:
+                try:
+                    bounds[name] = parse_date(value)
+                except ValueError:
+                    bounds[name] = None
+                if bounds[name] is None:
+                    raise CommandError(f"--{name} must be YYYY-MM-DD, got {value!r}")
+
+        written = rebuild(**bounds)
+        ticket_data_changed()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} rollup rows"))
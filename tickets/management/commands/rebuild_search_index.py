@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from tickets.search import rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index over tickets and customers."
+
+    def handle(self, *args, **options):
+        indexed = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} tickets"))
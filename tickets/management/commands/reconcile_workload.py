@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from tickets import workload
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the open-ticket counters (per staff member and per category, by status) "
+        "with a fresh count, and repair any drift."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without repairing it.")
+
+    def handle(self, *args, **options):
+        drift = workload.check() if options['dry_run'] else workload.reconcile()
+        for row in drift:
+            self.stdout.write(
+                f"  {row.counter} #{row.key} {row.status}: recorded {row.recorded}, actual {row.actual}"
+            )
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Workload counters match the tickets"))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"{len(drift)} counters have drifted"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {len(drift)} counters"))
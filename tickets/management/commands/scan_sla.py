@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tickets.sla import scan
+
+
+class Command(BaseCommand):
+    help = "Escalate open tickets that have passed their category's SLA, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.SLA_SCAN_BATCH_SIZE,
+            help="Tickets escalated per transaction.",
+        )
+        parser.add_argument('--loop', action='store_true', help="Keep scanning instead of exiting.")
+        parser.add_argument(
+            '--interval', type=float, default=60.0,
+            help="Seconds between scans (with --loop).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            escalated = scan(options['batch_size'])
+            self.stdout.write(
+                f"Escalated {escalated} tickets past their SLA "
+                f"({(time.perf_counter() - started) * 1000:.0f} ms)"
+            )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
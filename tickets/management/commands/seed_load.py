@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from tickets.seeding import seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a production-shaped dataset (customers, staff, tickets and their history) "
+        "with bulk inserts, and rebuild the search index and dashboard rollups for it. "
+        "Adds to whatever is already in the database; point it at a dev or staging database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=20000)
+        parser.add_argument('--staff', type=int, default=200)
+        parser.add_argument('--tickets', type=int, default=100000)
+        parser.add_argument('--history', type=int, default=2, help="Average follow-up entries per ticket.")
+        parser.add_argument('--days', type=int, default=365, help="Spread tickets over this many days.")
+        parser.add_argument(
+            '--password', default="loadtest",
+            help="Password for the generated staff (load-staff-N), for bench_routes --url.",
+        )
+        parser.add_argument('--random-seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=2000, help="Rows per bulk insert.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(message):
+            self.stdout.write(f"  {message} ({time.perf_counter() - started:.1f}s)")
+
+        with transaction.atomic():
+            counts = seed(
+                customers=options['customers'], staff=options['staff'], tickets=options['tickets'],
+                history=options['history'], days=options['days'], password=options['password'],
+                random_seed=options['random_seed'], batch_size=options['batch_size'],
+                progress=progress,
+            )
+        self.stdout.write(self.style.SUCCESS(
+            "Seeded " + ", ".join(f"{count} {name}" for name, count in counts.items())
+            + f" in {time.perf_counter() - started:.1f}s"
+        ))
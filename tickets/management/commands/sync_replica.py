@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from tickets.routing import replica_alias
+
+SQLITE = "django.db.backends.sqlite3"
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the default SQLite database over the SQLite file configured as the read "
+        "replica (DJANGO_REPLICA_DB_NAME), to try replica routing locally. Real "
+        "replicas are kept up to date by database replication."
+    )
+
+    def handle(self, *args, **options):
+        alias = replica_alias()
+        if alias is None:
+            raise CommandError("No replica configured; set DJANGO_REPLICA_DB_NAME.")
+        if {settings.DATABASES[a]['ENGINE'] for a in (DEFAULT_DB_ALIAS, alias)} != {SQLITE}:
+            raise CommandError("sync_replica only copies SQLite to SQLite; use database replication.")
+
+        connections[alias].close()
+        source = connections[DEFAULT_DB_ALIAS]
+        source.ensure_connection()
+        target = connections[alias]
+        target.ensure_connection()
+        source.connection.backup(target.connection)
+        target.close()
+        self.stdout.write(self.style.SUCCESS(
+            f"Copied {settings.DATABASES[DEFAULT_DB_ALIAS]['NAME']} to {settings.DATABASES[alias]['NAME']}"
+        ))
@@ -0,0 +1,45 @@
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from tickets import feed
+
+
+class Command(BaseCommand):
+    help = "Print ticket history events after a cursor as JSON lines, optionally following new ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cursor', type=int, default=None,
+                            help="Start after this event id (default 0, or the --cursor-file's value).")
+        parser.add_argument('--cursor-file', type=Path, default=None,
+                            help="Read the starting cursor from, and save progress to, this file.")
+        parser.add_argument('--limit', type=int, default=settings.FEED_PAGE_SIZE,
+                            help="Events per page.")
+        parser.add_argument('--follow', '-f', action='store_true',
+                            help="Keep polling for new events instead of exiting when caught up.")
+        parser.add_argument('--interval', type=float, default=settings.FEED_POLL_SECONDS,
+                            help="Seconds between polls when caught up (with --follow).")
+
+    def handle(self, *args, **options):
+        path = options['cursor_file']
+        cursor = options['cursor']
+        if cursor is None:
+            cursor = int(path.read_text().strip() or 0) if path and path.exists() else 0
+
+        while True:
+            events, cursor, has_more = feed.page(cursor, options['limit'])
+            for event in events:
+                self.stdout.write(json.dumps(event, cls=DjangoJSONEncoder))
+            if events and path:
+                # Saved after the page is written: a restart repeats at most one page.
+                path.write_text(f"{cursor}\n")
+            if has_more:
+                continue
+            if not options['follow']:
+                break
+            time.sleep(options['interval'])
+        self.stderr.write(f"Caught up at cursor {cursor}")
@@ -0,0 +1,119 @@
+# tickets/middleware.py
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger('tickets.perf')
+
+# The metrics of the request being served. A context variable rather than a
+# per-connection wrapper, because async views run their queries on
+# sync_to_async threads, whose connections the middleware never sees; the
+# context is copied into those threads.
+_current_metrics = ContextVar('query_metrics', default=None)
+
+
+class QueryMetrics:
+    """execute_wrapper that counts and times every SQL statement."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_sql = ""
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.total += elapsed
+            if elapsed >= self.slowest:
+                self.slowest = elapsed
+                self.slowest_sql = sql
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """connection_created handler: every connection reports to the current request."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class QueryMetricsMiddleware:
+    """
+    Record the number of SQL queries, total DB time and the slowest
+    statement for every request.
+
+    The numbers are returned as `Server-Timing` metrics (visible in the
+    browser's network panel) and logged as one JSON line on the
+    `tickets.perf` logger: INFO normally, WARNING once a request goes over
+    QUERY_METRICS_WARN_QUERIES or QUERY_METRICS_WARN_DB_MS.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = QueryMetrics()
+        token = _current_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.report(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        metrics = QueryMetrics()
+        token = _current_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.report(request, response, metrics, time.perf_counter() - start)
+
+    def report(self, request, response, metrics, elapsed):
+        db_ms = metrics.total * 1000
+        response['Server-Timing'] = ", ".join([
+            f'db;dur={db_ms:.1f};desc="{metrics.count} queries"',
+            f'db-slowest;dur={metrics.slowest * 1000:.1f}',
+            f'app;dur={elapsed * 1000:.1f}',
+        ])
+
+        over_budget = (
+            metrics.count > getattr(settings, 'QUERY_METRICS_WARN_QUERIES', 50)
+            or db_ms > getattr(settings, 'QUERY_METRICS_WARN_DB_MS', 500)
+        )
+        level = logging.WARNING if over_budget else logging.INFO
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round(elapsed * 1000, 1),
+                'queries': metrics.count,
+                'db_ms': round(db_ms, 1),
+                'slowest_ms': round(metrics.slowest * 1000, 1),
+                'slowest_sql': metrics.slowest_sql[:500],
+            }))
+        return response
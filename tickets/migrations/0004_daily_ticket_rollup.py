@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0003_email_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTicketRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('NEW', 'New'), ('IN_PROGRESS', 'In Progress'), ('ESCALATED', 'Escalated'), ('RESOLVED', 'Resolved'), ('CLOSED', 'Closed')], max_length=20)),
+                ('category_key', models.PositiveBigIntegerField(default=0)),
+                ('ticket_count', models.IntegerField(default=0)),
+                ('resolved_count', models.IntegerField(default=0)),
+                ('resolution_seconds', models.FloatField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'status', 'category_key'), name='rollup_unique_key')],
+            },
+        ),
+    ]
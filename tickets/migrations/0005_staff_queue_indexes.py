@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0004_daily_ticket_rollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['current_assigned_to', 'status', 'created_at'], name='ticket_queue_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['current_assigned_to', 'created_at'], name='ticket_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+OPEN_STATUSES = ('NEW', 'IN_PROGRESS', 'ESCALATED')
+
+
+def count_open_tickets(apps, schema_editor):
+    StaffUser = apps.get_model('tickets', 'StaffUser')
+    Ticket = apps.get_model('tickets', 'Ticket')
+    counts = (
+        Ticket.objects.filter(status__in=OPEN_STATUSES, current_assigned_to__isnull=False)
+        .values('current_assigned_to')
+        .annotate(n=models.Count('id'))
+    )
+    for row in counts:
+        StaffUser.objects.filter(pk=row['current_assigned_to']).update(open_ticket_count=row['n'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0005_staff_queue_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='region',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='staffuser',
+            name='assignment_weight',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='staffuser',
+            name='last_assigned_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='staffuser',
+            name='open_ticket_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='staffuser',
+            index=models.Index(fields=['role', 'region', 'open_ticket_count'], name='staff_load_region_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='staffuser',
+            index=models.Index(fields=['role', 'open_ticket_count'], name='staff_load_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='staffuser',
+            index=models.Index(fields=['role', 'last_assigned_at'], name='staff_round_robin_idx'),
+        ),
+        migrations.RunPython(count_open_tickets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+from django.db import migrations
+
+
+SQLITE_CREATE = """
+CREATE VIRTUAL TABLE tickets_search USING fts5(
+    ticket_id, description, name, email, phone, account_number, meter_number,
+    tokenize = 'unicode61'
+)
+"""
+
+POSTGRES_CREATE = [
+    """
+    CREATE TABLE tickets_search (
+        ticket_pk bigint PRIMARY KEY REFERENCES tickets_ticket (id) ON DELETE CASCADE,
+        document tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX tickets_search_document_idx ON tickets_search USING gin (document)",
+]
+
+
+def create_search_table(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(SQLITE_CREATE)
+    elif vendor == 'postgresql':
+        for statement in POSTGRES_CREATE:
+            schema_editor.execute(statement)
+    else:
+        return
+
+    # Index what is already there; same documents as tickets.search builds.
+    Ticket = apps.get_model('tickets', 'Ticket')
+    rows = Ticket.objects.values_list(
+        'id', 'ticket_id', 'description', 'customer__name', 'customer__email',
+        'customer__phone', 'customer__account_number', 'customer__meter_number',
+    ).iterator(chunk_size=2000)
+    with schema_editor.connection.cursor() as cursor:
+        for pk, ticket_id, description, name, email, phone, account, meter in rows:
+            values = [v or "" for v in (ticket_id, description, name, email, phone, account, meter)]
+            if vendor == 'sqlite':
+                cursor.execute(
+                    "INSERT INTO tickets_search (rowid, ticket_id, description, name, email, "
+                    "phone, account_number, meter_number) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+                    [pk, *values],
+                )
+            else:
+                ticket_id, description, name, email, phone, account, meter = values
+                cursor.execute(
+                    "INSERT INTO tickets_search (ticket_pk, document) VALUES (%s, "
+                    "setweight(to_tsvector('simple', %s), 'A') || "
+                    "setweight(to_tsvector('simple', %s), 'B') || "
+                    "setweight(to_tsvector('simple', %s), 'C'))",
+                    [pk, " ".join([ticket_id, account, meter, phone, email]), name, description],
+                )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS tickets_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0006_assignment_workload'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:35
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# A frozen copy of tickets.customers.identity_keys as of this migration, so
+# later changes to the app code can't change what it does.
+def identity_keys(email=None, phone=None, account_number=None, meter_number=None):
+    digits = re.sub(r"\D", "", phone or "")
+    if digits.startswith("234") and len(digits) == 13:
+        digits = "0" + digits[3:]
+    elif len(digits) == 10 and not digits.startswith("0"):
+        digits = "0" + digits
+    values = {
+        'EMAIL': (email or "").strip().lower(),
+        'ACCOUNT': re.sub(r"[^0-9A-Z]", "", (account_number or "").upper()),
+        'METER': re.sub(r"[^0-9A-Z]", "", (meter_number or "").upper()),
+        'PHONE': digits if len(digits) >= 7 else "",
+    }
+    return [(kind, values[kind]) for kind in ('EMAIL', 'ACCOUNT', 'METER', 'PHONE') if values[kind]]
+
+
+def register_identities(apps, schema_editor):
+    """Give existing customers their keys; the oldest customer keeps a shared key."""
+    Customer = apps.get_model('tickets', 'Customer')
+    CustomerIdentity = apps.get_model('tickets', 'CustomerIdentity')
+    batch = []
+    for customer in Customer.objects.order_by('pk').iterator(chunk_size=2000):
+        keys = identity_keys(customer.email, customer.phone, customer.account_number, customer.meter_number)
+        batch.extend(CustomerIdentity(customer_id=customer.pk, kind=kind, value=value) for kind, value in keys)
+        if len(batch) >= 2000:
+            CustomerIdentity.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    CustomerIdentity.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0007_ticket_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customer',
+            name='email',
+            field=models.EmailField(db_index=True, max_length=254),
+        ),
+        migrations.CreateModel(
+            name='CustomerIdentity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('EMAIL', 'Email'), ('PHONE', 'Phone'), ('ACCOUNT', 'Account Number'), ('METER', 'Meter Number')], max_length=10)),
+                ('value', models.CharField(max_length=254)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='identities', to='tickets.customer')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'value'), name='customer_identity_unique')],
+            },
+        ),
+        migrations.RunPython(register_identities, migrations.RunPython.noop),
+    ]
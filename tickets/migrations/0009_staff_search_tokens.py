@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:39
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# A frozen copy of tickets.directory.staff_tokens as of this migration, so
+# later changes to the app code can't change what it does.
+def staff_tokens(staff):
+    user = staff.user
+    values = (user.first_name, user.last_name, user.username, staff.role, staff.department, staff.region)
+    text = " ".join(v for v in values if v).lower()
+    return sorted({w[:100] for w in re.findall(r"\w+", text, re.UNICODE)})
+
+
+def index_staff(apps, schema_editor):
+    StaffUser = apps.get_model('tickets', 'StaffUser')
+    StaffSearchToken = apps.get_model('tickets', 'StaffSearchToken')
+    batch = []
+    for staff in StaffUser.objects.select_related('user').iterator(chunk_size=1000):
+        batch.extend(StaffSearchToken(staff=staff, token=token) for token in staff_tokens(staff))
+        if len(batch) >= 2000:
+            StaffSearchToken.objects.bulk_create(batch)
+            batch = []
+    StaffSearchToken.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0008_customer_identity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaffSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=100)),
+                ('staff', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='tickets.staffuser')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'staff'], name='staff_token_prefix_idx')],
+            },
+        ),
+        migrations.RunPython(index_staff, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0009_staff_search_tokens'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tickethistory',
+            index=models.Index(fields=['ticket', 'id'], name='history_timeline_idx'),
+        ),
+    ]
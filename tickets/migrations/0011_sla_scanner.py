@@ -0,0 +1,69 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:44
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0010_history_timeline_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlaBreach',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('due_at', models.DateTimeField()),
+                ('breached_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SlaScanState',
+            fields=[
+                ('category_key', models.PositiveBigIntegerField(primary_key=True, serialize=False)),
+                ('last_created_at', models.DateTimeField()),
+                ('last_ticket_pk', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='escalation_role',
+            field=models.CharField(blank=True, default='Supervisor', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='sla_hours',
+            field=models.PositiveIntegerField(default=72),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['status', 'created_at'], name='ticket_status_age_idx'),
+        ),
+        migrations.AddField(
+            model_name='slabreach',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='tickets.category'),
+        ),
+        migrations.AddField(
+            model_name='slabreach',
+            name='escalated_from',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tickets.staffuser'),
+        ),
+        migrations.AddField(
+            model_name='slabreach',
+            name='escalated_to',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tickets.staffuser'),
+        ),
+        migrations.AddField(
+            model_name='slabreach',
+            name='ticket',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sla_breach', to='tickets.ticket'),
+        ),
+        migrations.AddIndex(
+            model_name='slabreach',
+            index=models.Index(fields=['breached_at'], name='sla_breach_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:47
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0011_sla_scanner'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTicket',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('ticket_id', models.CharField(max_length=30, unique=True)),
+                ('description', models.TextField()),
+                ('status', models.CharField(choices=[('NEW', 'New'), ('IN_PROGRESS', 'In Progress'), ('ESCALATED', 'Escalated'), ('RESOLVED', 'Resolved'), ('CLOSED', 'Closed')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('satisfaction_rating', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('satisfaction_comment', models.TextField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tickets.category')),
+                ('current_assigned_to', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tickets.staffuser')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_tickets', to='tickets.customer')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedTicketHistory',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('action_type', models.CharField(choices=[('ASSIGNED', 'Assigned'), ('ESCALATED', 'Escalated'), ('COMMENTED', 'Commented'), ('STATUS_CHANGED', 'Status Changed'), ('RESOLVED', 'Resolved')], max_length=20)),
+                ('comment', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('from_staff', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tickets.staffuser')),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history', to='tickets.archivedticket')),
+                ('to_staff', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tickets.staffuser')),
+            ],
+        ),
+    ]
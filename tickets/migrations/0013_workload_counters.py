@@ -0,0 +1,58 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+OPEN_STATUSES = ('NEW', 'IN_PROGRESS', 'ESCALATED')
+
+
+def count_open_tickets(apps, schema_editor):
+    Ticket = apps.get_model('tickets', 'Ticket')
+    StaffWorkload = apps.get_model('tickets', 'StaffWorkload')
+    CategoryWorkload = apps.get_model('tickets', 'CategoryWorkload')
+    open_tickets = Ticket.objects.filter(status__in=OPEN_STATUSES).order_by()
+    StaffWorkload.objects.bulk_create([
+        StaffWorkload(staff_id=row['current_assigned_to'], status=row['status'], ticket_count=row['n'])
+        for row in open_tickets.filter(current_assigned_to__isnull=False)
+        .values('current_assigned_to', 'status').annotate(n=Count('id'))
+    ])
+    CategoryWorkload.objects.bulk_create([
+        CategoryWorkload(category_key=row['category'] or 0, status=row['status'], ticket_count=row['n'])
+        for row in open_tickets.values('category', 'status').annotate(n=Count('id'))
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0012_ticket_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryWorkload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category_key', models.PositiveBigIntegerField(default=0)),
+                ('status', models.CharField(choices=[('NEW', 'New'), ('IN_PROGRESS', 'In Progress'), ('ESCALATED', 'Escalated'), ('RESOLVED', 'Resolved'), ('CLOSED', 'Closed')], max_length=20)),
+                ('ticket_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('category_key', 'status'), name='category_workload_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StaffWorkload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('NEW', 'New'), ('IN_PROGRESS', 'In Progress'), ('ESCALATED', 'Escalated'), ('RESOLVED', 'Resolved'), ('CLOSED', 'Closed')], max_length=20)),
+                ('ticket_count', models.IntegerField(default=0)),
+                ('staff', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='workload', to='tickets.staffuser')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('staff', 'status'), name='staff_workload_unique')],
+            },
+        ),
+        migrations.RunPython(count_open_tickets, migrations.RunPython.noop),
+    ]
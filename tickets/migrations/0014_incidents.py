@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def coalesce_feeder_categories(apps, schema_editor):
+    # Outage categories (handled by feeder engineers) start out coalescing.
+    Category = apps.get_model('tickets', 'Category')
+    Category.objects.filter(default_first_level_role="Feeder Engineer").update(coalesce_incidents=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0013_workload_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='coalesce_incidents',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='Incident',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(max_length=100)),
+                ('feeder', models.CharField(blank=True, default='', max_length=100)),
+                ('report_count', models.PositiveIntegerField(default=1)),
+                ('opened_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_report_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='incidents', to='tickets.category')),
+                ('lead_ticket', models.OneToOneField(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='led_incident', to='tickets.ticket')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='incident',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tickets', to='tickets.incident'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['category', 'region', 'feeder', 'last_report_at'], name='incident_match_idx'),
+        ),
+        migrations.RunPython(coalesce_feeder_categories, migrations.RunPython.noop),
+    ]
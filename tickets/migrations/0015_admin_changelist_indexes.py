@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0014_incidents'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['created_at'], name='ticket_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tickethistory',
+            index=models.Index(fields=['action_type', 'id'], name='history_action_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tickethistory',
+            index=models.Index(fields=['created_at'], name='history_created_idx'),
+        ),
+    ]
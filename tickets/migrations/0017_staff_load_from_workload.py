@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0016_import_checkpoint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='staffuser',
+            name='staff_load_region_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='staffuser',
+            name='staff_load_idx',
+        ),
+        migrations.RemoveField(
+            model_name='staffuser',
+            name='open_ticket_count',
+        ),
+        migrations.AddIndex(
+            model_name='staffuser',
+            index=models.Index(fields=['role', 'region'], name='staff_role_region_idx'),
+        ),
+    ]
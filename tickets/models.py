@@ -3,24 +3,59 @@ from django.db import models
 # Create your models here.
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class Customer(models.Model):
     name = models.CharField(max_length=150)
-    email = models.EmailField()
+    email = models.EmailField(db_index=True)
     phone = models.CharField(max_length=20)
     account_number = models.CharField(max_length=50, blank=True, null=True)
     meter_number = models.CharField(max_length=50, blank=True, null=True)
+    region = models.CharField(max_length=100, blank=True, null=True)
 
     def __str__(self):
         return f"{self.name} ({self.account_number or self.phone})"
 
 
+class CustomerIdentity(models.Model):
+    """
+    A normalised way of recognising a customer: email, phone, account or
+    meter number. Each key belongs to at most one customer, which is what
+    makes concurrent submissions from the same person resolve to one row.
+    See tickets.customers.
+    """
+    KIND_CHOICES = [
+        ('EMAIL', 'Email'),
+        ('PHONE', 'Phone'),
+        ('ACCOUNT', 'Account Number'),
+        ('METER', 'Meter Number'),
+    ]
+
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='identities')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    value = models.CharField(max_length=254)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'value'], name='customer_identity_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.value}"
+
+
 class Category(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True, null=True)
     # e.g. "Billing Officer", "Feeder Engineer", "RPD Officer"
     default_first_level_role = models.CharField(max_length=100)
+    # Hours a ticket may stay NEW or IN_PROGRESS before the SLA scanner
+    # escalates it to staff with `escalation_role` (tickets.sla).
+    sla_hours = models.PositiveIntegerField(default=72)
+    escalation_role = models.CharField(max_length=100, blank=True, default="Supervisor")
+    # Group complaints from one region/feeder into an Incident (tickets.incidents).
+    coalesce_incidents = models.BooleanField(default=False)
 
     def __str__(self):
         return self.name
@@ -31,11 +66,38 @@ class StaffUser(models.Model):
     role = models.CharField(max_length=100)
     department = models.CharField(max_length=100, blank=True, null=True)
     region = models.CharField(max_length=100, blank=True, null=True)
+    # Relative share of new tickets under the weighted assignment strategy.
+    assignment_weight = models.PositiveSmallIntegerField(default=1)
+    last_assigned_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['role', 'region'], name='staff_role_region_idx'),
+            models.Index(fields=['role', 'last_assigned_at'], name='staff_round_robin_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.role}"
 
 
+class StaffSearchToken(models.Model):
+    """
+    One lowercase word of a staff member's name, username, role, department
+    or region, so the escalation picker can match prefixes on an index.
+    Maintained by tickets.directory.
+    """
+    staff = models.ForeignKey(StaffUser, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=100)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['token', 'staff'], name='staff_token_prefix_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.token} -> {self.staff_id}"
+
+
 class Ticket(models.Model):
     STATUS_CHOICES = [
         ('NEW', 'New'),
@@ -44,6 +106,7 @@ class Ticket(models.Model):
         ('RESOLVED', 'Resolved'),
         ('CLOSED', 'Closed'),
     ]
+    OPEN_STATUSES = ('NEW', 'IN_PROGRESS', 'ESCALATED')
 
     ticket_id = models.CharField(max_length=30, unique=True)
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
@@ -61,11 +124,152 @@ class Ticket(models.Model):
     resolved_at = models.DateTimeField(null=True, blank=True)
     satisfaction_rating = models.PositiveSmallIntegerField(null=True, blank=True)
     satisfaction_comment = models.TextField(null=True, blank=True)
+    # Set on the tickets attached to an incident, not on the one leading it.
+    incident = models.ForeignKey(
+        'Incident', null=True, blank=True, on_delete=models.SET_NULL, related_name='tickets'
+    )
+
+    class Meta:
+        indexes = [
+            # Staff queue: one officer's tickets, optionally by status, newest first.
+            models.Index(
+                fields=['current_assigned_to', 'status', 'created_at'],
+                name='ticket_queue_status_idx',
+            ),
+            models.Index(
+                fields=['current_assigned_to', 'created_at'],
+                name='ticket_queue_idx',
+            ),
+            # SLA scanner and "oldest open tickets": a created_at range per status.
+            models.Index(fields=['status', 'created_at'], name='ticket_status_age_idx'),
+            # Admin changelist order and date hierarchy.
+            models.Index(fields=['created_at'], name='ticket_created_idx'),
+        ]
 
     def __str__(self):
         return self.ticket_id
 
 
+class Incident(models.Model):
+    """
+    One outage reported by many customers: complaints in the same category,
+    region and feeder within INCIDENT_WINDOW_MINUTES of each other. The
+    first complaint's ticket leads the incident and is the only one
+    assigned to staff; later ones are attached to it (Ticket.incident) and
+    are resolved with it. See tickets.incidents.
+    """
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='incidents')
+    # Lowercased, so "Ikeja" and "ikeja " report to the same incident.
+    region = models.CharField(max_length=100)
+    feeder = models.CharField(max_length=100, blank=True, default="")
+    lead_ticket = models.OneToOneField(
+        Ticket, null=True, on_delete=models.SET_NULL, related_name='led_incident'
+    )
+    report_count = models.PositiveIntegerField(default=1)
+    opened_at = models.DateTimeField(default=timezone.now)
+    last_report_at = models.DateTimeField(default=timezone.now)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Open incident for a new complaint: one key, most recent report.
+            models.Index(
+                fields=['category', 'region', 'feeder', 'last_report_at'], name='incident_match_idx',
+            ),
+        ]
+
+    def __str__(self):
+        where = f"{self.region}/{self.feeder}" if self.feeder else self.region
+        return f"Incident #{self.pk} {where} ({self.report_count} reports)"
+
+
+class TicketSequence(models.Model):
+    """
+    Per-year counter behind the DISCO-YYYY-XXXXXX ticket IDs.
+    `last_value` is the highest sequence number handed out so far.
+    """
+    year = models.PositiveSmallIntegerField(primary_key=True)
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.year}: {self.last_value}"
+
+
+class ImportCheckpoint(models.Model):
+    """
+    How far `import_complaints` has got through a source file. Saved in the
+    same transaction as each chunk, so a resumed run never imports a
+    committed chunk twice.
+    """
+    source = models.CharField(max_length=255, primary_key=True)
+    records_done = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source}: {self.records_done}"
+
+
+class DailyTicketRollup(models.Model):
+    """
+    Dashboard aggregates, one row per (creation day, current status, category).
+
+    `category_key` is the category id, or 0 for tickets without a category;
+    it is a plain integer so the unique key never contains NULL.
+    Maintained incrementally by tickets.tracking and rebuilt with
+    `manage.py rebuild_rollups`.
+    """
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=Ticket.STATUS_CHOICES)
+    category_key = models.PositiveBigIntegerField(default=0)
+    ticket_count = models.IntegerField(default=0)
+    resolved_count = models.IntegerField(default=0)
+    resolution_seconds = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'status', 'category_key'], name='rollup_unique_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status} #{self.category_key}: {self.ticket_count}"
+
+
+class StaffWorkload(models.Model):
+    """
+    Open tickets assigned to one staff member in one open status.
+    Maintained by tickets.tracking with F() updates in the same transaction
+    as the ticket change; checked and repaired by `manage.py reconcile_workload`.
+    """
+    staff = models.ForeignKey(StaffUser, on_delete=models.CASCADE, related_name='workload')
+    status = models.CharField(max_length=20, choices=Ticket.STATUS_CHOICES)
+    ticket_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['staff', 'status'], name='staff_workload_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.staff_id} {self.status}: {self.ticket_count}"
+
+
+class CategoryWorkload(models.Model):
+    """Open tickets per (category, open status); category_key 0 = no category."""
+    category_key = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=Ticket.STATUS_CHOICES)
+    ticket_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['category_key', 'status'], name='category_workload_unique'),
+        ]
+
+    def __str__(self):
+        return f"#{self.category_key} {self.status}: {self.ticket_count}"
+
+
 class TicketHistory(models.Model):
     ACTION_CHOICES = [
         ('ASSIGNED', 'Assigned'),
@@ -92,5 +296,148 @@ class TicketHistory(models.Model):
     comment = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Ticket timeline, newest first (tickets.timeline).
+            models.Index(fields=['ticket', 'id'], name='history_timeline_idx'),
+            # Admin changelist: action filter (newest first) and date hierarchy.
+            models.Index(fields=['action_type', 'id'], name='history_action_idx'),
+            models.Index(fields=['created_at'], name='history_created_idx'),
+        ]
+
+    def __str__(self):
+        # The ticket number only if the ticket is already loaded, never a query per row.
+        if TicketHistory.ticket.is_cached(self):
+            ticket = self.ticket.ticket_id
+        else:
+            ticket = f"#{self.ticket_id}"
+        return f"{ticket} - {self.action_type} - {self.created_at}"
+
+
+class EmailOutbox(models.Model):
+    """
+    Customer emails waiting to be delivered.
+    Rows are written in the same transaction as the ticket change that
+    triggered them and drained by `manage.py deliver_outbox`.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('DEAD', 'Dead'),
+    ]
+
+    ticket = models.ForeignKey(
+        Ticket,
+        null=True, blank=True,
+        on_delete=models.SET_NULL,
+        related_name='emails'
+    )
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, blank=True, null=True)
+    to = models.TextField(help_text="Comma-separated recipient addresses")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # When the row may next be picked up; also used as a lease while sending.
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def recipients(self):
+        return [addr.strip() for addr in self.to.split(',') if addr.strip()]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to} ({self.status})"
+
+
+class SlaBreach(models.Model):
+    """
+    A ticket the SLA scanner found past its category's target, and what it
+    did about it. Small by design: one row per breach, read by the dashboard.
+    """
+    ticket = models.OneToOneField(Ticket, on_delete=models.CASCADE, related_name='sla_breach')
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
+    due_at = models.DateTimeField()
+    breached_at = models.DateTimeField(default=timezone.now)
+    escalated_from = models.ForeignKey(
+        StaffUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    escalated_to = models.ForeignKey(
+        StaffUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['breached_at'], name='sla_breach_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ticket_id} breached {self.due_at:%Y-%m-%d %H:%M}"
+
+
+class SlaScanState(models.Model):
+    """
+    How far the SLA scanner has got per category (category_key 0 = none):
+    every ticket created at or before (last_created_at, last_ticket_pk) has
+    been checked, so each scan only reads tickets that aged past the target
+    since the previous one.
+    """
+    category_key = models.PositiveBigIntegerField(primary_key=True)
+    last_created_at = models.DateTimeField()
+    last_ticket_pk = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"#{self.category_key}: {self.last_created_at:%Y-%m-%d %H:%M} / {self.last_ticket_pk}"
+
+
+class ArchivedTicket(models.Model):
+    """
+    A CLOSED ticket moved out of the hot Ticket table by tickets.archive.
+    Same primary key and ticket_id as when it was live; read-only.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    ticket_id = models.CharField(max_length=30, unique=True)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='archived_tickets')
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='+')
+    description = models.TextField()
+    status = models.CharField(max_length=20, choices=Ticket.STATUS_CHOICES)
+    current_assigned_to = models.ForeignKey(
+        StaffUser, on_delete=models.SET_NULL, null=True, related_name='+'
+    )
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    satisfaction_rating = models.PositiveSmallIntegerField(null=True, blank=True)
+    satisfaction_comment = models.TextField(null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.ticket_id
+
+
+class ArchivedTicketHistory(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    ticket = models.ForeignKey(ArchivedTicket, on_delete=models.CASCADE, related_name='history')
+    from_staff = models.ForeignKey(
+        StaffUser, null=True, blank=True, on_delete=models.SET_NULL, related_name='+'
+    )
+    to_staff = models.ForeignKey(
+        StaffUser, null=True, blank=True, on_delete=models.SET_NULL, related_name='+'
+    )
+    action_type = models.CharField(max_length=20, choices=TicketHistory.ACTION_CHOICES)
+    comment = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+
     def __str__(self):
-        return f"{self.ticket.ticket_id} - {self.action_type} - {self.created_at}"
\ No newline at end of file
+        # As TicketHistory: the ticket number only if the ticket is already loaded.
+        if ArchivedTicketHistory.ticket.is_cached(self):
+            ticket = self.ticket.ticket_id
+        else:
+            ticket = f"#{self.ticket_id}"
+        return f"{ticket} - {self.action_type} - {self.created_at}"
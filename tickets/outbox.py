@@ -0,0 +1,156 @@
+# tickets/outbox.py
+"""
+Transactional email outbox.
+
+Views never talk to SMTP. `enqueue_email` writes an EmailOutbox row inside
+whatever transaction the caller is in, so an email exists if and only if the
+ticket change that caused it was committed. `deliver_batch` (run by
+`manage.py deliver_outbox`) claims due rows, sends them over one reused
+backend connection and records the outcome, retrying failures with
+exponential backoff until they are marked DEAD.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue_email(subject, body, to, ticket=None, from_email=None):
+    """Queue one email. `to` is a list of addresses."""
+    return EmailOutbox.objects.create(
+        ticket=ticket,
+        subject=subject,
+        body=body,
+        from_email=from_email,
+        to=",".join(to),
+    )
+
+
+def enqueue_emails(messages):
+    """
+    Queue many emails with one INSERT. `messages` is an iterable of dicts
+    with the same keys as `enqueue_email`'s arguments.
+    """
+    rows = [
+        EmailOutbox(
+            ticket=m.get('ticket'),
+            subject=m['subject'],
+            body=m['body'],
+            from_email=m.get('from_email'),
+            to=",".join(m['to']),
+        )
+        for m in messages
+    ]
+    return EmailOutbox.objects.bulk_create(rows, batch_size=500)
+
+
+def retry_delay(attempts):
+    """Backoff after the `attempts`-th failed delivery."""
+    base = _setting('EMAIL_OUTBOX_BACKOFF_SECONDS', 30)
+    cap = _setting('EMAIL_OUTBOX_MAX_BACKOFF_SECONDS', 3600)
+    return timedelta(seconds=min(cap, base * 2 ** max(attempts - 1, 0)))
+
+
+def claim_batch(batch_size):
+    """
+    Lease up to `batch_size` due rows to this worker.
+
+    The lease is just a bump of `next_attempt_at`: a worker that dies while
+    sending leaves rows that become due again once the lease expires.
+    On PostgreSQL, concurrent workers skip each other's locked rows.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=_setting('EMAIL_OUTBOX_LEASE_SECONDS', 300))
+
+    with transaction.atomic():
+        batch = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDING', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if batch:
+            EmailOutbox.objects.filter(pk__in=[m.pk for m in batch]).update(
+                next_attempt_at=now + lease
+            )
+    return batch
+
+
+def _mark_failed(message, error):
+    max_attempts = _setting('EMAIL_OUTBOX_MAX_ATTEMPTS', 8)
+
+    message.attempts += 1
+    message.last_error = str(error)[:2000] or error.__class__.__name__
+    if message.attempts >= max_attempts:
+        message.status = 'DEAD'
+        logger.error("Outbox email %s is dead after %s attempts: %s",
+                     message.pk, message.attempts, message.last_error)
+    else:
+        message.next_attempt_at = timezone.now() + retry_delay(message.attempts)
+    message.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def deliver_batch(batch_size=None):
+    """
+    Send one batch of due emails. Returns (sent, failed).
+    """
+    batch_size = batch_size or _setting('EMAIL_OUTBOX_BATCH_SIZE', 100)
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    sent_ids = []
+    failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as exc:
+        # Nothing can go out this round; every claimed row counts as an attempt.
+        logger.warning("Could not open email connection: %s", exc)
+        for message in batch:
+            _mark_failed(message, exc)
+        return 0, len(batch)
+
+    try:
+        for index, message in enumerate(batch):
+            email = EmailMessage(
+                subject=message.subject,
+                body=message.body,
+                from_email=message.from_email or None,
+                to=message.recipients(),
+                connection=connection,
+            )
+            try:
+                email.send()
+            except Exception as exc:
+                failed += 1
+                _mark_failed(message, exc)
+                # The server may have dropped us; start the next one fresh.
+                try:
+                    connection.close()
+                    connection.open()
+                except Exception as reopen_exc:
+                    for rest in batch[index + 1:]:
+                        failed += 1
+                        _mark_failed(rest, reopen_exc)
+                    break
+            else:
+                sent_ids.append(message.pk)
+    finally:
+        connection.close()
+
+    if sent_ids:
+        EmailOutbox.objects.filter(pk__in=sent_ids).update(
+            status='SENT', sent_at=timezone.now(), last_error=None
+        )
+    return len(sent_ids), failed
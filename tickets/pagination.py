@@ -0,0 +1,92 @@
+# tickets/pagination.py
+"""
+Keyset ("seek") pagination on (created_at, id), newest first.
+
+Unlike OFFSET paging, fetching page N costs the same as fetching page 1:
+each page continues strictly after the last row of the previous one, which
+an index ending in created_at can serve directly.
+
+Also the admin's EstimatedCountPaginator, which avoids a full COUNT(*)
+over tables too large to count on every page view.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+
+def encode_cursor(obj):
+    raw = f"{obj.created_at.isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(created_at, pk) from a cursor string, or None if it is malformed."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, pk = base64.urlsafe_b64decode(padded).decode().split("|")
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if created_at is None:
+        return None
+    return created_at, pk
+
+
+def keyset_page(queryset, cursor, page_size):
+    """
+    Return (rows, next_cursor) for the page after `cursor`.
+    `next_cursor` is None on the last page.
+    """
+    queryset = queryset.order_by('-created_at', '-pk')
+    position = decode_cursor(cursor)
+    if position:
+        created_at, pk = position
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+        )
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1])
+    return rows, next_cursor
+
+
+def estimated_count(queryset):
+    """The planner's row estimate for `queryset` (PostgreSQL), or None."""
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts exactly up to ADMIN_EXACT_COUNT_LIMIT rows, with a COUNT over a
+    LIMIT subquery that stops there. Past that, the count is the planner's
+    estimate where the database offers one, so page links are approximate
+    on very large result sets; elsewhere it falls back to the exact count.
+    """
+
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        queryset = self.object_list.order_by()
+        bounded = queryset[:limit + 1].count()
+        if bounded <= limit:
+            return bounded
+        estimate = estimated_count(queryset)
+        if estimate is None:
+            return queryset.count()
+        return max(estimate, bounded)
@@ -0,0 +1,144 @@
+# tickets/reference.py
+"""
+Per-process cache of the reference data every form render needs.
+
+Categories and the staff directory rarely change but are read on every
+complaint form and ticket detail page. Each worker process keeps its own
+copy tagged with the version it was loaded at; the current version lives
+in Django's cache, so a read costs one cache lookup and no SQL until the
+version moves. Saving or deleting a Category, StaffUser or User bumps the
+version (signal handlers in TicketsConfig.ready), and every process
+reloads on its next read. QuerySet.update() sends no signals: call
+`invalidate_*()` yourself after bulk changes to these fields.
+
+The version only reaches other processes through a shared cache backend.
+With a per-process one (the local-memory default) a copy is also reloaded
+once it is REFERENCE_CACHE_MAX_AGE seconds old.
+"""
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+StaffEntry = namedtuple('StaffEntry', 'pk name role department region')
+
+
+class CacheVersion:
+    """A version number kept in Django's cache and shared by every process."""
+
+    def __init__(self, key):
+        self.key = key
+
+    def version(self):
+        version = cache.get(self.key)
+        if version is None:
+            # A fresh stamp, so a process holding data from before the key
+            # was evicted can never mistake it for current.
+            cache.add(self.key, time.time_ns(), timeout=None)
+            version = cache.get(self.key)
+        return version
+
+    def bump(self):
+        try:
+            cache.incr(self.key)
+        except ValueError:
+            cache.set(self.key, time.time_ns(), timeout=None)
+
+    def invalidate(self):
+        # Now, so this process sees its own change, and again after commit,
+        # so another process that reloaded mid-transaction drops what it read.
+        self.bump()
+        transaction.on_commit(self.bump)
+
+
+class VersionedCache(CacheVersion):
+    """A per-process copy of `loader()`, reloaded when the version moves."""
+
+    def __init__(self, name, loader):
+        super().__init__(f"reference:{name}:version")
+        self.loader = loader
+        self._loaded = None  # (version, loaded at, value), replaced as a whole
+
+    def _stale(self, loaded, version):
+        if loaded is None or loaded[0] != version:
+            return True
+        max_age = settings.REFERENCE_CACHE_MAX_AGE
+        return max_age is not None and time.monotonic() - loaded[1] >= max_age
+
+    def get(self):
+        version = self.version()
+        loaded = self._loaded
+        if self._stale(loaded, version):
+            loaded = (version, time.monotonic(), self.loader())
+            self._loaded = loaded
+        return loaded[2]
+
+    def clear(self):
+        self._loaded = None
+
+
+def _load_categories():
+    from .models import Category
+
+    return {category.pk: category for category in Category.objects.order_by('pk')}
+
+
+def _load_staff():
+    from .models import StaffUser
+
+    rows = StaffUser.objects.order_by('user__first_name', 'user__last_name', 'pk').values_list(
+        'pk', 'user__first_name', 'user__last_name', 'user__username', 'role', 'department', 'region',
+    )
+    return {
+        pk: StaffEntry(pk, f"{first} {last}".strip() or username, role, department, region)
+        for pk, first, last, username, role, department, region in rows
+    }
+
+
+category_cache = VersionedCache('categories', _load_categories)
+staff_cache = VersionedCache('staff', _load_staff)
+
+
+def categories():
+    """Every Category, in id order. Shared instances: do not modify them."""
+    return list(category_cache.get().values())
+
+
+def get_category(pk):
+    return category_cache.get().get(pk)
+
+
+def category_choices():
+    return [(category.pk, category.name) for category in categories()]
+
+
+def staff_directory():
+    """StaffEntry tuples ordered by name."""
+    return list(staff_cache.get().values())
+
+
+def get_staff_entry(pk):
+    return staff_cache.get().get(pk)
+
+
+def invalidate_categories(**kwargs):
+    category_cache.invalidate()
+
+
+# The StaffUser and User fields the directory (and its search tokens) show.
+DIRECTORY_FIELDS = frozenset({
+    'user', 'user_id', 'role', 'department', 'region', 'first_name', 'last_name', 'username',
+})
+
+
+def directory_changed(update_fields):
+    """Whether a save with these update_fields can change the staff directory."""
+    return update_fields is None or bool(DIRECTORY_FIELDS & set(update_fields))
+
+
+def invalidate_staff(**kwargs):
+    # Counters, timestamps and every login's last_login are not shown.
+    if directory_changed(kwargs.get('update_fields')):
+        staff_cache.invalidate()
@@ -0,0 +1,170 @@
+# tickets/rollups.py
+"""
+Daily rollups behind the leadership dashboard.
+
+Every ticket contributes to exactly one DailyTicketRollup row, keyed by the
+local day it was created, its current status and its category:
+one to `ticket_count`, and, once resolved, one to `resolved_count` plus its
+resolution time to `resolution_seconds`. When a ticket changes we subtract
+its old contribution and add the new one, so the dashboard only ever reads
+one row per (day, status, category) in the selected range.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ArchivedTicket, Category, DailyTicketRollup, Ticket
+
+
+def _contribution(state):
+    """(key, (tickets, resolved, seconds)) for one TicketState."""
+    day = timezone.localtime(state.created_at).date()
+    key = (day, state.status, state.category_id or 0)
+    if state.resolved_at:
+        seconds = (state.resolved_at - state.created_at).total_seconds()
+        return key, (1, 1, seconds)
+    return key, (1, 0, 0.0)
+
+
+def _apply(deltas):
+    for (day, status, category_key), (tickets, resolved, seconds) in deltas.items():
+        if not (tickets or resolved or seconds):
+            continue
+        rows = DailyTicketRollup.objects.filter(day=day, status=status, category_key=category_key)
+        changes = dict(
+            ticket_count=F('ticket_count') + tickets,
+            resolved_count=F('resolved_count') + resolved,
+            resolution_seconds=F('resolution_seconds') + seconds,
+        )
+        if rows.update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                DailyTicketRollup.objects.create(
+                    day=day, status=status, category_key=category_key,
+                    ticket_count=tickets, resolved_count=resolved,
+                    resolution_seconds=seconds,
+                )
+        except IntegrityError:
+            # Created concurrently by another request.
+            rows.update(**changes)
+
+
+def record(removed=(), added=()):
+    """
+    Move contributions: subtract every TicketState in `removed` and add every
+    TicketState in `added`. Deltas for the same key are merged first, so a
+    batch of changes costs one statement per distinct key.
+    """
+    deltas = defaultdict(lambda: [0, 0, 0.0])
+    for sign, states in ((-1, removed), (1, added)):
+        for state in states:
+            key, values = _contribution(state)
+            for i, value in enumerate(values):
+                deltas[key][i] += sign * value
+    _apply(deltas)
+
+
+def _grouped(tickets, start=None, end=None):
+    if start:
+        tickets = tickets.filter(created_at__date__gte=start)
+    if end:
+        tickets = tickets.filter(created_at__date__lte=end)
+    return (
+        tickets.annotate(day=TruncDate('created_at'))
+        .values('day', 'status', 'category_id')
+        .annotate(
+            ticket_count=Count('id'),
+            resolved_count=Count('id', filter=Q(resolved_at__isnull=False)),
+            resolution=Sum(
+                ExpressionWrapper(F('resolved_at') - F('created_at'), output_field=DurationField()),
+                filter=Q(resolved_at__isnull=False),
+            ),
+        )
+        .order_by()
+    )
+
+
+def rebuild(start=None, end=None):
+    """
+    Recompute rollups from the Ticket and ArchivedTicket tables, for all
+    days or for the inclusive [start, end] date range. Returns the number
+    of rows written.
+    """
+    rollups = DailyTicketRollup.objects.all()
+    if start:
+        rollups = rollups.filter(day__gte=start)
+    if end:
+        rollups = rollups.filter(day__lte=end)
+
+    totals = defaultdict(lambda: [0, 0, 0.0])
+    for tickets in (Ticket.objects.all(), ArchivedTicket.objects.all()):
+        for g in _grouped(tickets, start, end).iterator():
+            row = totals[(g['day'], g['status'], g['category_id'] or 0)]
+            row[0] += g['ticket_count']
+            row[1] += g['resolved_count']
+            row[2] += g['resolution'].total_seconds() if g['resolution'] else 0.0
+
+    with transaction.atomic():
+        rollups.delete()
+        rows = [
+            DailyTicketRollup(
+                day=day,
+                status=status,
+                category_key=category_key,
+                ticket_count=ticket_count,
+                resolved_count=resolved_count,
+                resolution_seconds=resolution_seconds,
+            )
+            for (day, status, category_key), (ticket_count, resolved_count, resolution_seconds)
+            in totals.items()
+        ]
+        DailyTicketRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def dashboard_summary(status=None, start=None, end=None):
+    """
+    Totals, per-status and per-category counts and average resolution time
+    for tickets created in [start, end] (inclusive dates), optionally only
+    those currently in `status`.
+    """
+    rows = DailyTicketRollup.objects.filter(ticket_count__gt=0)
+    if status:
+        rows = rows.filter(status=status)
+    if start:
+        rows = rows.filter(day__gte=start)
+    if end:
+        rows = rows.filter(day__lte=end)
+
+    totals = rows.aggregate(
+        tickets=Sum('ticket_count'),
+        resolved=Sum('resolved_count'),
+        seconds=Sum('resolution_seconds'),
+    )
+    status_counts = list(
+        rows.values('status').annotate(count=Sum('ticket_count')).order_by('status')
+    )
+    by_category = (
+        rows.values('category_key').annotate(count=Sum('ticket_count')).order_by('category_key')
+    )
+    names = dict(Category.objects.values_list('id', 'name'))
+    category_counts = [
+        {'category_name': names.get(row['category_key']), 'count': row['count']}
+        for row in by_category
+    ]
+
+    avg_resolution = None
+    if totals['resolved']:
+        avg_resolution = timedelta(seconds=totals['seconds'] / totals['resolved'])
+
+    return {
+        'total_tickets': totals['tickets'] or 0,
+        'status_counts': status_counts,
+        'category_counts': category_counts,
+        'avg_resolution': avg_resolution,
+    }
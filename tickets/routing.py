@@ -0,0 +1,161 @@
+# tickets/routing.py
+"""
+Read-replica routing for reporting reads.
+
+When DATABASE_REPLICA names a database in settings.DATABASES, reads done
+inside `reporting()` (the dashboard CSV export, admin changelists) go to
+it; everything else, and every write, goes to `default`. A reporting read
+still goes to `default` when:
+
+- it runs inside a transaction, which must see its own uncommitted rows;
+- the request has already written something;
+- the user wrote something in the last DATABASE_REPLICA_PIN_SECONDS
+  (ReplicaPinMiddleware sets a short-lived cookie after a write), so a
+  page loaded right after an update never shows replication lag.
+
+With no replica configured all of this is a no-op. The replica is never
+migrated; it gets its schema from replication (or `manage.py sync_replica`
+for a local SQLite copy).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_pin'
+
+# The routing state of the request (or reporting block) being served; a
+# mutable object, so writes made on sync_to_async threads are seen here too.
+_current_state = ContextVar('db_routing', default=None)
+
+
+class RoutingState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.reporting = False
+        self.wrote = False
+
+
+def replica_alias():
+    """The configured replica alias, or None."""
+    alias = getattr(settings, 'DATABASE_REPLICA', None)
+    return alias if alias and alias in settings.DATABASES else None
+
+
+@contextmanager
+def reporting():
+    """Send the reads in this block to the replica when it is safe to. Also a decorator."""
+    state = _current_state.get()
+    token = None
+    if state is None:
+        state = RoutingState()
+        token = _current_state.set(state)
+    previous, state.reporting = state.reporting, True
+    try:
+        yield
+    finally:
+        state.reporting = previous
+        if token is not None:
+            _current_state.reset(token)
+
+
+@contextmanager
+def primary():
+    """Send the reads in this block to `default`, even inside `reporting()`."""
+    state = _current_state.get()
+    if state is None:
+        yield
+        return
+    previous, state.reporting = state.reporting, False
+    try:
+        yield
+    finally:
+        state.reporting = previous
+
+
+def read_alias():
+    """The alias reads would be routed to right now."""
+    state = _current_state.get()
+    alias = replica_alias()
+    if (
+        alias is None or state is None or not state.reporting
+        or state.pinned or state.wrote
+        or connections[DEFAULT_DB_ALIAS].in_atomic_block
+    ):
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+def for_reporting(queryset):
+    """
+    `queryset` bound to the current read alias, for querysets evaluated
+    after the reporting block ends (e.g. in a streaming response).
+    """
+    return queryset.using(read_alias())
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        state = _current_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == replica_alias():
+            return False
+        return None
+
+
+class ReplicaPinMiddleware:
+    """
+    Track writes per request and pin the user to the primary for
+    DATABASE_REPLICA_PIN_SECONDS after one.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _current_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_state.reset(token)
+        return self.pin(response, state)
+
+    async def __acall__(self, request):
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _current_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_state.reset(token)
+        return self.pin(response, state)
+
+    def pin(self, response, state):
+        if state.wrote and replica_alias():
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
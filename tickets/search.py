@@ -0,0 +1,211 @@
+# tickets/search.py
+"""
+Full-text search over tickets and their customers.
+
+Each ticket has one document in a search table holding its ticket ID,
+description and customer name, email, phone, account and meter numbers.
+SQLite uses an FTS5 virtual table (rowid = ticket pk); PostgreSQL uses a
+tsvector column with a GIN index. Both tables are created by migration
+0007 and kept in sync from tickets.tracking and the customer-saving code
+paths; `manage.py rebuild_search_index` rebuilds them from scratch.
+
+Any other database falls back to the old `icontains` scan.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Ticket
+
+INDEX_CHUNK_SIZE = 2000
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+DOCUMENT_FIELDS = (
+    'id', 'ticket_id', 'description', 'customer__name', 'customer__email',
+    'customer__phone', 'customer__account_number', 'customer__meter_number',
+)
+
+
+def query_terms(text):
+    """Search terms as plain word tokens; punctuation never reaches the query parser."""
+    return TOKEN_RE.findall((text or "").lower())[:10]
+
+
+def index_text(*values):
+    """
+    `values` as the same word tokens queries are split into. PostgreSQL's
+    parser would keep an email address or a hyphenated ID as one lexeme,
+    which the per-word prefix query never matches.
+    """
+    return " ".join(TOKEN_RE.findall(" ".join(values).lower()))
+
+
+def _documents(ticket_ids):
+    rows = Ticket.objects.filter(pk__in=ticket_ids).values_list(*DOCUMENT_FIELDS)
+    for pk, *values in rows:
+        yield pk, [value or "" for value in values]
+
+
+class IContainsBackend:
+    """The original table scan, kept for databases without an index implementation."""
+
+    def index_tickets(self, ticket_ids):
+        pass
+
+    def remove_tickets(self, ticket_ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def search_ids(self, text, limit, offset):
+        terms = query_terms(text)
+        if not terms:
+            return []
+        tickets = Ticket.objects.all()
+        for term in terms:
+            tickets = tickets.filter(
+                Q(ticket_id__icontains=term) | Q(description__icontains=term)
+                | Q(customer__name__icontains=term) | Q(customer__email__icontains=term)
+                | Q(customer__phone__icontains=term)
+                | Q(customer__account_number__icontains=term)
+                | Q(customer__meter_number__icontains=term)
+            )
+        return list(tickets.order_by('-created_at').values_list('pk', flat=True)[offset:offset + limit])
+
+
+class SQLiteFTSBackend:
+    table = "tickets_search"
+
+    def remove_tickets(self, ticket_ids):
+        ticket_ids = list(ticket_ids)
+        with connection.cursor() as cursor:
+            for start in range(0, len(ticket_ids), 500):
+                chunk = ticket_ids[start:start + 500]
+                cursor.execute(
+                    f"DELETE FROM {self.table} WHERE rowid IN ({','.join(['%s'] * len(chunk))})",
+                    chunk,
+                )
+
+    def index_tickets(self, ticket_ids):
+        ticket_ids = list(ticket_ids)
+        self.remove_tickets(ticket_ids)
+        rows = [[pk, *values] for pk, values in _documents(ticket_ids)]
+        if rows:
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"INSERT INTO {self.table} (rowid, ticket_id, description, name, email, "
+                    f"phone, account_number, meter_number) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+                    rows,
+                )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+
+    def search_ids(self, text, limit, offset):
+        terms = query_terms(text)
+        if not terms:
+            return []
+        # Every term must match, as a prefix, in any column.
+        match = " ".join(f'"{term}"*' for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s "
+                f"ORDER BY bm25({self.table}) LIMIT %s OFFSET %s",
+                [match, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    table = "tickets_search"
+    # Identifiers weigh more than free text in the ranking.
+    document_sql = (
+        "setweight(to_tsvector('simple', %s), 'A') || "
+        "setweight(to_tsvector('simple', %s), 'B') || "
+        "setweight(to_tsvector('simple', %s), 'C')"
+    )
+
+    def remove_tickets(self, ticket_ids):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE ticket_pk = ANY(%s)", [list(ticket_ids)])
+
+    def index_tickets(self, ticket_ids):
+        rows = []
+        for pk, (ticket_id, description, name, email, phone, account, meter) in _documents(ticket_ids):
+            identifiers = index_text(ticket_id, account, meter, phone, email)
+            rows.append([pk, identifiers, index_text(name), index_text(description)])
+        if rows:
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"INSERT INTO {self.table} (ticket_pk, document) VALUES (%s, {self.document_sql}) "
+                    f"ON CONFLICT (ticket_pk) DO UPDATE SET document = EXCLUDED.document",
+                    rows,
+                )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {self.table}")
+
+    def search_ids(self, text, limit, offset):
+        terms = query_terms(text)
+        if not terms:
+            return []
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT ticket_pk FROM {self.table}, to_tsquery('simple', %s) query "
+                f"WHERE document @@ query ORDER BY ts_rank_cd(document, query) DESC, ticket_pk DESC "
+                f"LIMIT %s OFFSET %s",
+                [tsquery, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+def get_backend():
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSBackend()
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return IContainsBackend()
+
+
+def index_tickets(ticket_ids):
+    get_backend().index_tickets(ticket_ids)
+
+
+def remove_tickets(ticket_ids):
+    get_backend().remove_tickets(ticket_ids)
+
+
+def index_customer(customer):
+    """Refresh the documents of every ticket belonging to `customer`."""
+    index_tickets(Ticket.objects.filter(customer=customer).values_list('pk', flat=True))
+
+
+def search(text, limit=20, offset=0):
+    """Ranked tickets matching `text`, with customer and category joined."""
+    ids = get_backend().search_ids(text, limit, offset)
+    tickets = Ticket.objects.select_related('customer', 'category').in_bulk(ids)
+    # Documents of deleted tickets may linger until the next rebuild; skip them.
+    return [tickets[pk] for pk in ids if pk in tickets]
+
+
+def rebuild():
+    """Re-index every ticket in chunks. Returns the number indexed."""
+    backend = get_backend()
+    backend.clear()
+    indexed = 0
+    last_pk = 0
+    while True:
+        ids = list(
+            Ticket.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', flat=True)[:INDEX_CHUNK_SIZE]
+        )
+        if not ids:
+            return indexed
+        backend.index_tickets(ids)
+        indexed += len(ids)
+        last_pk = ids[-1]
@@ -0,0 +1,262 @@
+# tickets/seeding.py
+"""
+Synthetic production-shaped data (`manage.py seed_load`).
+
+Generates customers, categories, staff and tickets with their history,
+spread over the last `days` days: older tickets are mostly resolved or
+closed, recent ones mostly open, each assigned to staff with its
+category's first-level role. Everything goes in through bulk_create in
+batches, then the derived tables are rebuilt the same way the app keeps
+them: customer identity keys, staff search tokens, workload counters,
+the search index and the dashboard rollups. Ticket IDs come from the
+normal per-year sequence, so seeded and real tickets never collide.
+
+The same `random_seed` gives the same data, so benchmark runs against
+seeded databases can be compared.
+"""
+import random
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection
+from django.utils import timezone
+
+from . import dashboard, directory, reference, rollups, search, workload
+from .customers import customer_keys
+from .models import Category, Customer, CustomerIdentity, StaffUser, Ticket, TicketHistory
+from .ticket_ids import format_ticket_id, reserve
+
+# (name, first-level role, SLA hours, share of tickets)
+CATEGORIES = (
+    ("Billing", "Billing Officer", 72, 40),
+    ("Power Outage", "Feeder Engineer", 24, 30),
+    ("Metering", "Metering Officer", 120, 15),
+    ("Illegal Connection", "RPD Officer", 168, 5),
+    ("Customer Service", "Customer Care", 48, 10),
+)
+REGIONS = ("Ikeja", "Lekki", "Ibadan", "Abeokuta", "Oshogbo", "Ilorin")
+FIRST_NAMES = (
+    "Ada Bola Chidi Dayo Emeka Funmi Gbenga Halima Ifeoma Jide Kemi Lanre Musa Ngozi "
+    "Obinna Segun Tobi Uche Yemi Zainab"
+).split()
+LAST_NAMES = (
+    "Adeyemi Okafor Bello Eze Ogunleye Nwosu Abubakar Balogun Okonkwo Ibrahim Adebayo "
+    "Chukwu Lawal Olawale Umeh"
+).split()
+DESCRIPTIONS = (
+    "No light in the area since yesterday evening",
+    "Estimated bill is far higher than my usual consumption",
+    "Prepaid token rejected by the meter",
+    "Transformer fault, whole street affected",
+    "Low voltage, appliances cannot run",
+    "Meter bypass reported at a neighbouring building",
+    "Pole fell during the storm and wires are sparking",
+    "Waiting for a meter for over three months",
+)
+
+
+def _status(rng, age_days):
+    """Older tickets are mostly finished; the last few days are mostly open."""
+    if age_days > 30:
+        weights = (1, 2, 2, 25, 70)
+    elif age_days > 7:
+        weights = (5, 15, 10, 40, 30)
+    else:
+        weights = (40, 30, 10, 15, 5)
+    return rng.choices([code for code, _ in Ticket.STATUS_CHOICES], weights)[0]
+
+
+def ensure_categories():
+    """The seed categories, created if missing. Returns [(category, weight)]."""
+    rows = []
+    for name, role, hours, weight in CATEGORIES:
+        category, _ = Category.objects.get_or_create(
+            name=name, defaults={
+                'default_first_level_role': role, 'sla_hours': hours,
+                'coalesce_incidents': role == "Feeder Engineer",
+            },
+        )
+        rows.append((category, weight))
+    reference.invalidate_categories()
+    return rows
+
+
+def seed_staff(rng, count, roles, password, batch_size):
+    """`count` staff spread over `roles` and REGIONS; about one in ten are Supervisors (is_staff)."""
+    start = User.objects.filter(username__startswith="load-staff-").count()
+    password = make_password(password)
+    specs = []
+    for n in range(start, start + count):
+        role = "Supervisor" if n % 10 == 9 else roles[n % len(roles)]
+        specs.append((n, role, REGIONS[n % len(REGIONS)]))
+    users = User.objects.bulk_create([
+        User(
+            username=f"load-staff-{n}", first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES), email=f"load-staff-{n}@example.com",
+            password=password, is_staff=role == "Supervisor",
+        )
+        for n, role, _ in specs
+    ], batch_size=batch_size)
+    staff = StaffUser.objects.bulk_create([
+        StaffUser(user=user, role=role, region=region, department="Customer Operations")
+        for user, (_, role, region) in zip(users, specs)
+    ], batch_size=batch_size)
+    directory.index_staff(s.pk for s in staff)
+    reference.invalidate_staff()
+    return staff
+
+
+def seed_customers(rng, count, batch_size):
+    start = Customer.objects.count()
+    customers = []
+    for offset in range(0, count, batch_size):
+        batch = Customer.objects.bulk_create([
+            Customer(
+                name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                email=f"load-customer-{n}@example.com",
+                phone=f"080{n:08d}",
+                account_number=f"ACC-{n:08d}" if rng.random() < 0.7 else None,
+                meter_number=f"MTR-{n:08d}" if rng.random() < 0.5 else None,
+                region=rng.choice(REGIONS),
+            )
+            for n in range(start + offset, start + min(offset + batch_size, count))
+        ])
+        CustomerIdentity.objects.bulk_create([
+            CustomerIdentity(customer=customer, kind=kind, value=value)
+            for customer in batch for kind, value in customer_keys(customer)
+        ], ignore_conflicts=True)
+        customers += batch
+    return customers
+
+
+def _set_timestamps(model, fields, rows):
+    """
+    Overwrite auto_now/auto_now_add columns of rows just inserted; `rows` are
+    (pk, value, ...) in `fields` order. One executemany, as bulk_update's
+    CASE per row gets slow at these batch sizes.
+    """
+    quote = connection.ops.quote_name
+    adapt = connection.ops.adapt_datetimefield_value
+    columns = ", ".join(f"{quote(model._meta.get_field(f).column)} = %s" for f in fields)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {quote(model._meta.db_table)} SET {columns} WHERE {quote(model._meta.pk.column)} = %s",
+            [[adapt(value) for value in values] + [pk] for pk, *values in rows],
+        )
+
+
+def _history(rng, ticket, assignee, supervisors, extra):
+    entries = [(ticket.created_at, 'ASSIGNED', None, assignee, "Assigned automatically")]
+    end = ticket.resolved_at or timezone.now()
+    span = max((end - ticket.created_at).total_seconds(), 1)
+    for _ in range(rng.randint(0, extra * 2)):
+        at = ticket.created_at + timedelta(seconds=rng.uniform(0, span))
+        action = rng.choice(('COMMENTED', 'STATUS_CHANGED', 'ESCALATED'))
+        to_staff = rng.choice(supervisors) if action == 'ESCALATED' and supervisors else assignee
+        entries.append((at, action, assignee, to_staff, "Followed up with the customer"))
+    if ticket.resolved_at:
+        entries.append((ticket.resolved_at, 'RESOLVED', assignee, assignee, "Resolved"))
+    entries.sort(key=lambda entry: entry[0])
+    return [
+        TicketHistory(ticket=ticket, action_type=action, from_staff=from_staff,
+                      to_staff=to_staff, comment=comment, created_at=at)
+        for at, action, from_staff, to_staff, comment in entries
+    ]
+
+
+def seed_tickets(rng, count, customers, categories, staff, days, history, batch_size):
+    """Tickets oldest first, IDs from each year's sequence. Returns (tickets, history rows)."""
+    now = timezone.now()
+    by_role = defaultdict(list)
+    for member in staff:
+        by_role[member.role].append(member)
+    supervisors = by_role.get("Supervisor", [])
+
+    created = sorted(now - timedelta(seconds=rng.uniform(0, days * 86400)) for _ in range(count))
+    per_year = defaultdict(int)
+    for at in created:
+        per_year[timezone.localtime(at).year] += 1
+    numbers = {year: iter(reserve(n, year)) for year, n in per_year.items()}
+
+    tickets_written = history_written = 0
+    for offset in range(0, count, batch_size):
+        tickets, assignees = [], []
+        for at in created[offset:offset + batch_size]:
+            category = rng.choices([c for c, _ in categories], [w for _, w in categories])[0]
+            status = _status(rng, (now - at).days)
+            assignee = rng.choice(by_role.get(category.default_first_level_role) or staff)
+            if status == 'ESCALATED' and supervisors:
+                assignee = rng.choice(supervisors)
+            resolved_at = None
+            if status in ('RESOLVED', 'CLOSED'):
+                resolved_at = min(at + timedelta(hours=rng.expovariate(1 / 48)), now)
+            year = timezone.localtime(at).year
+            tickets.append(Ticket(
+                ticket_id=format_ticket_id(year, next(numbers[year])),
+                customer=rng.choice(customers),
+                category=category,
+                description=rng.choice(DESCRIPTIONS),
+                status=status,
+                current_assigned_to=assignee,
+                resolved_at=resolved_at,
+            ))
+            assignees.append((assignee, at))
+
+        tickets = Ticket.objects.bulk_create(tickets)
+        # created_at/updated_at are auto fields: set the generated ones afterwards.
+        for ticket, (_, at) in zip(tickets, assignees):
+            ticket.created_at = at
+            ticket.updated_at = ticket.resolved_at or at
+        _set_timestamps(Ticket, ['created_at', 'updated_at'],
+                        [(t.pk, t.created_at, t.updated_at) for t in tickets])
+
+        entries = [
+            entry
+            for ticket, (assignee, _) in zip(tickets, assignees)
+            for entry in _history(rng, ticket, assignee, supervisors, history)
+        ]
+        stamps = [entry.created_at for entry in entries]
+        entries = TicketHistory.objects.bulk_create(entries, batch_size=batch_size)
+        _set_timestamps(TicketHistory, ['created_at'],
+                        [(entry.pk, at) for entry, at in zip(entries, stamps)])
+
+        search.index_tickets([t.pk for t in tickets])
+        tickets_written += len(tickets)
+        history_written += len(entries)
+    return tickets_written, history_written
+
+
+def seed(customers=1000, staff=50, tickets=10000, history=2, days=365,
+         password="loadtest", random_seed=42, batch_size=2000, progress=None):
+    """
+    Generate a dataset and rebuild everything derived from it. `history` is
+    the average number of follow-up entries per ticket; `progress` is called
+    with a message after each stage. Returns the counts written.
+    """
+    rng = random.Random(random_seed)
+    report = progress or (lambda message: None)
+
+    categories = ensure_categories()
+    roles = sorted({c.default_first_level_role for c, _ in categories})
+    staff_rows = seed_staff(rng, staff, roles, password, batch_size)
+    report(f"{len(staff_rows)} staff")
+    customer_rows = seed_customers(rng, customers, batch_size)
+    report(f"{len(customer_rows)} customers")
+    ticket_count, history_count = seed_tickets(
+        rng, tickets, customer_rows, categories, staff_rows, days, history, batch_size,
+    )
+    report(f"{ticket_count} tickets, {history_count} history entries")
+
+    workload.reconcile()
+    rollups.rebuild()
+    dashboard.ticket_data_changed()
+    report("rollups rebuilt")
+    return {
+        'categories': len(categories),
+        'staff': len(staff_rows),
+        'customers': len(customer_rows),
+        'tickets': ticket_count,
+        'history': history_count,
+    }
@@ -0,0 +1,163 @@
+# tickets/sla.py
+"""
+SLA aging scanner and auto-escalation (`manage.py scan_sla`).
+
+Every category has an SLA in hours (Category.sla_hours; SLA_DEFAULT_HOURS
+for tickets without one). A ticket still NEW or IN_PROGRESS that long
+after it was created is escalated to staff with the category's
+escalation_role, spread by the assignment strategy, and recorded in
+SlaBreach for the dashboard.
+
+The scan is incremental. SlaScanState remembers, per category, how far
+the previous scan got; each batch reads only NEW/IN_PROGRESS tickets
+created between that point and now - sla_hours, through the
+(status, created_at) index. The work per scan is the tickets that aged
+past their target since the last one, whatever the size of the backlog.
+
+Each batch is one transaction: bulk_update of the tickets, bulk_create of
+their history and breach rows, queued customer emails and tracking.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import reference, tracking
+from .assignment import get_strategy
+from .models import SlaBreach, SlaScanState, StaffUser, Ticket, TicketHistory
+from .outbox import enqueue_emails
+from .utils import escalation_email
+
+SCANNED_STATUSES = ('NEW', 'IN_PROGRESS')
+
+
+def targets():
+    """(category_key, category, sla_hours, escalation_role) per category, and for none."""
+    rows = [(c.pk, c, c.sla_hours, c.escalation_role) for c in reference.categories()]
+    rows.append((0, None, settings.SLA_DEFAULT_HOURS, settings.SLA_DEFAULT_ESCALATION_ROLE))
+    return rows
+
+
+def due(category_key, category, hours, now, batch_size):
+    """The next batch of breaching tickets in one category, oldest first, locked."""
+    # Tickets attached to an incident are covered by its lead ticket.
+    tickets = Ticket.objects.filter(
+        status__in=SCANNED_STATUSES, created_at__lt=now - timedelta(hours=hours),
+        incident__isnull=True,
+    )
+    if category is None:
+        tickets = tickets.filter(category__isnull=True)
+    else:
+        tickets = tickets.filter(category=category)
+    state = SlaScanState.objects.filter(pk=category_key).first()
+    if state:
+        tickets = tickets.filter(
+            Q(created_at__gt=state.last_created_at)
+            | Q(created_at=state.last_created_at, pk__gt=state.last_ticket_pk)
+        )
+    return list(
+        tickets.select_related('customer').select_for_update(of=('self',))
+        .order_by('created_at', 'pk')[:batch_size]
+    )
+
+
+def escalate(tickets, category, hours, role, now):
+    """Escalate `tickets` together; returns the SlaBreach rows written."""
+    picks = [None] * len(tickets)
+    if role:
+        strategy = get_strategy()
+        by_region = defaultdict(list)
+        for position, ticket in enumerate(tickets):
+            by_region[ticket.customer.region].append(position)
+        for region, positions in by_region.items():
+            for position, staff_user in zip(positions, strategy.pick_many(role, region, len(positions))):
+                picks[position] = staff_user
+    staff = StaffUser.objects.select_related('user').in_bulk({s.pk for s in picks if s})
+
+    changes, history, breaches, emails = [], [], [], []
+    for ticket, pick in zip(tickets, picks):
+        before = tracking.snapshot(ticket)
+        previous = ticket.current_assigned_to_id
+        to_staff = staff[pick.pk] if pick else None
+        ticket.status = 'ESCALATED'
+        if to_staff:
+            ticket.current_assigned_to = to_staff
+        ticket.updated_at = now
+        changes.append((before, ticket))
+        history.append(TicketHistory(
+            ticket=ticket,
+            from_staff=None,
+            to_staff=to_staff,
+            action_type='ESCALATED',
+            comment=f"SLA of {hours} hours breached; escalated automatically",
+        ))
+        breaches.append(SlaBreach(
+            ticket=ticket,
+            category=category,
+            due_at=ticket.created_at + timedelta(hours=hours),
+            breached_at=now,
+            escalated_from_id=previous,
+            escalated_to=to_staff,
+        ))
+        if to_staff:
+            emails.append(escalation_email(ticket, to_staff))
+
+    Ticket.objects.bulk_update(tickets, ['status', 'current_assigned_to', 'updated_at'])
+    tracking.tickets_changed(changes)
+    TicketHistory.objects.bulk_create(history)
+    SlaBreach.objects.bulk_create(breaches, ignore_conflicts=True)
+    enqueue_emails(emails)
+    return breaches
+
+
+def scan_batch(category_key, category, hours, role, now, batch_size):
+    """Escalate one batch and move the category's watermark. Returns (escalated, finished)."""
+    with transaction.atomic():
+        tickets = due(category_key, category, hours, now, batch_size)
+        if tickets:
+            escalate(tickets, category, hours, role, now)
+        finished = len(tickets) < batch_size
+        if finished:
+            # Everything created before the cutoff has now been checked.
+            mark = (now - timedelta(hours=hours), 0)
+        else:
+            mark = (tickets[-1].created_at, tickets[-1].pk)
+        SlaScanState.objects.update_or_create(
+            category_key=category_key,
+            defaults={'last_created_at': mark[0], 'last_ticket_pk': mark[1]},
+        )
+    return len(tickets), finished
+
+
+def scan(batch_size=None, now=None):
+    """Escalate every ticket past its SLA. Returns the number escalated."""
+    batch_size = batch_size or settings.SLA_SCAN_BATCH_SIZE
+    now = now or timezone.now()
+    escalated = 0
+    for category_key, category, hours, role in targets():
+        finished = False
+        while not finished:
+            count, finished = scan_batch(category_key, category, hours, role, now, batch_size)
+            escalated += count
+    return escalated
+
+
+def dashboard_breaches(limit=20):
+    """Open breaches, newest first, and the number of breaches ever recorded."""
+    open_breaches = SlaBreach.objects.filter(ticket__status__in=Ticket.OPEN_STATUSES).select_related(
+        'ticket', 'category', 'escalated_to__user',
+    ).order_by('-breached_at', '-pk')[:limit]
+    rows = [
+        {
+            'ticket_id': breach.ticket.ticket_id,
+            'category_name': breach.category.name if breach.category else None,
+            'due_at': breach.due_at,
+            'breached_at': breach.breached_at,
+            'escalated_to': str(breach.escalated_to) if breach.escalated_to else None,
+        }
+        for breach in open_breaches
+    ]
+    return rows, SlaBreach.objects.count()
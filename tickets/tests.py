@@ -1,3 +1,1924 @@
-from django.test import TestCase
+import csv
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import unittest
+from io import StringIO
+from unittest import mock
+from datetime import timedelta
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+from django.db import close_old_connections, connection, connections, transaction
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient, Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    ArchivedTicket, ArchivedTicketHistory, Category, CategoryWorkload, Customer, CustomerIdentity,
+    DailyTicketRollup, ImportCheckpoint, Incident, SlaBreach, EmailOutbox, StaffUser, StaffWorkload, Ticket,
+    TicketHistory, TicketSequence,
+)
+from . import (
+    archive, assets, assignment, benchmark, customers, dashboard, reference, rollups, routing, search, seeding,
+    sla, workload,
+)
+from .forms import EscalationForm
+from .importer import ComplaintImporter
+from .outbox import deliver_batch, enqueue_email
+from .ticket_ids import _block_cache, create_ticket, current_year, format_ticket_id, next_ticket_id
+
+
+def setUpModule():
+    # Over-budget requests (the bulk action budget, lock waits in the
+    # concurrency tests) log a WARNING line each; tests that check the
+    # metrics log capture it with assertLogs.
+    logger = logging.getLogger('tickets.perf')
+    level = logger.level
+    logger.setLevel(logging.ERROR)
+    unittest.addModuleCleanup(logger.setLevel, level)
+    # make_staff gives every user a password; hash it cheaply.
+    hashers = override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+    hashers.enable()
+    unittest.addModuleCleanup(hashers.disable)
+    # STATIC_ROOT is only filled by collectstatic at deploy time; pages
+    # render plain /static/ URLs here (StaticAssetTests collect their own).
+    storages = override_settings(STORAGES={**settings.STORAGES, 'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}})
+    storages.enable()
+    unittest.addModuleCleanup(storages.disable)
+
+
+def complaint_data(category, n=0):
+    return {
+        'name': f"Customer {n}",
+        'email': f"customer{n}@example.com",
+        'phone': f"0803{n:07d}",
+        'account_number': '',
+        'meter_number': '',
+        'category': category.pk,
+        'description': "No light since morning",
+    }
+
+
+def make_staff(username, role="Billing Officer", is_staff=False, **fields):
+    user = User.objects.create_user(
+        username, password="pass", first_name=username.title(), last_name="Officer",
+        is_staff=is_staff,
+    )
+    return StaffUser.objects.create(user=user, role=role, **fields)
+
+
+def open_tickets(staff):
+    return sum(workload.staff_counts(staff).values())
+
+
+def set_open_tickets(staff, count):
+    StaffWorkload.objects.filter(staff=staff).delete()
+    StaffWorkload.objects.create(staff=staff, status='NEW', ticket_count=count)
+
+
+class TicketIdAllocatorTests(TestCase):
+
+    def setUp(self):
+        _block_cache.clear()
+        self.year = current_year()
+
+    def test_ids_are_sequential_per_year(self):
+        self.assertEqual(next_ticket_id(), format_ticket_id(self.year, 1))
+        self.assertEqual(next_ticket_id(), format_ticket_id(self.year, 2))
+        self.assertEqual(next_ticket_id(year=1999), "DISCO-1999-000001")
+
+    def test_sequence_is_seeded_from_existing_tickets(self):
+        customer = Customer.objects.create(name="A", email="a@example.com", phone="1")
+        Ticket.objects.create(ticket_id=format_ticket_id(self.year, 41), customer=customer, description="x")
+
+        self.assertEqual(next_ticket_id(), format_ticket_id(self.year, 42))
+
+    def test_seed_compares_numbers_past_the_padding_width(self):
+        customer = Customer.objects.create(name="A", email="a@example.com", phone="1")
+        for number in (999999, 1000000):
+            Ticket.objects.create(ticket_id=format_ticket_id(self.year, number), customer=customer, description="x")
+
+        self.assertEqual(next_ticket_id(), format_ticket_id(self.year, 1000001))
+
+    def test_create_ticket_retries_on_collision(self):
+        customer = Customer.objects.create(name="A", email="a@example.com", phone="1")
+        taken = format_ticket_id(self.year, 1)
+        Ticket.objects.create(ticket_id=taken, customer=customer, description="x")
+        TicketSequence.objects.create(year=self.year, last_value=0)
+
+        ticket = create_ticket(ticket_id=taken, customer=customer, description="y")
+
+        self.assertEqual(ticket.ticket_id, format_ticket_id(self.year, 2))
+
+
+class TicketIdConcurrencyTests(TransactionTestCase):
+    """Runs outside a wrapping transaction, like real requests do."""
+
+    def setUp(self):
+        _block_cache.clear()
+        self.year = current_year()
+
+    @override_settings(TICKET_ID_BLOCK_SIZE=10)
+    def test_block_reservation_touches_counter_once_per_block(self):
+        first = next_ticket_id()
+        with self.assertNumQueries(0):
+            rest = [next_ticket_id() for _ in range(9)]
+
+        self.assertEqual(first, format_ticket_id(self.year, 1))
+        self.assertEqual(rest[-1], format_ticket_id(self.year, 10))
+        self.assertEqual(TicketSequence.objects.get(year=self.year).last_value, 10)
+
+    def test_parallel_submissions_get_unique_ids(self):
+        category = Category.objects.create(name="No Supply", default_first_level_role="Feeder Engineer")
+        engineers = [make_staff(f"engineer{n}", role="Feeder Engineer") for n in range(4)]
+        submissions = 20
+        statuses = []
+        errors = []
+
+        def submit(n):
+            try:
+                response = Client().post(reverse('create_complaint'), complaint_data(category, n))
+                statuses.append(response.status_code)
+            except Exception as exc:  # surfaced through the assertion below
+                errors.append(exc)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=submit, args=(n,)) for n in range(submissions)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(statuses, [200] * submissions)
+        ids = list(Ticket.objects.values_list('ticket_id', flat=True))
+        self.assertEqual(len(ids), submissions)
+        self.assertEqual(len(set(ids)), submissions)
+        # Concurrent assignment still spreads the load evenly.
+        for engineer in engineers:
+            self.assertEqual(open_tickets(engineer), 5)
+            self.assertEqual(engineer.assigned_tickets.count(), 5)
+
+
+class FailingEmailBackend(LocmemEmailBackend):
+    """Locmem backend that refuses one address, for retry tests."""
+
+    def send_messages(self, messages):
+        if any('bounce@example.com' in m.to for m in messages):
+            raise ConnectionError("mailbox unavailable")
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='tickets.tests.FailingEmailBackend')
+class EmailOutboxTests(TestCase):
+
+    def test_submission_queues_acknowledgement_instead_of_sending(self):
+        category = Category.objects.create(name="Billing", default_first_level_role="Billing Officer")
+
+        response = self.client.post(reverse('create_complaint'), complaint_data(category))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        queued = EmailOutbox.objects.get()
+        self.assertEqual(queued.to, "customer0@example.com")
+        self.assertEqual(queued.status, 'PENDING')
+
+    def test_rolled_back_change_leaves_no_email(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            enqueue_email("Subject", "Body", ["a@example.com"])
+            raise RuntimeError
+
+        self.assertFalse(EmailOutbox.objects.exists())
+
+    def test_worker_sends_batch_and_backs_off_failures(self):
+        enqueue_email("One", "Body", ["a@example.com"])
+        enqueue_email("Two", "Body", ["bounce@example.com"])
+        enqueue_email("Three", "Body", ["c@example.com"])
+
+        self.assertEqual(deliver_batch(10), (2, 1))
+
+        self.assertEqual([m.subject for m in mail.outbox], ["One", "Three"])
+        failed = EmailOutbox.objects.get(subject="Two")
+        self.assertEqual((failed.status, failed.attempts), ('PENDING', 1))
+        self.assertGreater(failed.next_attempt_at, timezone.now() + timedelta(seconds=20))
+        # Not due yet, so a second run has nothing to do.
+        self.assertEqual(deliver_batch(10), (0, 0))
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_repeated_failures_end_in_dead_letter(self):
+        message = enqueue_email("Two", "Body", ["bounce@example.com"])
+
+        with self.assertLogs('tickets.outbox', 'ERROR'):
+            for _ in range(2):
+                EmailOutbox.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+                deliver_batch(10)
+
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('DEAD', 2))
+        self.assertIn("mailbox unavailable", message.last_error)
+
+
+class DashboardRollupTests(TestCase):
+
+    def setUp(self):
+        self.billing = Category.objects.create(name="Billing", default_first_level_role="Billing Officer")
+        self.supply = Category.objects.create(name="No Supply", default_first_level_role="Feeder Engineer")
+        self.officer = make_staff("ada", is_staff=True)
+        self.client.force_login(self.officer.user)
+
+    def rollup_rows(self):
+        return sorted(
+            DailyTicketRollup.objects.filter(ticket_count__gt=0)
+            .values_list('day', 'status', 'category_key', 'ticket_count', 'resolved_count')
+        )
+
+    def test_rollups_follow_creation_and_status_changes(self):
+        for n in range(3):
+            self.client.post(reverse('create_complaint'), complaint_data(self.billing, n))
+        self.client.post(reverse('create_complaint'), complaint_data(self.supply, 9))
+        ticket = Ticket.objects.filter(category=self.billing).first()
+
+        self.client.post(
+            reverse('staff_ticket_detail', args=[ticket.ticket_id]),
+            {'update_status': '1', 'status': 'RESOLVED', 'comment': ''},
+        )
+
+        today = timezone.localdate()
+        self.assertEqual(self.rollup_rows(), [
+            (today, 'NEW', self.billing.pk, 2, 0),
+            (today, 'NEW', self.supply.pk, 1, 0),
+            (today, 'RESOLVED', self.billing.pk, 1, 1),
+        ])
+        incremental = self.rollup_rows()
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertEqual(self.rollup_rows(), incremental)
+
+    def test_dashboard_reads_filters_from_rollups(self):
+        customer = Customer.objects.create(name="A", email="a@example.com", phone="1")
+        created = timezone.now() - timedelta(days=3)
+        for n, status in enumerate(['NEW', 'RESOLVED', 'RESOLVED']):
+            ticket = Ticket.objects.create(
+                ticket_id=f"T-{n}", customer=customer, category=self.billing, description="x",
+                status=status,
+            )
+            Ticket.objects.filter(pk=ticket.pk).update(
+                created_at=created,
+                resolved_at=created + timedelta(hours=2 * n) if status == 'RESOLVED' else None,
+            )
+        call_command('rebuild_rollups', stdout=StringIO())
+
+        response = self.client.get(reverse('dashboard'), {'status': 'RESOLVED'})
+        self.assertEqual(response.context['total_tickets'], 2)
+        self.assertEqual(response.context['avg_resolution'], timedelta(hours=3))
+        self.assertEqual(
+            response.context['category_counts'], [{'category_name': "Billing", 'count': 2}]
+        )
+
+        response = self.client.get(reverse('dashboard'), {'start_date': str(timezone.localdate())})
+        self.assertEqual(response.context['total_tickets'], 0)
+
+
+@override_settings(STAFF_QUEUE_PAGE_SIZE=5)
+class StaffQueueTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.officer = make_staff("ada")
+        category = Category.objects.create(name="Billing", default_first_level_role="Billing Officer")
+        customer = Customer.objects.create(name="A", email="a@example.com", phone="1")
+        same_time = timezone.now() - timedelta(days=1)
+        for n in range(12):
+            ticket = Ticket.objects.create(
+                ticket_id=f"T-{n:02d}", customer=customer, category=category, description="x",
+                current_assigned_to=cls.officer, status='RESOLVED' if n % 3 == 0 else 'NEW',
+            )
+            # Several tickets share a timestamp so the id tie-breaker matters.
+            Ticket.objects.filter(pk=ticket.pk).update(created_at=same_time + timedelta(hours=n // 4))
+
+    def setUp(self):
+        self.client.force_login(self.officer.user)
+
+    def walk_pages(self, **params):
+        seen, cursor = [], None
+        while True:
+            if cursor:
+                params['cursor'] = cursor
+            # Session, user, staff profile, one page of tickets and the
+            # workload counters: whatever the queue size.
+            with self.assertNumQueries(5):
+                response = self.client.get(reverse('staff_ticket_list'), params)
+            seen += [t.ticket_id for t in response.context['tickets']]
+            cursor = response.context['next_cursor']
+            if not cursor:
+                return seen
+
+    def test_pages_cover_queue_newest_first_without_gaps(self):
+        seen = self.walk_pages()
+
+        expected = list(
+            Ticket.objects.order_by('-created_at', '-pk').values_list('ticket_id', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_status_filter(self):
+        seen = self.walk_pages(status='RESOLVED')
+
+        self.assertEqual(sorted(seen), ["T-00", "T-03", "T-06", "T-09"])
+
+    def test_malformed_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('staff_ticket_list'), {'cursor': "not-a-cursor"})
+
+        self.assertEqual(len(response.context['tickets']), 5)
+
+
+def seed_dataset(staff=40, customers=60, tickets=300, history=30):
+    """
+    A production-shaped dataset: enough staff, tickets and history rows that
+    any per-row query shows up as a large jump in the query count.
+    """
+    roles = ["Billing Officer", "Feeder Engineer", "RPD Officer", "Customer Care", "Supervisor"]
+    categories = [
+        Category.objects.create(name=f"Category {n}", default_first_level_role=role)
+        for n, role in enumerate(roles)
+    ]
+    officers = [
+        make_staff(f"officer{n}", role=roles[n % len(roles)], region=f"Region {n % 4}")
+        for n in range(staff)
+    ]
+    people = Customer.objects.bulk_create([
+        Customer(name=f"Customer {n}", email=f"c{n}@example.com", phone=f"0803{n:07d}")
+        for n in range(customers)
+    ])
+    rows = Ticket.objects.bulk_create([
+        Ticket(
+            ticket_id=f"DISCO-2020-{n:06d}",
+            customer=people[n % customers],
+            category=categories[n % len(categories)],
+            description="Seeded complaint",
+            status=Ticket.STATUS_CHOICES[n % len(Ticket.STATUS_CHOICES)][0],
+            current_assigned_to=officers[n % 2],
+        )
+        for n in range(tickets)
+    ])
+    TicketHistory.objects.bulk_create([
+        TicketHistory(
+            ticket=rows[0],
+            from_staff=officers[n % staff],
+            to_staff=officers[(n + 1) % staff],
+            action_type='ESCALATED',
+            comment="Seeded escalation",
+        )
+        for n in range(history)
+    ])
+    rollups.rebuild()
+    workload.reconcile()
+    return officers, rows
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Pins the number of SQL queries for every route in tickets/urls.py
+    against a realistically sized dataset. A new N+1 makes these fail.
+    """
+    # (url name, method, budget), measured as a logged-in staff user, so
+    # the session and user lookups are included. Savepoints count too, as do
+    # the inserts of workload counter rows the first time an officer or
+    # category has a ticket in some status (an update once the row exists).
+    BUDGETS = [
+        ('home', 'get', 0),
+        ('create_complaint', 'get', 2),
+        ('create_complaint', 'post', 33),
+        ('post_login_redirect', 'get', 2),
+        ('staff_ticket_list', 'get', 5),
+        ('staff_bulk_action', 'post', 53),
+        ('staff_search', 'get', 5),
+        ('staff_picker', 'get', 4),
+        ('staff_ticket_detail', 'get', 5),
+        ('staff_ticket_detail', 'post', 25),
+        ('staff_ticket_history', 'get', 5),
+        ('change_feed', 'get', 3),
+        ('dashboard', 'get', 10),
+        ('dashboard_export', 'get', 3),
+        ('ticket_feedback', 'get', 1),
+        ('ticket_feedback', 'post', 2),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.officers, cls.tickets = seed_dataset()
+        cls.manager = make_staff("manager", role="Supervisor", is_staff=True)
+        cls.category = Category.objects.first()
+
+    def request(self, name, method):
+        ticket = self.tickets[0]
+        resolved = next(t for t in self.tickets if t.status == 'RESOLVED')
+        if name in ('staff_ticket_detail', 'staff_ticket_history'):
+            url = reverse(name, args=[ticket.ticket_id])
+        elif name == 'ticket_feedback':
+            url = reverse(name, args=[resolved.ticket_id])
+        else:
+            url = reverse(name)
+
+        data = {
+            'create_complaint': complaint_data(self.category, 7),
+            'staff_ticket_detail': {
+                'escalate': '1', 'to_staff': self.officers[3].pk, 'comment': "Needs a site visit",
+            },
+            'ticket_feedback': {'rating': '4', 'comment': "Thanks"},
+            # A full queue page.
+            'staff_bulk_action': {
+                'action': 'status', 'status': 'IN_PROGRESS', 'comment': "Backlog review",
+                'tickets': [t.pk for t in self.tickets[:50]],
+            },
+        }
+        params = {'staff_search': {'q': "seeded"}, 'staff_picker': {'q': "staff"}}
+        if method == 'post':
+            return self.client.post(url, data[name])
+        return self.client.get(url, params.get(name))
+
+    def test_every_route_has_a_budget(self):
+        from . import urls
+
+        routes = {p.name for p in urls.urlpatterns}
+        self.assertEqual(routes, {name for name, _, _ in self.BUDGETS})
+
+    def test_query_budgets(self):
+        self.client.force_login(self.manager.user)
+        # Budgets are for warm workers; reference data loads once per process.
+        reference.categories()
+        reference.staff_directory()
+        for name, method, budget in self.BUDGETS:
+            with self.subTest(route=name, method=method):
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self.request(name, method)
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+                self.assertLess(response.status_code, 400)
+                self.assertLessEqual(
+                    len(ctx.captured_queries), budget,
+                    "\n".join(q['sql'] for q in ctx.captured_queries),
+                )
+
+    def test_metrics_middleware_reports_queries(self):
+        self.client.force_login(self.manager.user)
+
+        with self.assertLogs('tickets.perf', 'INFO') as logs:
+            response = self.client.get(reverse('staff_ticket_list'))
+
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="5 queries"')
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['queries'], 5)
+        self.assertEqual(line['path'], reverse('staff_ticket_list'))
+        self.assertIn('SELECT', line['slowest_sql'])
+
+
+class AdminChangelistTests(TestCase):
+    """Changelist queries must not grow with the number of rows on the page."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.officers, cls.tickets = seed_dataset(history=120)
+        cls.admin = User.objects.create_superuser("root", "root@example.com", "pw")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def changelist_queries(self, model, params=None):
+        url = reverse(f'admin:tickets_{model}_changelist')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return response, [q['sql'] for q in ctx.captured_queries]
+
+    def test_changelist_query_counts(self):
+        # Session, user, the bounded count, the page's rows, and the date
+        # hierarchy's range and dates (plus the category filter's choices).
+        for model, params, budget in (
+            ('ticket', {}, 7),
+            ('ticket', {'status__exact': 'NEW'}, 7),
+            ('tickethistory', {}, 6),
+            ('tickethistory', {'action_type__exact': 'ESCALATED'}, 6),
+        ):
+            with self.subTest(model=model, params=params):
+                response, queries = self.changelist_queries(model, params)
+                self.assertLessEqual(len(queries), budget, "\n".join(queries))
+                self.assertGreater(len(response.context['cl'].result_list), 50)
+
+    def test_counts_are_bounded(self):
+        with override_settings(ADMIN_EXACT_COUNT_LIMIT=1000):
+            response, queries = self.changelist_queries('ticket')
+        counts = [sql for sql in queries if 'COUNT(' in sql]
+        self.assertEqual(len(counts), 1)
+        self.assertIn('LIMIT 1001', counts[0])
+        self.assertEqual(response.context['cl'].result_count, 300)
+
+        # Past the limit: no planner estimate on SQLite, so the exact count.
+        with override_settings(ADMIN_EXACT_COUNT_LIMIT=100):
+            response, _ = self.changelist_queries('ticket')
+        self.assertEqual(response.context['cl'].result_count, 300)
+
+        with override_settings(ADMIN_EXACT_COUNT_LIMIT=100), \
+                mock.patch('tickets.pagination.estimated_count', return_value=290_000):
+            response, _ = self.changelist_queries('ticket')
+        self.assertEqual(response.context['cl'].result_count, 290_000)
+
+    def test_search_uses_ticket_id_and_search_index(self):
+        ticket = self.tickets[5]
+        search.rebuild()
+
+        response, queries = self.changelist_queries('ticket', {'q': ticket.ticket_id.lower()})
+        self.assertEqual(list(response.context['cl'].result_list), [ticket])
+        self.assertFalse(any('LIKE' in sql for sql in queries))
+
+        response, _ = self.changelist_queries('ticket', {'q': "seeded"})
+        self.assertEqual(response.context['cl'].result_count, 300)
+
+        response, _ = self.changelist_queries('tickethistory', {'q': self.tickets[0].ticket_id})
+        self.assertEqual(response.context['cl'].result_count, 120)
+
+
+class BulkActionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Billing", default_first_level_role="Billing Officer")
+        cls.officer = make_staff("ada")
+        cls.supervisor = make_staff("bola", role="Supervisor")
+        customer = Customer.objects.create(name="Ngozi", email="n@example.com", phone="1")
+        cls.tickets = [
+            create_ticket(customer=customer, category=cls.category, description="Backlog",
+                          status='NEW', current_assigned_to=cls.officer)
+            for _ in range(30)
+        ]
+        workload.reconcile()
+
+    def setUp(self):
+        self.client.force_login(self.supervisor.user)
+
+    def post(self, **data):
+        return self.client.post(reverse('staff_bulk_action'), data)
+
+    def test_status_change_on_selected_tickets(self):
+        selected = [t.pk for t in self.tickets[:12]]
+        with self.settings(BULK_ACTION_BATCH_SIZE=5):
+            response = self.post(action='status', status='RESOLVED', tickets=selected, comment="Refunded")
+
+        self.assertRedirects(response, reverse('staff_ticket_list'), fetch_redirect_response=False)
+        resolved = Ticket.objects.filter(status='RESOLVED', resolved_at__isnull=False)
+        self.assertEqual(sorted(resolved.values_list('pk', flat=True)), selected)
+        self.assertEqual(TicketHistory.objects.filter(action_type='RESOLVED', comment="Refunded").count(), 12)
+        self.assertEqual(EmailOutbox.objects.filter(subject__contains="resolved").count(), 12)
+        self.assertEqual(workload.check(), [])
+
+        # Already resolved: nothing to do the second time.
+        self.post(action='status', status='RESOLVED', tickets=selected)
+        self.assertEqual(TicketHistory.objects.count(), 12)
+
+    def test_escalate_whole_queue_and_reassign(self):
+        Ticket.objects.filter(pk=self.tickets[0].pk).update(status='IN_PROGRESS')
+        workload.reconcile()
+        self.client.force_login(self.officer.user)
+        self.post(action='escalate', to_staff=self.supervisor.pk, whole_queue='on', queue_status='NEW')
+
+        self.assertEqual(Ticket.objects.filter(status='ESCALATED', current_assigned_to=self.supervisor).count(), 29)
+        self.assertEqual(EmailOutbox.objects.filter(subject__contains="escalated").count(), 29)
+        self.assertEqual(open_tickets(self.supervisor), 29)
+
+        self.post(action='reassign', to_staff=self.officer.pk, tickets=[self.tickets[1].pk])
+        self.assertEqual(Ticket.objects.get(pk=self.tickets[1].pk).current_assigned_to, self.officer)
+        self.assertTrue(TicketHistory.objects.filter(action_type='ASSIGNED', to_staff=self.officer).exists())
+        self.assertEqual(workload.check(), [])
+
+    def test_queries_do_not_grow_with_the_selection(self):
+        def queries(tickets):
+            with CaptureQueriesContext(connection) as ctx:
+                self.post(action='status', status='IN_PROGRESS', tickets=[t.pk for t in tickets])
+            return len(ctx.captured_queries)
+
+        queries(self.tickets[:1])  # creates the counter rows for IN_PROGRESS
+        self.assertEqual(queries(self.tickets[1:4]), queries(self.tickets[4:30]))
+
+    def test_invalid_form_changes_nothing(self):
+        response = self.post(action='escalate', tickets=[self.tickets[0].pk])
+        self.assertRedirects(response, reverse('staff_ticket_list'), fetch_redirect_response=False)
+        self.assertFalse(Ticket.objects.exclude(status='NEW').exists())
+        response = self.client.get(reverse('staff_ticket_list'))
+        self.assertContains(response, "Choose a staff member.")
+
+
+class AssignmentTests(TestCase):
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Billing", default_first_level_role="Billing Officer")
+        self.north = make_staff("north", region="North")
+        self.south = [make_staff(f"south{n}", region="South") for n in range(2)]
+        make_staff("engineer", role="Feeder Engineer", region="North")
+
+    def submit(self, n, region=""):
+        data = complaint_data(self.category, n)
+        data['region'] = region
+        self.client.post(reverse('create_complaint'), data)
+        return Ticket.objects.get(customer__email=data['email'])
+
+    def test_least_loaded_prefers_customer_region(self):
+        assigned = [self.submit(n, region="South").current_assigned_to for n in range(4)]
+
+        self.assertEqual(assigned, self.south * 2)
+        for officer in self.south:
+            self.assertEqual(open_tickets(officer), 2)
+
+    def test_unknown_region_falls_back_to_whole_role(self):
+        set_open_tickets(self.north, 5)
+
+        ticket = self.submit(1, region="Nowhere")
+
+        self.assertEqual(ticket.current_assigned_to, self.south[0])
+
+    def test_closing_a_ticket_frees_the_officer(self):
+        ticket = self.submit(1, region="North")
+        self.client.force_login(self.north.user)
+
+        self.client.post(
+            reverse('staff_ticket_detail', args=[ticket.ticket_id]),
+            {'update_status': '1', 'status': 'CLOSED', 'comment': ''},
+        )
+
+        self.assertEqual(open_tickets(self.north), 0)
+
+    def test_round_robin_and_weighted_strategies(self):
+        round_robin = assignment.RoundRobinStrategy()
+        picks = [round_robin.pick("Billing Officer", region="South") for _ in range(3)]
+        self.assertEqual(picks, [self.south[0], self.south[1], self.south[0]])
+
+        set_open_tickets(self.south[0], 3)
+        set_open_tickets(self.south[1], 1)
+        StaffUser.objects.filter(pk=self.south[0].pk).update(assignment_weight=4)
+        weighted = assignment.WeightedStrategy()
+        self.assertEqual(weighted.pick("Billing Officer", region="South"), self.south[0])
+
+
+class ImportComplaintsTests(TestCase):
+
+    def setUp(self):
+        self.billing = Category.objects.create(name="Billing", default_first_level_role="Billing Officer")
+        self.officers = [make_staff(f"officer{n}") for n in range(2)]
+        customers.resolve_customer("Existing", "c1@example.com", "1")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write_csv(self, rows):
+        path = os.path.join(self.tmp.name, "batch.csv")
+        with open(path, 'w', newline='') as handle:
+            writer = csv.DictWriter(handle, fieldnames=['name', 'email', 'phone', 'category', 'description'])
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def rows(self, count):
+        return [
+            {'name': f"Caller {n}", 'email': f"C{n % 3}@example.com", 'phone': f"080{n}",
+             'category': "billing", 'description': f"IVR complaint {n}"}
+            for n in range(count)
+        ]
+
+    def test_csv_import_in_chunks(self):
+        rows = self.rows(7)
+        rows.append({**rows[0], 'category': "Unknown"})
+        path = self.write_csv(rows)
+
+        out, err = StringIO(), StringIO()
+        call_command('import_complaints', path, chunk_size=3, stdout=out, stderr=err)
+
+        self.assertEqual(Ticket.objects.count(), 7)
+        self.assertEqual(TicketHistory.objects.filter(action_type='ASSIGNED').count(), 7)
+        self.assertEqual(EmailOutbox.objects.count(), 7)
+        # Three distinct callers; one of them matched the existing customer.
+        self.assertEqual(Customer.objects.count(), 3)
+        self.assertIn("Record 8 rejected: unknown category", err.getvalue())
+        self.assertIn("rows/s", out.getvalue())
+        loads = sorted(open_tickets(officer) for officer in self.officers)
+        self.assertEqual(loads, [3, 4])
+        self.assertEqual(DailyTicketRollup.objects.get().ticket_count, 7)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_jsonl_import(self):
+        path = os.path.join(self.tmp.name, "batch.jsonl")
+        with open(path, 'w') as handle:
+            for row in self.rows(2):
+                handle.write(json.dumps(row) + "\n")
+
+        call_command('import_complaints', path, stdout=StringIO())
+
+        self.assertEqual(Ticket.objects.count(), 2)
+
+    def test_resume_from_checkpoint_after_failure(self):
+        path = self.write_csv(self.rows(6))
+        original = ComplaintImporter.import_chunk
+        calls = []
+
+        def fail_second_chunk(importer, rows, **checkpoint):
+            calls.append(len(rows))
+            if len(calls) == 2:
+                raise RuntimeError("database went away")
+            return original(importer, rows, **checkpoint)
+
+        with mock.patch.object(ComplaintImporter, 'import_chunk', fail_second_chunk):
+            with self.assertRaises(RuntimeError):
+                call_command('import_complaints', path, chunk_size=2, stdout=StringIO())
+        self.assertEqual(Ticket.objects.count(), 2)
+
+        out = StringIO()
+        call_command('import_complaints', path, chunk_size=2, stdout=out)
+
+        self.assertIn("Resuming after record 2", out.getvalue())
+        descriptions = sorted(Ticket.objects.values_list('description', flat=True))
+        self.assertEqual(descriptions, [f"IVR complaint {n}" for n in range(6)])
+
+    def test_crash_after_writing_a_chunk_does_not_import_it_twice(self):
+        path = self.write_csv(self.rows(6))
+        original = ComplaintImporter.save_checkpoint
+        calls = []
+
+        def crash_on_second_checkpoint(importer, source, records_done):
+            calls.append(records_done)
+            if len(calls) == 2:
+                # The chunk's tickets are written; the process dies now.
+                raise KeyboardInterrupt
+            return original(importer, source, records_done)
+
+        with mock.patch.object(ComplaintImporter, 'save_checkpoint', crash_on_second_checkpoint):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('import_complaints', path, chunk_size=2, stdout=StringIO())
+        self.assertEqual(Ticket.objects.count(), 2)
+        self.assertEqual(ImportCheckpoint.objects.get().records_done, 2)
+
+        call_command('import_complaints', path, chunk_size=2, stdout=StringIO())
+
+        descriptions = sorted(Ticket.objects.values_list('description', flat=True))
+        self.assertEqual(descriptions, [f"IVR complaint {n}" for n in range(6)])
+
+
+class DashboardExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = make_staff("manager", role="Supervisor", is_staff=True)
+        cls.officers, cls.tickets = seed_dataset(staff=5, tickets=20, history=3)
+
+    def setUp(self):
+        self.client.force_login(self.manager.user)
+
+    def export(self, **params):
+        response = self.client.get(reverse('dashboard_export'), params)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], "text/csv")
+        content = b"".join(response.streaming_content).decode()
+        return list(csv.reader(StringIO(content)))
+
+    def test_export_applies_dashboard_filters(self):
+        rows = self.export(status='RESOLVED')
+
+        self.assertEqual(rows[0][:3], ["Ticket ID", "Status", "Category"])
+        self.assertEqual(len(rows) - 1, Ticket.objects.filter(status='RESOLVED').count())
+        self.assertTrue(all(row[1] == 'RESOLVED' for row in rows[1:]))
+        first = Ticket.objects.filter(status='RESOLVED').order_by('pk').first()
+        self.assertEqual(rows[1][3], first.customer.name)
+
+    def test_history_timeline_is_fetched_per_chunk_not_per_ticket(self):
+        # session, user, tickets, history (one prefetch for the whole chunk)
+        with self.assertNumQueries(4):
+            rows = self.export(include_history='1')
+
+        self.assertEqual(rows[0][-1], "History")
+        self.assertEqual(len(rows) - 1, 20)
+        self.assertEqual(rows[1][-1].count("ESCALATED"), 3)
+        self.assertEqual(rows[2][-1], "")
+
+    def test_formulas_in_customer_text_are_neutralised(self):
+        ticket = Ticket.objects.order_by('pk').first()
+        Customer.objects.filter(pk=ticket.customer_id).update(name="=HYPERLINK(\"http://x\")")
+        Ticket.objects.filter(pk=ticket.pk).update(description="@SUM(A1:A9)")
+
+        for rows in (self.export(), self.export(include_history='1')):
+            self.assertEqual(rows[1][3], "'=HYPERLINK(\"http://x\")")
+            self.assertEqual(rows[1][14], "'@SUM(A1:A9)")
+
+    def test_non_staff_cannot_export(self):
+        self.client.force_login(self.officers[0].user)
+
+        response = self.client.get(reverse('dashboard_export'))
+
+        self.assertEqual(response.status_code, 403)
+
+
+class TicketSearchTests(TestCase):
+
+    def setUp(self):
+        self.billing = Category.objects.create(name="Billing", default_first_level_role="Billing Officer")
+        self.officer = make_staff("ada")
+        self.client.force_login(self.officer.user)
+
+    def submit(self, n, **fields):
+        data = {**complaint_data(self.billing, n), **fields}
+        self.client.post(reverse('create_complaint'), data)
+        return Ticket.objects.filter(customer__email=data['email']).latest('pk')
+
+    def found(self, query):
+        response = self.client.get(reverse('staff_search'), {'q': query})
+        return [t.ticket_id for t in response.context['results']]
+
+    def test_finds_tickets_by_text_meter_and_customer(self):
+        sparks = self.submit(1, description="Wire sparking near the transformer")
+        meter = self.submit(2, meter_number="MTR-00917")
+        self.submit(3)
+
+        self.assertEqual(self.found("sparking transf"), [sparks.ticket_id])
+        self.assertEqual(self.found("MTR-00917"), [meter.ticket_id])
+        self.assertEqual(self.found("customer2@example.com"), [meter.ticket_id])
+        self.assertEqual(self.found(sparks.ticket_id), [sparks.ticket_id])
+        self.assertEqual(self.found('"*'), [])
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', "PostgreSQL tsvector backend")
+    def test_postgres_finds_customer_email_and_ticket_id(self):
+        self.assertIsInstance(search.get_backend(), search.PostgresSearchBackend)
+        ticket = self.submit(4, email="Ada.Obi@Example.com")
+        self.submit(5)
+
+        self.assertEqual(self.found("ada.obi@example.com"), [ticket.ticket_id])
+        self.assertEqual(self.found("ada.obi@exam"), [ticket.ticket_id])
+        self.assertEqual(self.found(ticket.ticket_id), [ticket.ticket_id])
+
+    def test_index_text_splits_like_queries(self):
+        self.assertEqual(search.index_text("DISCO-2026-000001", "Ada.Obi@Example.com"),
+                         "disco 2026 000001 ada obi example com")
+        self.assertEqual(search.query_terms("ada.obi@example.com"), ["ada", "obi", "example", "com"])
+
+    def test_customer_changes_are_reindexed(self):
+        first = self.submit(1, name="Ngozi Okafor")
+        self.submit(1, name="Ngozi Eze")
+
+        self.assertEqual(len(self.found("eze")), 2)
+        self.assertEqual(self.found("okafor"), [])
+        self.assertIn(first.ticket_id, self.found("ngozi"))
+
+    def test_admin_ticket_edits_are_reindexed(self):
+        from django.contrib.admin.sites import site
+
+        ticket = self.submit(1, description="Estimated bill too high")
+        other = Customer.objects.create(name="Tobi Lawal", email="tobi@example.com", phone="2")
+        request = RequestFactory().post('/')
+        request.user = self.officer.user
+        ticket.description = "Meter bypass next door"
+        ticket.customer = other
+        site._registry[Ticket].save_model(request, ticket, None, True)
+
+        self.assertEqual(self.found("bypass"), [ticket.ticket_id])
+        self.assertEqual(self.found("lawal"), [ticket.ticket_id])
+        self.assertEqual(self.found("estimated"), [])
+
+    def test_rebuild_command(self):
+        ticket = self.submit(1, description="Prepaid token rejected")
+        search.get_backend().clear()
+        self.assertEqual(self.found("token"), [])
+
+        call_command('rebuild_search_index', stdout=StringIO())
+
+        self.assertEqual(self.found("token"), [ticket.ticket_id])
+
+
+class CustomerIdentityTests(TestCase):
+
+    def setUp(self):
+        self.billing = Category.objects.create(name="Billing", default_first_level_role="Billing Officer")
+
+    def submit(self, **fields):
+        data = {**complaint_data(self.billing, 1), **fields}
+        self.client.post(reverse('create_complaint'), data)
+        return Ticket.objects.latest('pk').customer
+
+    def test_matches_on_phone_account_or_meter(self):
+        first = self.submit(meter_number="MTR-1")
+        # New email, same phone in another format.
+        by_phone = self.submit(email="new@example.com", phone="+234 803 000 0001")
+        by_meter = self.submit(email="other@example.com", phone="09000000000", meter_number="mtr1")
+
+        self.assertEqual(by_phone.pk, first.pk)
+        self.assertEqual(by_meter.pk, first.pk)
+        self.assertEqual(Customer.objects.count(), 1)
+        self.assertEqual(Customer.objects.get().email, "customer1@example.com")
+        kinds = sorted(CustomerIdentity.objects.values_list('kind', flat=True))
+        self.assertEqual(kinds, ['EMAIL', 'METER', 'PHONE', 'PHONE'])
+
+    def test_shared_phone_does_not_take_over_the_contact_email(self):
+        first = self.submit(name="Ada", email="ada@example.com", phone="08030000001")
+        second = self.submit(name="Bola", email="bola@example.com", phone="08030000009")
+        # Bola reports from Ada's phone with a new email: matched to Ada,
+        # who keeps her name and email and only gains the meter number.
+        shared = self.submit(name="Bola", email="bola.new@example.com", phone="08030000001", meter_number="MTR-5")
+        self.assertEqual(shared.pk, first.pk)
+        first.refresh_from_db()
+        self.assertEqual((first.name, first.email, first.meter_number), ("Ada", "ada@example.com", "MTR-5"))
+        self.assertFalse(CustomerIdentity.objects.filter(value="bola.new@example.com").exists())
+
+        # Her own email still finds her, and Ada's phone stays Ada's.
+        again = self.submit(name="Bola", email="bola@example.com", phone="08030000001")
+        self.assertEqual(again.pk, second.pk)
+        self.assertEqual(Customer.objects.get(pk=first.pk).email, "ada@example.com")
+        self.assertEqual(customers.lookup([('PHONE', "08030000001")]), {('PHONE', "08030000001"): first.pk})
+
+    def test_lookup_is_one_indexed_query(self):
+        customers.resolve_customer("Ada", "ada@example.com", "08030000001", account_number="ACC-9")
+        with CaptureQueriesContext(connection) as ctx:
+            customers.lookup(customers.identity_keys("ada@example.com", "08030000001", "ACC-9"))
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_key_registered_concurrently_is_matched(self):
+        winner = Customer.objects.create(name="Winner", email="race@example.com", phone="")
+        real_lookup = customers.lookup
+        calls = []
+
+        def stale_first_lookup(keys):
+            calls.append(keys)
+            if len(calls) == 1:
+                # Another request registers the email between lookup and insert.
+                customers.add_keys(winner, [('EMAIL', 'race@example.com')])
+                return {}
+            return real_lookup(keys)
+
+        with mock.patch.object(customers, 'lookup', stale_first_lookup):
+            customer, created = customers.resolve_customer("Loser", "Race@example.com", "")
+
+        self.assertFalse(created)
+        self.assertEqual(customer.pk, winner.pk)
+        self.assertEqual(Customer.objects.count(), 1)
+
+    def test_dedupe_command_merges_customers(self):
+        ticket_customers = [
+            Customer.objects.create(name="A", email="a@example.com", phone="08030000001"),
+            Customer.objects.create(name="A", email="A@Example.com ", phone="", account_number="ACC-1"),
+            Customer.objects.create(name="A", email="b@example.com", phone="", account_number="acc1"),
+            Customer.objects.create(name="C", email="c@example.com", phone="08030000002"),
+        ]
+        for n, customer in enumerate(ticket_customers):
+            create_ticket(customer=customer, category=self.billing, description=f"Complaint {n}")
+
+        out = StringIO()
+        call_command('dedupe_customers', dry_run=True, stdout=out)
+        self.assertEqual(Customer.objects.count(), 4)
+        self.assertIn("2 duplicate customers in 1 groups", out.getvalue())
+
+        call_command('dedupe_customers', stdout=StringIO())
+
+        survivor = Customer.objects.get(email="a@example.com")
+        self.assertEqual(Customer.objects.count(), 2)
+        self.assertEqual(survivor.ticket_set.count(), 3)
+        self.assertEqual(survivor.account_number, "ACC-1")
+        matched, created = customers.resolve_customer("A", "b@example.com", "")
+        self.assertEqual((matched.pk, created), (survivor.pk, False))
+
+
+class ReferenceCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.officers, cls.tickets = seed_dataset(staff=5, tickets=5, history=1)
+        cls.manager = make_staff("manager", role="Supervisor", is_staff=True)
+
+    def detail_queries(self):
+        url = reverse('staff_ticket_detail', args=[self.tickets[0].ticket_id])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_detail_page_queries_do_not_grow_with_headcount(self):
+        self.client.force_login(self.manager.user)
+        self.detail_queries()
+        warm = self.detail_queries()
+
+        for n in range(20):
+            make_staff(f"extra{n}")
+        self.detail_queries()  # reloads the directory once
+
+        self.assertEqual(self.detail_queries(), warm)
+
+    def test_saves_invalidate_the_cached_copy(self):
+        category = Category.objects.first()
+        self.assertIn(category.name, dict(reference.category_choices()).values())
+
+        category.name = "Renamed"
+        category.save()
+        self.assertEqual(reference.get_category(category.pk).name, "Renamed")
+
+        user = self.officers[0].user
+        user.first_name = "Chidi"
+        user.save()
+        self.assertEqual(reference.get_staff_entry(self.officers[0].pk).name, "Chidi Officer")
+
+    def test_unchanged_version_costs_no_queries(self):
+        reference.categories()
+        reference.staff_directory()
+        self.manager.user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            reference.categories()
+            reference.staff_directory()
+
+    @override_settings(REFERENCE_CACHE_MAX_AGE=30)
+    def test_per_process_copies_expire(self):
+        self.addCleanup(reference.category_cache.clear)
+        category = Category.objects.first()
+        reference.get_category(category.pk)
+        # A save in another process, whose version bump this one can't see.
+        Category.objects.filter(pk=category.pk).update(name="Renamed elsewhere")
+        self.assertNotEqual(reference.get_category(category.pk).name, "Renamed elsewhere")
+
+        later = time.monotonic() + 31
+        with mock.patch('tickets.reference.time.monotonic', return_value=later):
+            self.assertEqual(reference.get_category(category.pk).name, "Renamed elsewhere")
+
+    def test_escalation_form_rejects_unknown_staff(self):
+        form = EscalationForm({'to_staff': self.officers[1].pk})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['to_staff'], self.officers[1])
+
+        form = EscalationForm({'to_staff': 999999})
+        self.assertFalse(form.is_valid())
+
+
+class StaffPickerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ada = make_staff("ada", role="Feeder Engineer", department="Network", region="Ikeja")
+        cls.bola = make_staff("bola", role="Billing Officer", region="Lekki")
+        cls.chidi = make_staff("chidi", role="Feeder Engineer", region="Lekki")
+        cls.ticket = create_ticket(
+            customer=Customer.objects.create(name="Ngozi", email="n@example.com", phone="1"),
+            category=Category.objects.create(name="Outage", default_first_level_role="Feeder Engineer"),
+            description="Transformer down",
+        )
+
+    def setUp(self):
+        self.client.force_login(self.bola.user)
+
+    def pick(self, q, **params):
+        response = self.client.get(reverse('staff_picker'), {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('max-age=', response['Cache-Control'])
+        return [row['id'] for row in response.json()['results']]
+
+    def test_prefix_search_across_fields(self):
+        self.assertEqual(self.pick("feed"), [self.ada.pk, self.chidi.pk])
+        self.assertEqual(self.pick("Feeder lek"), [self.chidi.pk])
+        self.assertEqual(self.pick("netw"), [self.ada.pk])
+        self.assertEqual(self.pick("CHI"), [self.chidi.pk])
+        self.assertEqual(self.pick("officer", limit=2), [self.ada.pk, self.bola.pk])
+        self.assertEqual(self.pick("%"), [])
+
+    def test_renamed_staff_are_found_under_the_new_name(self):
+        self.assertEqual(self.pick("zainab"), [])
+        user = self.chidi.user
+        user.first_name = "Zainab"
+        user.save()
+        self.assertEqual(self.pick("zain"), [self.chidi.pk])
+
+    def test_counter_saves_leave_the_directory_alone(self):
+        version = reference.staff_cache.version()
+        with mock.patch('tickets.directory.index_staff') as index_staff:
+            self.ada.last_assigned_at = timezone.now()
+            self.ada.save(update_fields=['last_assigned_at'])
+            self.ada.user.save(update_fields=['last_login'])
+        index_staff.assert_not_called()
+        self.assertEqual(reference.staff_cache.version(), version)
+
+        self.ada.role = "Supervisor"
+        self.ada.save(update_fields=['role'])
+        self.assertEqual(self.pick("superv"), [self.ada.pk])
+
+    def test_detail_page_does_not_grow_with_headcount(self):
+        url = reverse('staff_ticket_detail', args=[self.ticket.ticket_id])
+        before = len(self.client.get(url).content)
+        for n in range(30):
+            make_staff(f"extra{n}")
+        self.assertEqual(len(self.client.get(url).content), before)
+
+    def test_escalation_posts_the_picked_id(self):
+        url = reverse('staff_ticket_detail', args=[self.ticket.ticket_id])
+        self.client.post(url, {'escalate': '1', 'to_staff': self.ada.pk, 'comment': "Site visit"})
+        self.ticket.refresh_from_db()
+        self.assertEqual(self.ticket.current_assigned_to, self.ada)
+
+        response = self.client.post(url, {'escalate': '1', 'comment': "Nobody"})
+        self.assertContains(response, "Choose a staff member to escalate to.")
+
+
+class TicketTimelineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.officer = make_staff("ada")
+        cls.other = make_staff("bola")
+        cls.ticket = create_ticket(
+            customer=Customer.objects.create(name="Ngozi", email="n@example.com", phone="1"),
+            category=Category.objects.create(name="Billing", default_first_level_role="Billing Officer"),
+            description="Estimated bill too high",
+        )
+        TicketHistory.objects.bulk_create([
+            TicketHistory(ticket=cls.ticket, from_staff=cls.officer, to_staff=cls.other,
+                          action_type='ESCALATED', comment=f"Bounce {n}")
+            for n in range(45)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.officer.user)
+        self.url = reverse('staff_ticket_detail', args=[self.ticket.ticket_id])
+
+    def test_detail_shows_newest_page_and_fragment_pages_older(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, "Bounce 44")
+        self.assertNotContains(response, "Bounce 24")
+        self.assertContains(response, "Load older entries")
+
+        comments = []
+        url = reverse('staff_ticket_history', args=[self.ticket.ticket_id])
+        before = response.context['next_before']
+        while before:
+            with self.assertNumQueries(5):
+                page = self.client.get(url, {'before': before})
+            comments += [h.comment for h in page.context['history']]
+            before = page.context['next_before']
+        self.assertEqual(comments, [f"Bounce {n}" for n in range(24, -1, -1)])
+
+    def test_unchanged_ticket_returns_304(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response['ETag'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with self.assertNumQueries(4):
+            cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        since = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(since.status_code, 304)
+
+        TicketHistory.objects.create(ticket=self.ticket, action_type='COMMENTED', comment="Called back")
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertContains(changed, "Called back")
+
+    def test_status_change_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.post(self.url, {'update_status': '1', 'status': 'IN_PROGRESS'})
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_customer_edit_and_new_login_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        Customer.objects.filter(pk=self.ticket.customer_id).update(name="Ngozi Eze")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "Ngozi Eze")
+
+        # Logging in again rotates the CSRF secret the page's forms carry.
+        etag = response['ETag']
+        self.client.logout()
+        self.client.force_login(self.officer.user)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class DashboardCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = make_staff("manager", role="Supervisor", is_staff=True)
+        cls.officers, cls.tickets = seed_dataset(staff=5, tickets=30, history=1)
+
+    def setUp(self):
+        self.client.force_login(self.manager.user)
+        dashboard.ticket_data.bump()
+        dashboard.reset_stats()
+
+    def load(self, **params):
+        response = self.client.get(reverse('dashboard'), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_second_load_is_a_cache_hit(self):
+        first = self.load(status='NEW')
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.load(status='NEW')
+
+        self.assertEqual(first['X-Dashboard-Cache'], 'miss')
+        self.assertEqual(second['X-Dashboard-Cache'], 'hit')
+        self.assertEqual(len(ctx.captured_queries), 2)  # session and user only
+        self.assertEqual(second.context['total_tickets'], first.context['total_tickets'])
+        self.assertEqual(self.load()['X-Dashboard-Cache'], 'miss')  # other filters
+        self.assertEqual(dashboard.stats(), {'hit': 1, 'miss': 2, 'stale': 0, 'wait': 0})
+
+    def test_ticket_writes_make_entries_stale(self):
+        total = self.load().context['total_tickets']
+        ticket = self.tickets[0]
+        self.client.post(
+            reverse('staff_ticket_detail', args=[ticket.ticket_id]),
+            {'escalate': '1', 'to_staff': self.officers[1].pk},
+        )
+        self.client.post(reverse('create_complaint'), complaint_data(Category.objects.first(), 99))
+
+        response = self.load()
+        self.assertEqual(response['X-Dashboard-Cache'], 'miss')
+        self.assertEqual(response.context['total_tickets'], total + 1)
+
+    def test_only_one_worker_recomputes(self):
+        self.load()
+        dashboard.ticket_data.bump()
+        filters = hashlib.sha1(repr((None, None, None)).encode()).hexdigest()
+        # Another worker holds the recompute lock for these filters.
+        cache.add(f"dashboard:lock:{filters}", 1)
+        try:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.load()
+        finally:
+            cache.delete(f"dashboard:lock:{filters}")
+
+        self.assertEqual(response['X-Dashboard-Cache'], 'stale')
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertEqual(self.load()['X-Dashboard-Cache'], 'miss')
+
+    def test_waiting_for_another_worker_is_bounded(self):
+        filters = hashlib.sha1(repr(('NEW', None, None)).encode()).hexdigest()
+        lock_key, last_key = f"dashboard:lock:{filters}", f"dashboard:last:{filters}"
+        # Another worker is computing filters with no earlier entry to serve.
+        cache.delete(last_key)
+        cache.add(lock_key, 1)
+        self.addCleanup(cache.delete, lock_key)
+        cache.set(dashboard.COMPUTE_SECONDS_KEY, 0.05)
+
+        started = time.monotonic()
+        response = self.load(status='NEW')
+        # Gave up after about twice the last compute time and computed it.
+        self.assertEqual(response['X-Dashboard-Cache'], 'miss')
+        self.assertLess(time.monotonic() - started, 1)
+
+        # The other worker finishes while this one waits.
+        dashboard.ticket_data.bump()
+        cache.delete(last_key)
+        key = f"dashboard:{dashboard.ticket_data.version()}:{filters}"
+        computed = dashboard.compute(Ticket.objects.all(), status='NEW')
+        finished = lambda seconds: cache.set(key, computed)
+        with mock.patch('tickets.dashboard.time.sleep', side_effect=finished):
+            _, outcome = dashboard.cached_context(Ticket.objects.all(), status='NEW')
+        self.assertEqual(outcome, 'wait')
+        self.assertEqual(dashboard.stats()['wait'], 1)
+
+
+class AsyncPublicViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Billing", default_first_level_role="Billing Officer")
+        cls.officer = make_staff("ada")
+
+    async def test_complaint_submission_under_asgi(self):
+        client = AsyncClient()
+        form = await client.get(reverse('create_complaint'))
+        self.assertContains(form, "Billing")
+
+        response = await client.post(reverse('create_complaint'), complaint_data(self.category, 5))
+
+        ticket = await Ticket.objects.select_related('current_assigned_to').aget()
+        self.assertContains(response, ticket.ticket_id)
+        self.assertEqual(ticket.current_assigned_to, self.officer)
+        self.assertEqual(await EmailOutbox.objects.filter(ticket=ticket).acount(), 1)
+        # Queries made on sync_to_async threads are still counted.
+        self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
+
+    async def test_feedback_under_asgi(self):
+        customer = await Customer.objects.acreate(name="Ngozi", email="n@example.com", phone="1")
+        ticket = await Ticket.objects.acreate(
+            ticket_id="DISCO-2020-000001", customer=customer, category=self.category,
+            description="Fixed", status='RESOLVED',
+        )
+        url = reverse('ticket_feedback', args=[ticket.ticket_id])
+
+        response = await AsyncClient().post(url, {'rating': '5', 'comment': "Quick fix"})
+
+        self.assertEqual(response.status_code, 200)
+        await ticket.arefresh_from_db()
+        self.assertEqual((ticket.satisfaction_rating, ticket.satisfaction_comment), (5, "Quick fix"))
+        missing = await AsyncClient().get(reverse('ticket_feedback', args=["DISCO-0000-000000"]))
+        self.assertEqual(missing.status_code, 404)
+
+
+class SlaScannerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.outage = Category.objects.create(
+            name="Outage", default_first_level_role="Feeder Engineer", sla_hours=4,
+        )
+        cls.billing = Category.objects.create(
+            name="Billing", default_first_level_role="Billing Officer", sla_hours=48,
+        )
+        cls.engineer = make_staff("eng", role="Feeder Engineer")
+        cls.supervisors = [make_staff(f"sup{n}", role="Supervisor") for n in range(2)]
+        cls.customer = Customer.objects.create(name="Ngozi", email="n@example.com", phone="1")
+
+    def make_ticket(self, category, hours_old, status='NEW'):
+        ticket = create_ticket(
+            customer=self.customer, category=category, description="Still waiting",
+            status=status, current_assigned_to=self.engineer,
+        )
+        Ticket.objects.filter(pk=ticket.pk).update(created_at=timezone.now() - timedelta(hours=hours_old))
+        return ticket
+
+    def test_escalates_breaching_tickets_in_batches(self):
+        late = [self.make_ticket(self.outage, 5 + n) for n in range(5)]
+        self.make_ticket(self.outage, 1)
+        self.make_ticket(self.billing, 5)
+        self.make_ticket(self.outage, 9, status='RESOLVED')
+
+        self.assertEqual(sla.scan(batch_size=2), 5)
+
+        escalated = Ticket.objects.filter(status='ESCALATED')
+        self.assertEqual(sorted(t.pk for t in escalated), sorted(t.pk for t in late))
+        self.assertEqual(
+            sorted(escalated.values_list('current_assigned_to', flat=True)),
+            sorted([self.supervisors[0].pk] * 3 + [self.supervisors[1].pk] * 2),
+        )
+        self.assertEqual(SlaBreach.objects.count(), 5)
+        self.assertEqual(TicketHistory.objects.filter(action_type='ESCALATED').count(), 5)
+        self.assertEqual(EmailOutbox.objects.count(), 5)
+        self.assertEqual(open_tickets(self.supervisors[0]), 3)
+
+    def test_rescans_only_read_newly_aged_tickets(self):
+        self.make_ticket(self.outage, 6)
+        sla.scan()
+        # Back in progress after the escalation: not escalated again.
+        Ticket.objects.filter(status='ESCALATED').update(status='IN_PROGRESS')
+
+        self.assertEqual(sla.scan(), 0)
+        fresh = self.make_ticket(self.outage, 0)
+        self.assertEqual(sla.scan(), 0)
+        self.assertEqual(sla.scan(now=timezone.now() + timedelta(hours=5)), 1)
+        self.assertEqual(SlaBreach.objects.get(ticket=fresh).escalated_from, self.engineer)
+
+    def test_dashboard_lists_open_breaches(self):
+        manager = make_staff("manager", role="Director", is_staff=True)
+        ticket = self.make_ticket(self.outage, 8)
+        call_command('scan_sla', stdout=StringIO())
+
+        self.client.force_login(manager.user)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual([b['ticket_id'] for b in response.context['sla_breaches']], [ticket.ticket_id])
+        self.assertEqual(response.context['sla_breach_total'], 1)
+
+
+class TicketArchiveTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.officer = make_staff("ada")
+        cls.category = Category.objects.create(name="Billing", default_first_level_role="Billing Officer")
+        cls.customer = Customer.objects.create(name="Ngozi", email="n@example.com", phone="1")
+
+    def make_ticket(self, status, days_old):
+        ticket = create_ticket(
+            customer=self.customer, category=self.category, description="Estimated bill",
+            status=status, current_assigned_to=self.officer,
+        )
+        TicketHistory.objects.create(
+            ticket=ticket, from_staff=self.officer, to_staff=self.officer,
+            action_type='STATUS_CHANGED', comment=f"{status} ticket",
+        )
+        created = timezone.now() - timedelta(days=days_old)
+        Ticket.objects.filter(pk=ticket.pk).update(created_at=created, resolved_at=created)
+        return ticket
+
+    def test_moves_old_closed_tickets_and_history_in_batches(self):
+        old = [self.make_ticket('CLOSED', 400 + n) for n in range(3)]
+        recent = self.make_ticket('CLOSED', 10)
+        still_open = self.make_ticket('RESOLVED', 400)
+
+        self.assertEqual(list(archive.archive(days=365, batch_size=2, max_batches=1)), [2])
+        self.assertEqual(list(archive.archive(days=365, batch_size=2)), [1])
+
+        self.assertEqual(
+            sorted(ArchivedTicket.objects.values_list('ticket_id', flat=True)),
+            sorted(t.ticket_id for t in old),
+        )
+        self.assertEqual(set(Ticket.objects.values_list('pk', flat=True)), {recent.pk, still_open.pk})
+        self.assertEqual(ArchivedTicketHistory.objects.filter(ticket_id__in=[t.pk for t in old]).count(), 3)
+        entry = ArchivedTicketHistory.objects.select_related('ticket').get(ticket_id=old[0].pk)
+        self.assertTrue(str(entry).startswith(f"{old[0].ticket_id} - STATUS_CHANGED"))
+        self.assertEqual(TicketHistory.objects.filter(ticket_id__in=[t.pk for t in old]).count(), 0)
+
+    def test_incident_leads_are_archived_after_their_reports(self):
+        lead = self.make_ticket('CLOSED', 400)
+        report = self.make_ticket('CLOSED', 399)
+        incident = Incident.objects.create(
+            category=self.category, region="ikeja", lead_ticket=lead,
+            opened_at=lead.created_at, last_report_at=lead.created_at, resolved_at=timezone.now(),
+        )
+        Ticket.objects.filter(pk=report.pk).update(incident=incident)
+
+        self.assertEqual(list(archive.archive(days=365, batch_size=1, max_batches=1)), [1])
+        self.assertEqual(list(Ticket.objects.values_list('pk', flat=True)), [lead.pk])
+        self.assertEqual(Incident.objects.get().lead_ticket_id, lead.pk)
+
+        self.assertEqual(list(archive.archive(days=365)), [1])
+        self.assertFalse(Ticket.objects.exists())
+        self.assertFalse(Incident.objects.exists())
+
+    def test_rollups_still_count_archived_tickets(self):
+        self.make_ticket('CLOSED', 400)
+        self.make_ticket('NEW', 1)
+        rollups.rebuild()
+        expected = rollups.dashboard_summary()
+        list(archive.archive(days=365))
+
+        self.assertEqual(rollups.dashboard_summary()['total_tickets'], 2)
+        rollups.rebuild()
+        self.assertEqual(rollups.dashboard_summary(), expected)
+
+    def test_archived_ticket_pages_are_read_only(self):
+        ticket = self.make_ticket('CLOSED', 400)
+        list(archive.archive(days=365))
+
+        self.client.force_login(self.officer.user)
+        response = self.client.get(reverse('staff_ticket_detail', args=[ticket.ticket_id]))
+        self.assertContains(response, "Archived")
+        self.assertContains(response, "CLOSED ticket")
+        self.assertNotContains(response, "Escalate Ticket")
+
+        response = self.client.post(reverse('staff_ticket_detail', args=[ticket.ticket_id]), {
+            'update_status': '1', 'status': 'NEW',
+        })
+        self.assertEqual(ArchivedTicket.objects.get(pk=ticket.pk).status, 'CLOSED')
+
+        response = self.client.get(reverse('ticket_feedback', args=[ticket.ticket_id]))
+        self.assertTemplateUsed(response, "tickets/feedback_not_allowed.html")
+        self.assertEqual(self.client.get(reverse('ticket_feedback', args=["NOPE-1"])).status_code, 404)
+
+    def test_new_ticket_ids_continue_after_archived_ones(self):
+        ticket = self.make_ticket('CLOSED', 400)
+        list(archive.archive(days=365))
+        Ticket.objects.all().delete()
+        TicketSequence.objects.all().delete()
+        _block_cache.clear()
+
+        year = current_year()
+        last = int(ticket.ticket_id.rsplit("-", 1)[1])
+        self.assertEqual(next_ticket_id(year), format_ticket_id(year, last + 1))
+
+
+class SeedLoadTests(TestCase):
+
+    def test_seeded_data_is_consistent(self):
+        counts = seeding.seed(customers=30, staff=20, tickets=150, history=1, days=60, batch_size=40)
+        self.assertEqual(counts['tickets'], Ticket.objects.count())
+        self.assertEqual(counts['history'], TicketHistory.objects.count())
+        self.assertEqual(rollups.dashboard_summary()['total_tickets'], 150)
+        self.assertEqual(Ticket.objects.values('ticket_id').distinct().count(), 150)
+        self.assertTrue(Ticket.objects.filter(created_at__lt=timezone.now() - timedelta(days=30)).exists())
+        self.assertEqual(CustomerIdentity.objects.filter(kind='EMAIL').count(), 30)
+        for staff in StaffUser.objects.all():
+            self.assertEqual(
+                open_tickets(staff),
+                staff.assigned_tickets.filter(status__in=Ticket.OPEN_STATUSES).count(),
+            )
+        user = User.objects.get(username="load-staff-0")
+        self.assertTrue(user.check_password("loadtest"))
+
+        # A second run adds to the first.
+        seeding.seed(customers=5, staff=2, tickets=10, batch_size=40)
+        self.assertEqual(Ticket.objects.count(), 160)
+
+    def test_bench_routes_covers_every_route(self):
+        from .urls import urlpatterns
+
+        self.assertEqual({r.name for r in benchmark.ROUTES}, {p.name for p in urlpatterns})
+        seeding.seed(customers=20, staff=20, tickets=100, batch_size=50)
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "run.json")
+            call_command('bench_routes', requests=2, output=output, stdout=StringIO())
+            with open(output) as f:
+                run = json.load(f)
+        self.assertEqual(len(run['routes']), len(benchmark.ROUTES))
+        for result in run['routes']:
+            self.assertEqual(result['errors'], 0, result['route'])
+            self.assertEqual(result['requests'], 2)
+        self.assertEqual(Ticket.objects.count(), 100)
+
+
+@override_settings(DATABASE_REPLICA_PIN_SECONDS=10)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Routing decisions only; no queries are run against the replica."""
+
+    def setUp(self):
+        patcher = mock.patch.object(routing, 'replica_alias', return_value='replica')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(connections['default'], 'in_atomic_block', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = routing.PrimaryReplicaRouter()
+
+    def test_only_reporting_reads_go_to_the_replica(self):
+        self.assertEqual(self.router.db_for_read(Ticket), 'default')
+        with routing.reporting():
+            self.assertEqual(self.router.db_for_read(Ticket), 'replica')
+            with routing.primary():
+                self.assertEqual(self.router.db_for_read(Ticket), 'default')
+            self.assertEqual(self.router.db_for_read(Ticket), 'replica')
+            with mock.patch.object(connections['default'], 'in_atomic_block', True):
+                self.assertEqual(self.router.db_for_read(Ticket), 'default')
+            self.assertEqual(self.router.db_for_write(Ticket), 'default')
+            # Reads after a write in the same block see the primary.
+            self.assertEqual(self.router.db_for_read(Ticket), 'default')
+        self.assertFalse(self.router.allow_migrate('replica', 'tickets'))
+
+    def test_writes_pin_the_user_to_the_primary(self):
+        seen = []
+
+        def view(request):
+            with routing.reporting():
+                seen.append(routing.read_alias())
+            if request.method == 'POST':
+                self.router.db_for_write(Ticket)
+            return HttpResponse()
+
+        middleware = routing.ReplicaPinMiddleware(view)
+        factory = RequestFactory()
+        self.assertNotIn(routing.PIN_COOKIE, middleware(factory.get('/')).cookies)
+        response = middleware(factory.post('/'))
+        self.assertEqual(response.cookies[routing.PIN_COOKIE]['max-age'], 10)
+
+        request = factory.get('/')
+        request.COOKIES[routing.PIN_COOKIE] = '1'
+        middleware(request)
+        self.assertEqual(seen, ['replica', 'replica', 'default'])
+
+
+class DashboardReplicaTests(TransactionTestCase):
+    """A real, lagging SQLite replica: a copy of the primary taken before the latest write."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp = tempfile.TemporaryDirectory()
+        settings_dict = {**connections['default'].settings_dict,
+                         'NAME': os.path.join(cls.tmp.name, "replica.sqlite3")}
+        connections['replica'] = connections['default'].__class__(settings_dict, alias='replica')
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        cls.tmp.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        patcher = mock.patch.object(routing, 'replica_alias', return_value='replica')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        dashboard.ticket_data.bump()
+
+        self.billing = Category.objects.create(name="Billing", default_first_level_role="Billing Officer")
+        make_staff("officer")
+        self.manager = make_staff("manager", role="Supervisor", is_staff=True)
+        Client().post(reverse('create_complaint'), complaint_data(self.billing, 1))
+        self.sync_replica()
+
+    def sync_replica(self):
+        for alias in ('default', 'replica'):
+            connections[alias].ensure_connection()
+        connections['default'].connection.backup(connections['replica'].connection)
+
+    def test_dashboard_is_not_cached_from_a_lagging_replica(self):
+        self.client.force_login(self.manager.user)
+        self.assertEqual(self.client.get(reverse('dashboard')).context['total_tickets'], 1)
+
+        # Submitted by someone else: this viewer is not pinned to the primary.
+        Client().post(reverse('create_complaint'), complaint_data(self.billing, 2))
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response['X-Dashboard-Cache'], 'miss')
+        self.assertEqual(response.context['total_tickets'], 2)
+        self.assertEqual(self.client.get(reverse('dashboard')).context['total_tickets'], 2)
+
+
+class WorkloadCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Billing", default_first_level_role="Billing Officer")
+        cls.officer = make_staff("ada")
+        cls.supervisor = make_staff("bola", role="Supervisor")
+
+    def test_counters_follow_submission_status_change_and_escalation(self):
+        self.client.post(reverse('create_complaint'), complaint_data(self.category))
+        ticket = Ticket.objects.get()
+        self.assertEqual(workload.staff_counts(self.officer)['NEW'], 1)
+        self.assertEqual(
+            workload.category_counts(), {self.category.pk: {'NEW': 1, 'IN_PROGRESS': 0, 'ESCALATED': 0}},
+        )
+
+        self.client.force_login(self.officer.user)
+        url = reverse('staff_ticket_detail', args=[ticket.ticket_id])
+        self.client.post(url, {'update_status': '1', 'status': 'IN_PROGRESS', 'comment': ""})
+        self.client.post(url, {'escalate': '1', 'to_staff': self.supervisor.pk, 'comment': "Site visit"})
+
+        self.assertEqual(workload.staff_counts(self.officer), {'NEW': 0, 'IN_PROGRESS': 0, 'ESCALATED': 0})
+        self.assertEqual(workload.staff_counts(self.supervisor)['ESCALATED'], 1)
+        self.assertEqual(workload.category_counts()[self.category.pk]['ESCALATED'], 1)
+        self.assertEqual(workload.check(), [])
+
+        response = self.client.get(reverse('staff_ticket_list'))
+        self.assertEqual(response.context['queue_counts']['ESCALATED'], 0)
+
+    def test_reconcile_repairs_drift(self):
+        for _ in range(3):
+            self.client.post(reverse('create_complaint'), complaint_data(self.category))
+        StaffWorkload.objects.update(ticket_count=7)
+        CategoryWorkload.objects.all().delete()
+
+        out = StringIO()
+        call_command('reconcile_workload', '--dry-run', stdout=out)
+        self.assertIn("2 counters have drifted", out.getvalue())
+
+        call_command('reconcile_workload', stdout=StringIO())
+        self.assertEqual(workload.check(), [])
+        self.assertEqual(workload.staff_counts(self.officer)['NEW'], 3)
+
+
+class IncidentTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.outage = Category.objects.create(
+            name="Power Outage", default_first_level_role="Feeder Engineer", sla_hours=4,
+            coalesce_incidents=True,
+        )
+        cls.engineer = make_staff("eng", role="Feeder Engineer", region="Ikeja")
+
+    def report(self, n, region="Ikeja", feeder="Ikeja 11kV"):
+        data = complaint_data(self.outage, n)
+        data.update(region=region, feeder=feeder)
+        self.client.post(reverse('create_complaint'), data)
+        return Ticket.objects.get(customer__email=data['email'])
+
+    def test_storm_reports_join_one_incident(self):
+        lead = self.report(0)
+        reports = [self.report(n, feeder=" ikeja 11KV") for n in range(1, 5)]
+        other_feeder = self.report(5, feeder="Ikeja 33kV")
+
+        incident = Incident.objects.get(lead_ticket=lead)
+        self.assertEqual(incident.report_count, 5)
+        self.assertEqual(lead.current_assigned_to, self.engineer)
+        self.assertTrue(all(t.incident == incident and t.current_assigned_to is None for t in reports))
+        self.assertIsNone(other_feeder.incident)
+        self.assertEqual(Incident.objects.count(), 2)
+        # Only the lead tickets are in the queue and have history.
+        self.assertEqual(workload.staff_counts(self.engineer)['NEW'], 2)
+        self.assertEqual(TicketHistory.objects.count(), 2)
+        self.assertEqual(EmailOutbox.objects.count(), 6)
+        self.assertEqual(workload.check(), [])
+
+        # Reports further apart than the window start a new incident.
+        Incident.objects.update(last_report_at=timezone.now() - timedelta(hours=1))
+        self.assertIsNone(self.report(6).incident)
+        self.assertEqual(Incident.objects.count(), 3)
+
+    @override_settings(INCIDENT_RESOLVE_BATCH_SIZE=2)
+    def test_resolving_the_lead_resolves_every_report(self):
+        lead = self.report(0)
+        for n in range(1, 6):
+            self.report(n)
+        EmailOutbox.objects.all().delete()
+
+        self.client.force_login(self.engineer.user)
+        self.client.post(reverse('staff_ticket_detail', args=[lead.ticket_id]), {
+            'update_status': '1', 'status': 'RESOLVED', 'comment': "Feeder restored",
+        })
+
+        self.assertEqual(Ticket.objects.filter(status='RESOLVED', resolved_at__isnull=False).count(), 6)
+        self.assertEqual(
+            TicketHistory.objects.filter(action_type='RESOLVED', comment="Feeder restored").count(), 6,
+        )
+        self.assertEqual(EmailOutbox.objects.filter(subject__contains="resolved").count(), 6)
+        self.assertIsNotNone(Incident.objects.get().resolved_at)
+        self.assertEqual(workload.check(), [])
+        self.assertEqual(rollups.dashboard_summary()['status_counts'], [{'status': 'RESOLVED', 'count': 6}])
+
+        # The next report after the fix is a new outage.
+        self.assertIsNone(self.report(9).incident)
+
+    def test_closing_the_lead_in_the_admin_closes_every_report(self):
+        from django.contrib.admin.sites import site
+
+        lead = self.report(0)
+        self.report(1)
+        request = RequestFactory().post('/')
+        request.user = self.engineer.user
+        lead.status = 'CLOSED'
+        site._registry[Ticket].save_model(request, lead, None, True)
+
+        self.assertEqual(Ticket.objects.filter(status='CLOSED').count(), 2)
+        self.assertIsNotNone(Incident.objects.get().resolved_at)
+        self.assertEqual(workload.check(), [])
+
+    def test_bulk_reassigning_a_finished_lead_leaves_its_incident(self):
+        lead = self.report(0)
+        report = self.report(1)
+        Ticket.objects.filter(pk=lead.pk).update(status='RESOLVED', updated_at=timezone.now())
+        other = make_staff("eng2", role="Feeder Engineer")
+
+        self.client.force_login(self.engineer.user)
+        response = self.client.post(reverse('staff_bulk_action'), {
+            'action': 'reassign', 'to_staff': other.pk, 'tickets': [lead.pk], 'comment': "Handover",
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Ticket.objects.get(pk=lead.pk).current_assigned_to, other)
+        self.assertEqual(Ticket.objects.get(pk=report.pk).status, 'NEW')
+        self.assertIsNone(Incident.objects.get().resolved_at)
+
+    def test_sla_scanner_only_escalates_the_lead(self):
+        make_staff("sup", role="Supervisor")
+        lead = self.report(0)
+        self.report(1)
+        Ticket.objects.update(created_at=timezone.now() - timedelta(hours=6))
+
+        self.assertEqual(sla.scan(), 1)
+        self.assertEqual(Ticket.objects.get(status='ESCALATED'), lead)
+
+
+@override_settings(FEED_SETTLE_SECONDS=0, FEED_POLL_SECONDS=0.05, CHANGE_FEED_TOKENS=["crm-token"])
+class ChangeFeedTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.officers, cls.tickets = seed_dataset(staff=4, tickets=20, history=0)
+        cls.entries = TicketHistory.objects.bulk_create([
+            TicketHistory(ticket=cls.tickets[n % 20], from_staff=cls.officers[0], to_staff=cls.officers[1],
+                          action_type='COMMENTED', comment=f"Note {n}")
+            for n in range(25)
+        ])
+        cls.manager = make_staff("manager", role="Supervisor", is_staff=True)
+
+    def get(self, **params):
+        return self.client.get(reverse('change_feed'), params, HTTP_AUTHORIZATION="Bearer crm-token")
+
+    def test_pages_follow_the_cursor(self):
+        seen, cursor = [], 0
+        while True:
+            with CaptureQueriesContext(connection) as ctx:
+                data = self.get(cursor=cursor, limit=10).json()
+            self.assertEqual(len(ctx.captured_queries), 1)
+            seen += [event['comment'] for event in data['events']]
+            cursor = data['next_cursor']
+            if not data['has_more']:
+                break
+        self.assertEqual(seen, [f"Note {n}" for n in range(25)])
+        self.assertEqual(cursor, self.entries[-1].pk)
+
+        event = self.get(cursor=self.entries[0].pk - 1, limit=1).json()['events'][0]
+        self.assertEqual(event['ticket']['ticket_id'], self.tickets[0].ticket_id)
+        self.assertEqual(event['ticket']['customer']['email'], self.tickets[0].customer.email)
+        self.assertEqual(event['to_staff']['id'], self.officers[1].pk)
+        self.assertEqual(event['to_staff']['name'], "Officer1 Officer")
+
+    def test_long_poll_returns_empty_page_after_wait(self):
+        cursor = self.entries[-1].pk
+        data = self.get(cursor=cursor, wait="0.2").json()
+        self.assertEqual(data, {'events': [], 'next_cursor': cursor, 'has_more': False})
+
+    def test_unsettled_events_are_held_back(self):
+        with self.settings(FEED_SETTLE_SECONDS=60):
+            data = self.get(cursor=0).json()
+        self.assertEqual(data['events'], [])
+        self.assertEqual(data['next_cursor'], 0)
+
+    def test_requires_token_or_staff_session(self):
+        url = reverse('change_feed')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION="Bearer wrong").status_code, 401)
+        self.client.force_login(self.officers[0].user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(self.manager.user)
+        self.assertEqual(self.client.get(url, {'limit': 2}).json()['next_cursor'], self.entries[1].pk)
+
+    def test_tail_command_resumes_from_cursor_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cursor")
+            out = StringIO()
+            call_command('tail_feed', '--limit', '10', '--cursor-file', path, stdout=out, stderr=StringIO())
+            self.assertEqual(len(out.getvalue().splitlines()), 25)
+            self.assertEqual(json.loads(out.getvalue().splitlines()[-1])['comment'], "Note 24")
+
+            TicketHistory.objects.create(ticket=self.tickets[0], action_type='COMMENTED', comment="Later")
+            out = StringIO()
+            call_command('tail_feed', '--cursor-file', path, stdout=out, stderr=StringIO())
+            self.assertEqual([json.loads(line)['comment'] for line in out.getvalue().splitlines()], ["Later"])
+
+
+COMPRESSED_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "tickets.assets.CompressedManifestStaticFilesStorage"},
+}
+
+
+class StaticAssetTests(SimpleTestCase):
+    CSS = ".ticket-card { margin: 0 auto; padding: 1rem; }\n" * 200
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        source, self.root = os.path.join(tmp.name, "src"), os.path.join(tmp.name, "root")
+        os.makedirs(os.path.join(source, "css"))
+        with open(os.path.join(source, "css", "site.css"), "w") as f:
+            f.write(self.CSS)
+        with open(os.path.join(source, "robots.txt"), "w") as f:
+            f.write("x")
+        overrides = override_settings(
+            STATIC_ROOT=self.root, STATICFILES_DIRS=[source], SERVE_STATIC_ASSETS=True,
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+            STORAGES=COMPRESSED_STORAGES,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        call_command('collectstatic', '--noinput', verbosity=0)
+        with open(os.path.join(self.root, "staticfiles.json")) as f:
+            self.hashed = "/static/" + json.load(f)['paths']['css/site.css']
+
+    def test_collectstatic_writes_hashed_names_and_compressed_variants(self):
+        self.assertRegex(self.hashed, r'^/static/css/site\.[0-9a-f]{12}\.css$')
+        path = os.path.join(self.root, self.hashed[len("/static/"):])
+        with open(path + ".gz", "rb") as f:
+            self.assertEqual(gzip.decompress(f.read()).decode(), self.CSS)
+        self.assertEqual(os.path.exists(path + ".br"), assets.brotli is not None)
+        # Too small to gain anything from compression.
+        self.assertFalse(os.path.exists(os.path.join(self.root, "robots.txt.gz")))
+
+    def test_negotiates_content_encoding(self):
+        response = self.client.get(self.hashed, HTTP_ACCEPT_ENCODING="gzip, deflate, br")
+        self.assertEqual(response['Content-Encoding'], 'br' if assets.brotli else 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Content-Type'], 'text/css')
+
+        response = self.client.get(self.hashed, HTTP_ACCEPT_ENCODING="br;q=0, gzip")
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content).decode(), self.CSS)
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+
+        response = self.client.get(self.hashed, HTTP_ACCEPT_ENCODING="identity")
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(response.content.decode(), self.CSS)
+
+    def test_hashed_names_are_immutable_and_others_revalidate(self):
+        self.assertEqual(self.client.get(self.hashed)['Cache-Control'], assets.IMMUTABLE)
+
+        response = self.client.get("/static/css/site.css")
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        again = self.client.get("/static/css/site.css", HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_head_and_unknown_paths(self):
+        response = self.client.head(self.hashed, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"")
+        self.assertGreater(int(response['Content-Length']), 0)
+        self.assertEqual(self.client.get("/static/css/missing.css").status_code, 404)
+        self.assertEqual(self.client.get("/static/../manage.py").status_code, 404)
+        with override_settings(SERVE_STATIC_ASSETS=False):
+            self.assertEqual(self.client.get(self.hashed).status_code, 404)
+
+
+class StaticBenchmarkTests(TestCase):
+
+    def test_bench_static_reports_smaller_pages(self):
+        make_staff("boss", role="Supervisor", is_staff=True)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        out = StringIO()
+        with override_settings(
+            STATIC_ROOT=tmp.name, STORAGES=COMPRESSED_STORAGES,
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+        ):
+            call_command('collectstatic', '--noinput', verbosity=0)
+            call_command('bench_static', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split()[0] for line in lines[1:4]], ["login", "complaint", "dashboard"])
+        self.assertIn("less)", lines[-1])
@@ -0,0 +1,139 @@
+# tickets/ticket_ids.py
+"""
+Ticket ID allocation.
+
+IDs look like DISCO-YYYY-XXXXXX. Every year has a single TicketSequence row
+that is bumped with one `UPDATE ... SET last_value = last_value + n`, so
+handing out an ID costs the same no matter how many tickets already exist.
+
+Worker processes can reserve IDs in blocks (settings.TICKET_ID_BLOCK_SIZE)
+so the counter row is touched once per block instead of once per complaint.
+IDs left over in a block when a worker stops are simply skipped.
+"""
+import re
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, IntegerField, Max
+from django.db.models.functions import Cast, Substr
+from django.utils import timezone
+
+from .models import ArchivedTicket, Ticket, TicketSequence
+
+PREFIX = "DISCO"
+
+
+def format_ticket_id(year, number):
+    return f"{PREFIX}-{year}-{number:06d}"
+
+
+def current_year():
+    return timezone.localdate().year
+
+
+def _seed_value(year):
+    """
+    Highest number already used for `year` by tickets created before the
+    sequence row existed. Compared as integers, since numbers past 999999
+    outgrow the zero padding. Only runs once per year.
+    """
+    prefix = f"{PREFIX}-{year}-"
+    number = Cast(Substr('ticket_id', len(prefix) + 1), IntegerField())
+    return max(
+        model.objects.filter(ticket_id__regex=rf'^{re.escape(prefix)}[0-9]+$')
+        .aggregate(last=Max(number))['last'] or 0
+        for model in (Ticket, ArchivedTicket)
+    )
+
+
+def reserve(count=1, year=None):
+    """
+    Atomically reserve `count` consecutive sequence numbers for `year`
+    and return them as a range.
+    """
+    year = year or current_year()
+    sequences = TicketSequence.objects.filter(year=year)
+
+    with transaction.atomic():
+        if not sequences.update(last_value=F('last_value') + count):
+            try:
+                with transaction.atomic():
+                    TicketSequence.objects.create(
+                        year=year, last_value=_seed_value(year) + count
+                    )
+            except IntegrityError:
+                # Another worker created this year's row first.
+                sequences.update(last_value=F('last_value') + count)
+        last_value = sequences.values_list('last_value', flat=True).get()
+
+    return range(last_value - count + 1, last_value + 1)
+
+
+class _BlockCache:
+    """Per-process pool of reserved sequence numbers, one block per year."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._blocks = {}
+
+    def next(self, year, block_size):
+        with self._lock:
+            block = self._blocks.get(year)
+            number = next(block, None) if block else None
+            if number is None:
+                block = iter(reserve(block_size, year))
+                self._blocks[year] = block
+                number = next(block)
+            return number
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+
+
+_block_cache = _BlockCache()
+
+
+def next_ticket_id(year=None):
+    """
+    Return a fresh ticket ID.
+
+    Call this outside `transaction.atomic()` where possible: the counter row
+    is then only locked for a single statement. Inside an atomic block the
+    reservation could still be rolled back, so the process-wide block cache is
+    bypassed and exactly one number is reserved.
+    """
+    year = year or current_year()
+    block_size = getattr(settings, 'TICKET_ID_BLOCK_SIZE', 1)
+
+    if block_size > 1 and not connection.in_atomic_block:
+        number = _block_cache.next(year, block_size)
+    else:
+        number = reserve(1, year)[0]
+    return format_ticket_id(year, number)
+
+
+def allocate_ticket_ids(count, year=None):
+    """Reserve `count` IDs in one round trip, e.g. for bulk imports."""
+    year = year or current_year()
+    return [format_ticket_id(year, n) for n in reserve(count, year)]
+
+
+def create_ticket(ticket_id=None, **fields):
+    """
+    Insert a Ticket, retrying with a newly allocated ID if `ticket_id`
+    collides with an existing one (e.g. a number reused after a restore).
+    """
+    attempts = getattr(settings, 'TICKET_ID_MAX_ATTEMPTS', 5)
+
+    for attempt in range(1, attempts + 1):
+        ticket_id = ticket_id or next_ticket_id()
+        try:
+            with transaction.atomic():
+                return Ticket.objects.create(ticket_id=ticket_id, **fields)
+        except IntegrityError:
+            collided = Ticket.objects.filter(ticket_id=ticket_id).exists()
+            if not collided or attempt == attempts:
+                raise
+            ticket_id = None
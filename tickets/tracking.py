@@ -0,0 +1,75 @@
+# tickets/tracking.py
+"""
+Write-side bookkeeping for ticket changes.
+
+Anything that creates, updates or deletes tickets reports it here, inside
+the same transaction, so derived data (dashboard rollups and cache, staff
+workload counters, search index, ...) stays in step:
+
+    before = tracking.snapshot(ticket)
+    ... change and save the ticket ...
+    tracking.tickets_changed([(before, ticket)])
+"""
+from collections import namedtuple
+
+from . import dashboard, rollups, search, workload
+
+TicketState = namedtuple(
+    'TicketState',
+    ['pk', 'status', 'category_id', 'assigned_to_id', 'created_at', 'resolved_at',
+     'customer_id', 'description'],
+)
+
+
+def snapshot(ticket):
+    return TicketState(
+        pk=ticket.pk,
+        status=ticket.status,
+        category_id=ticket.category_id,
+        assigned_to_id=ticket.current_assigned_to_id,
+        created_at=ticket.created_at,
+        resolved_at=ticket.resolved_at,
+        customer_id=ticket.customer_id,
+        description=ticket.description,
+    )
+
+
+def _counted(state):
+    """The fields the counters and rollups depend on."""
+    return state[:6]
+
+
+def _indexed(state):
+    """The ticket's own fields in its search document."""
+    return state.customer_id, state.description
+
+
+def _record(removed=(), added=()):
+    rollups.record(removed=removed, added=added)
+    workload.record(removed=removed, added=added)
+    dashboard.ticket_data_changed()
+
+
+def tickets_created(tickets):
+    _record(added=[snapshot(t) for t in tickets])
+    search.index_tickets([t.pk for t in tickets])
+
+
+def tickets_changed(changes):
+    """`changes` is an iterable of (state_before, ticket_after) pairs."""
+    changes = [(before, snapshot(ticket)) for before, ticket in changes]
+    counted = [(before, after) for before, after in changes if _counted(before) != _counted(after)]
+    if counted:
+        _record(
+            removed=[before for before, _ in counted],
+            added=[after for _, after in counted],
+        )
+    reindex = [after.pk for before, after in changes if _indexed(before) != _indexed(after)]
+    if reindex:
+        search.index_tickets(reindex)
+
+
+def tickets_deleted(states):
+    states = list(states)
+    _record(removed=states)
+    search.remove_tickets([state.pk for state in states])
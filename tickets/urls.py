@@ -10,10 +10,18 @@ urlpatterns = [
 
     # staff URLs
     path('staff/tickets/', views.staff_ticket_list_view, name='staff_ticket_list'),
+    path('staff/tickets/bulk/', views.staff_bulk_action_view, name='staff_bulk_action'),
+    path('staff/search/', views.staff_search_view, name='staff_search'),
+    path('staff/picker/', views.staff_picker_view, name='staff_picker'),
     path('staff/tickets/<str:ticket_id>/', views.staff_ticket_detail_view, name='staff_ticket_detail'),
+    path('staff/tickets/<str:ticket_id>/history/', views.staff_ticket_history_view, name='staff_ticket_history'),
+
+    # change feed for downstream systems (JSON, long-poll)
+    path('staff/feed/', views.change_feed_view, name='change_feed'),
 
     # leadership dashboard
     path('staff/dashboard/', views.dashboard_view, name='dashboard'),
+    path('staff/dashboard/export.csv', views.dashboard_export_view, name='dashboard_export'),
 
     # customer feedback
     path('feedback/<str:ticket_id>/', views.feedback_view, name='ticket_feedback'),
@@ -1,35 +1,49 @@
 # tickets/utils.py
-from datetime import datetime
-from django.core.mail import send_mail
-from .models import Ticket
+from django.conf import settings
+from django.urls import reverse
+
+from .outbox import enqueue_email
+from .ticket_ids import next_ticket_id
 
 
 def generate_ticket_id():
     """
     Simple ticket format: DISCO-YYYY-XXXXXX
-    Where XXXXXX is a zero-padded sequence.
+    Where XXXXXX is a zero-padded per-year sequence (see tickets.ticket_ids).
     """
-    year = datetime.now().year
-    prefix = f"DISCO-{year}-"
+    return next_ticket_id()
 
-    count = Ticket.objects.filter(ticket_id__startswith=prefix).count() + 1
-    return f"{prefix}{count:06d}"
 
+# The send_* helpers only queue the email in the outbox, inside the caller's
+# transaction; `manage.py deliver_outbox` does the actual sending.
 
-def send_acknowledgement_email(ticket):
+def acknowledgement_email(ticket):
+    """Queue-ready acknowledgement, as accepted by outbox.enqueue_emails."""
     subject = f"Complaint Received - Ticket {ticket.ticket_id}"
+    if ticket.incident_id:
+        follow_up = (
+            "It matches a fault already reported in your area, which our team is "
+            "working on. We will let you know as soon as it is resolved.\n\n"
+        )
+    else:
+        follow_up = "Our team will attend to it and keep you updated.\n\n"
     message = (
         f"Dear {ticket.customer.name},\n\n"
         f"We have received your complaint with Ticket ID: {ticket.ticket_id}.\n"
         f"Category: {ticket.category.name}\n"
         f"Description:\n{ticket.description}\n\n"
-        "Our team will attend to it and keep you updated.\n\n"
+        f"{follow_up}"
         "Regards,\nYour DISCO"
     )
-    send_mail(subject, message, None, [ticket.customer.email])
+    return {'subject': subject, 'body': message, 'to': [ticket.customer.email], 'ticket': ticket}
 
 
-def send_escalation_email(ticket, to_staff):
+def send_acknowledgement_email(ticket):
+    enqueue_email(**acknowledgement_email(ticket))
+
+
+def escalation_email(ticket, to_staff):
+    """Queue-ready escalation notice; `to_staff` needs its user loaded."""
     subject = f"Your Complaint {ticket.ticket_id} has been escalated"
     message = (
         f"Dear {ticket.customer.name},\n\n"
@@ -38,10 +52,15 @@ def send_escalation_email(ticket, to_staff):
         "We will keep you updated on further progress.\n\n"
         "Regards,\nYour DISCO"
     )
-    send_mail(subject, message, None, [ticket.customer.email])
+    return {'subject': subject, 'body': message, 'to': [ticket.customer.email], 'ticket': ticket}
 
 
-def send_resolved_email(ticket):
+def send_escalation_email(ticket, to_staff):
+    enqueue_email(**escalation_email(ticket, to_staff))
+
+
+def resolved_email(ticket):
+    """Queue-ready resolution notice with the feedback link."""
     # Base URL for your app – in dev we use localhost, in prod set e.g. https://complaints.yourdisco.com
     base_url = getattr(settings, "SITE_BASE_URL", "http://127.0.0.1:8000")
 
@@ -55,4 +74,8 @@ def send_resolved_email(ticket):
         f"Please let us know if you are satisfied by clicking this link:\n{feedback_link}\n\n"
         "Regards,\nYour DISCO"
     )
-    send_mail(subject, message, None, [ticket.customer.email])
+    return {'subject': subject, 'body': message, 'to': [ticket.customer.email], 'ticket': ticket}
+
+
+def send_resolved_email(ticket):
+    enqueue_email(**resolved_email(ticket))
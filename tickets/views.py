@@ -1,49 +1,70 @@
 # tickets/views.py
+import hmac
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
-from django.http import HttpResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.contrib import messages
 
-from .forms import ComplaintForm
-from .models import Customer, Ticket, StaffUser, TicketHistory
+from .forms import BulkActionForm, ComplaintForm, TicketStatusForm, EscalationForm, FeedbackForm
+from .models import ArchivedTicket, Ticket, StaffUser, TicketHistory
 from .utils import generate_ticket_id, send_acknowledgement_email
+from .ticket_ids import create_ticket
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect
+from django.urls import reverse
 from django.contrib import messages
 
-from .forms import ComplaintForm, TicketStatusForm, EscalationForm
 from .utils import (
     generate_ticket_id,
     send_acknowledgement_email,
     send_escalation_email,
     send_resolved_email,
 )
-from .forms import ComplaintForm, TicketStatusForm, EscalationForm, FeedbackForm
-from django.db.models import Count, Avg, F, ExpressionWrapper, DurationField
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_POST
+
+from . import (
+    archive, assignment, bulk, customers, dashboard, directory, feed, incidents, routing,
+    search, timeline, tracking, workload,
+)
+from .exports import ticket_csv_rows
+from .pagination import keyset_page
+
+
+async def arender(request, template_name, context=None, status=None):
+    """render() for async views; templates may touch the session and user."""
+    return await sync_to_async(render)(request, template_name, context, status=status)
 
 
-def feedback_view(request, ticket_id):
-    ticket = get_object_or_404(Ticket, ticket_id=ticket_id)
+async def feedback_view(request, ticket_id):
+    # Archived tickets are CLOSED, so they get the not-allowed page.
+    ticket = await archive.afind_ticket(
+        ticket_id,
+        Ticket.objects.select_related('customer'),
+        ArchivedTicket.objects.select_related('customer'),
+    )
 
     # Optionally: only allow feedback if resolved
     if ticket.status != 'RESOLVED':
-        return render(request, "tickets/feedback_not_allowed.html", {"ticket": ticket})
+        return await arender(request, "tickets/feedback_not_allowed.html", {"ticket": ticket})
 
     if request.method == "POST":
         form = FeedbackForm(request.POST)
         if form.is_valid():
-            rating = int(form.cleaned_data['rating'])
-            comment = form.cleaned_data['comment']
+            ticket.satisfaction_rating = int(form.cleaned_data['rating'])
+            ticket.satisfaction_comment = form.cleaned_data['comment']
+            await ticket.asave(update_fields=['satisfaction_rating', 'satisfaction_comment', 'updated_at'])
 
-            ticket.satisfaction_rating = rating
-            ticket.satisfaction_comment = comment
-            ticket.save()
-
-            return render(request, "tickets/feedback_thanks.html", {"ticket": ticket})
+            return await arender(request, "tickets/feedback_thanks.html", {"ticket": ticket})
     else:
         form = FeedbackForm()
 
-    return render(request, "tickets/feedback_form.html", {
+    return await arender(request, "tickets/feedback_form.html", {
         "ticket": ticket,
         "form": form,
     })
@@ -52,88 +73,176 @@ def home_view(request):
     return render(request, "tickets/home.html")
 
 
-def create_complaint_view(request):
-    if request.method == "POST":
-        form = ComplaintForm(request.POST)
-        if form.is_valid():
-            name = form.cleaned_data['name']
-            email = form.cleaned_data['email']
-            phone = form.cleaned_data['phone']
-            account_number = form.cleaned_data['account_number']
-            meter_number = form.cleaned_data['meter_number']
-            category = form.cleaned_data['category']
-            description = form.cleaned_data['description']
-
-
-            # 1. Get or create customer
-            customer, created = Customer.objects.get_or_create(
-                email=email,
-                defaults={
-                    'name': name,
-                    'phone': phone,
-                    'account_number': account_number,
-                    'meter_number': meter_number,
-                }
-            )
-            # Optional: update phone/account if changed
-            if not created:
-                customer.name = name
-                customer.phone = phone
-                if account_number:
-                    customer.account_number = account_number
-                if meter_number:
-                    customer.meter_number = meter_number
-                customer.save()
-
-            # 2. Decide first assigned staff (for now: pick any staff with matching role)
-            # Later we can make this smarter (by region, load, etc.)
-            first_staff = StaffUser.objects.filter(
-                role=category.default_first_level_role
-            ).first()
-
-            # 3. Create ticket
-            ticket = Ticket.objects.create(
-                ticket_id=generate_ticket_id(),
+def submit_complaint(data):
+    """Create the ticket for a validated ComplaintForm. Returns the ticket."""
+    # 1. Match the customer on any known email, account, meter or
+    # phone number, or create them.
+    customer, created = customers.resolve_customer(
+        data['name'], data['email'], data['phone'],
+        account_number=data['account_number'],
+        meter_number=data['meter_number'],
+        region=data['region'].strip(),
+    )
+    if not created:
+        search.index_customer(customer)
+
+    # 2. Create ticket. The ID is allocated before the transaction so
+    # the sequence row is only locked for one statement.
+    ticket_id = generate_ticket_id()
+    with transaction.atomic():
+        # During an outage storm the complaint joins the open incident for
+        # its area: no assignment and no history row, only the lead ticket
+        # sits in a staff queue (tickets.incidents).
+        incident = incidents.match(data['category'], customer.region, data.get('feeder'))
+        if incident:
+            ticket = create_ticket(
+                ticket_id=ticket_id,
                 customer=customer,
-                category=category,
-                description=description,
-                current_assigned_to=first_staff,
+                category=data['category'],
+                description=data['description'],
+                current_assigned_to=None,
                 status='NEW',
+                incident=incident,
             )
+            incidents.attach(incident, ticket)
+            tracking.tickets_created([ticket])
+            send_acknowledgement_email(ticket)
+            return ticket
+
+        # 3. Decide first assigned staff by role, region and current load.
+        first_staff = assignment.assign(data['category'], region=customer.region)
+
+        ticket = create_ticket(
+            ticket_id=ticket_id,
+            customer=customer,
+            category=data['category'],
+            description=data['description'],
+            current_assigned_to=first_staff,
+            status='NEW',
+        )
 
-# Log initial assignment in history
-            TicketHistory.objects.create(
-                ticket=ticket,
-                from_staff=None,
-                to_staff=first_staff,
-                action_type='ASSIGNED',
-                comment="Ticket created and assigned automatically"
-            )
+        # Log initial assignment in history
+        TicketHistory.objects.create(
+            ticket=ticket,
+            from_staff=None,
+            to_staff=first_staff,
+            action_type='ASSIGNED',
+            comment="Ticket created and assigned automatically"
+        )
+        tracking.tickets_created([ticket])
+        incidents.start(ticket, customer.region, data.get('feeder'))
 
-            # TODO: send acknowledgement email here
-            send_acknowledgement_email(ticket)
+        # Queued in the outbox and committed with the ticket; delivery
+        # happens in deliver_outbox, never in the request.
+        send_acknowledgement_email(ticket)
+    return ticket
+
+
+async def create_complaint_view(request):
+    # Async so that, under ASGI, waiting on the database does not hold a
+    # worker thread. Validation reads the reference-data cache and the
+    # write needs a transaction, so both run via sync_to_async.
+    if request.method == "POST":
+        form = ComplaintForm(request.POST)
+        if await sync_to_async(form.is_valid)():
+            ticket = await sync_to_async(submit_complaint)(form.cleaned_data)
 
             # 4. Show success page/message
-            return render(request, "tickets/complaint_success.html", {
+            return await arender(request, "tickets/complaint_success.html", {
                 "ticket": ticket
             })
     else:
         form = ComplaintForm()
 
-    return render(request, "tickets/complaint_form.html", {"form": form})
+    return await arender(request, "tickets/complaint_form.html", {"form": form})
 
 @login_required
 def staff_ticket_list_view(request):
     # Get StaffUser linked to current logged-in user
     staff_user = get_object_or_404(StaffUser, user=request.user)
-    tickets = Ticket.objects.filter(current_assigned_to=staff_user).order_by('-created_at')
-    return render(request, "tickets/staff_ticket_list.html", {"tickets": tickets})
+
+    status_filter = request.GET.get('status', '')
+    if status_filter not in dict(Ticket.STATUS_CHOICES):
+        status_filter = ''
+
+    # Served by the (current_assigned_to, [status,] created_at) indexes; the
+    # customer and category columns come back in the same query.
+    tickets = Ticket.objects.filter(current_assigned_to=staff_user).select_related(
+        'customer', 'category'
+    )
+    if status_filter:
+        tickets = tickets.filter(status=status_filter)
+
+    page, next_cursor = keyset_page(
+        tickets, request.GET.get('cursor'), settings.STAFF_QUEUE_PAGE_SIZE
+    )
+    return render(request, "tickets/staff_ticket_list.html", {
+        "tickets": page,
+        # Open tickets per status from the maintained counters, not a COUNT.
+        "queue_counts": workload.staff_counts(staff_user),
+        "next_cursor": next_cursor,
+        "is_first_page": not request.GET.get('cursor'),
+        "status_filter": status_filter,
+        "status_choices": Ticket.STATUS_CHOICES,
+        "bulk_form": BulkActionForm(initial={'queue_status': status_filter}),
+    })
+
+
+@login_required
+@require_POST
+def staff_bulk_action_view(request):
+    """Change status, reassign or escalate the selected tickets (or a whole queue) at once."""
+    staff_user = get_object_or_404(StaffUser, user=request.user)
+    form = BulkActionForm(request.POST)
+    queue_url = reverse('staff_ticket_list')
+    if not form.is_valid():
+        for errors in form.errors.values():
+            messages.error(request, " ".join(errors))
+        return redirect(queue_url)
+
+    data = form.cleaned_data
+    if data['whole_queue']:
+        tickets = Ticket.objects.filter(current_assigned_to=staff_user)
+        if data['queue_status']:
+            tickets = tickets.filter(status=data['queue_status'])
+    else:
+        # Like the ticket page, any staff member may act on any ticket.
+        tickets = Ticket.objects.filter(pk__in=data['tickets'])
+
+    changed = bulk.apply(
+        tickets, data['action'], staff_user,
+        status=data['status'], to_staff=data['to_staff'], comment=data['comment'],
+    )
+    messages.success(request, f"{changed} ticket{'s' if changed != 1 else ''} updated.")
+    if data['queue_status']:
+        queue_url += f"?status={data['queue_status']}"
+    return redirect(queue_url)
 
 
 @login_required
 def staff_ticket_detail_view(request, ticket_id):
     staff_user = get_object_or_404(StaffUser, user=request.user)
-    ticket = get_object_or_404(Ticket, ticket_id=ticket_id)
+    related = ('customer', 'category', 'current_assigned_to__user')
+    ticket = archive.find_ticket(
+        ticket_id,
+        timeline.with_validators(
+            Ticket.objects.select_related(*related, 'led_incident', 'incident__lead_ticket')
+        ),
+        timeline.with_validators(ArchivedTicket.objects.select_related(*related)),
+    )
+    # Reports keep arriving on an incident without touching its lead ticket,
+    # and customer, category and assignee edits don't touch the ticket either.
+    incident = incidents.led_by(ticket)
+    validators = (
+        incident.report_count if incident else 0,
+        timeline.rows_tag(ticket.customer, ticket.category),
+        str(ticket.current_assigned_to),
+        timeline.csrf_tag(request),
+    )
+    not_modified = timeline.not_modified(request, ticket, *validators)
+    if not_modified:
+        return not_modified
+    archived = archive.is_archived(ticket)
 
     # Optional: ensure users only see tickets in their org rules.
     # For now we allow any logged-in staff to view any ticket.
@@ -141,7 +250,8 @@ def staff_ticket_detail_view(request, ticket_id):
     status_form = TicketStatusForm()
     escalation_form = EscalationForm()
 
-    if request.method == "POST":
+    # Archived tickets are read-only.
+    if request.method == "POST" and not archived:
         if 'update_status' in request.POST:
             status_form = TicketStatusForm(request.POST)
             if status_form.is_valid():
@@ -149,26 +259,34 @@ def staff_ticket_detail_view(request, ticket_id):
                 comment = status_form.cleaned_data['comment']
 
                 old_status = ticket.status
+                before = tracking.snapshot(ticket)
                 ticket.status = new_status
 
                 # If resolved, set resolved_at
-                from django.utils import timezone
                 if new_status == 'RESOLVED' and ticket.resolved_at is None:
                     ticket.resolved_at = timezone.now()
-                ticket.save()
 
-                # Log history
-                TicketHistory.objects.create(
-                    ticket=ticket,
-                    from_staff=staff_user,
-                    to_staff=staff_user,
-                    action_type='STATUS_CHANGED' if new_status != 'RESOLVED' else 'RESOLVED',
-                    comment=comment or f"Status changed from {old_status} to {new_status}"
-                )
+                with transaction.atomic():
+                    ticket.save()
+                    tracking.tickets_changed([(before, ticket)])
+
+                    # Log history
+                    TicketHistory.objects.create(
+                        ticket=ticket,
+                        from_staff=staff_user,
+                        to_staff=staff_user,
+                        action_type='STATUS_CHANGED' if new_status != 'RESOLVED' else 'RESOLVED',
+                        comment=comment or f"Status changed from {old_status} to {new_status}"
+                    )
+
+                    # If resolved, queue email to customer
+                    if new_status == 'RESOLVED':
+                        send_resolved_email(ticket)
 
-                # If resolved, send email to customer
-                if new_status == 'RESOLVED':
-                    send_resolved_email(ticket)
+                    # Resolving an incident's lead ticket resolves its reports.
+                    if (incident and incident.resolved_at is None
+                            and new_status in incidents.FINISHING_STATUSES):
+                        incidents.resolve(incident, new_status, staff=staff_user, comment=comment)
 
                 messages.success(request, "Ticket status updated successfully.")
                 return redirect('staff_ticket_detail', ticket_id=ticket.ticket_id)
@@ -180,92 +298,211 @@ def staff_ticket_detail_view(request, ticket_id):
                 comment = escalation_form.cleaned_data['comment']
 
                 # Update ticket assignment and status
+                before = tracking.snapshot(ticket)
                 ticket.current_assigned_to = to_staff
                 ticket.status = 'ESCALATED'
-                ticket.save()
 
-                # Log history
-                TicketHistory.objects.create(
-                    ticket=ticket,
-                    from_staff=staff_user,
-                    to_staff=to_staff,
-                    action_type='ESCALATED',
-                    comment=comment
-                )
+                with transaction.atomic():
+                    ticket.save()
+                    tracking.tickets_changed([(before, ticket)])
 
-                # Email customer about escalation
-                send_escalation_email(ticket, to_staff)
+                    # Log history
+                    TicketHistory.objects.create(
+                        ticket=ticket,
+                        from_staff=staff_user,
+                        to_staff=to_staff,
+                        action_type='ESCALATED',
+                        comment=comment
+                    )
+
+                    # Queue email to customer about escalation
+                    send_escalation_email(ticket, to_staff)
 
                 messages.success(request, f"Ticket escalated to {to_staff}.")
                 return redirect('staff_ticket_detail', ticket_id=ticket.ticket_id)
 
-    history = ticket.history.order_by('-created_at')
+    # Newest entries only; older ones are paged in from staff_ticket_history.
+    history, next_before = timeline.history_page(ticket)
 
     context = {
         "ticket": ticket,
         "history": history,
+        "next_before": next_before,
+        "archived": archived,
+        "incident": incident,
         "status_form": status_form,
         "escalation_form": escalation_form,
     }
-    return render(request, "tickets/staff_ticket_detail.html", context)
+    response = render(request, "tickets/staff_ticket_detail.html", context)
+    return timeline.set_validators(request, response, ticket, *validators)
+
 
 @login_required
-def dashboard_view(request):
-    if not request.user.is_staff and not request.user.is_superuser:
-        return render(request, "tickets/not_authorized.html", status=403)
+def staff_ticket_history_view(request, ticket_id):
+    """HTML fragment with the history entries older than ?before=<id>."""
+    get_object_or_404(StaffUser, user=request.user)
+    ticket = archive.find_ticket(
+        ticket_id,
+        timeline.with_validators(Ticket.objects.all()),
+        timeline.with_validators(ArchivedTicket.objects.all()),
+    )
+    try:
+        before = int(request.GET.get('before', 0)) or None
+    except ValueError:
+        before = None
+
+    not_modified = timeline.not_modified(request, ticket, before)
+    if not_modified:
+        return not_modified
+
+    history, next_before = timeline.history_page(ticket, before)
+    response = render(request, "tickets/ticket_history_entries.html", {
+        "ticket": ticket,
+        "history": history,
+        "next_before": next_before,
+    })
+    return timeline.set_validators(request, response, ticket, before)
+
+def parse_date_param(value):
+    """YYYY-MM-DD query parameter as a date, or None if missing/invalid."""
+    try:
+        return parse_date(value) if value else None
+    except ValueError:
+        return None
 
-    # Filters from GET params
-    status_filter = request.GET.get('status')
-    start_date = request.GET.get('start_date')  # expected format: YYYY-MM-DD
-    end_date = request.GET.get('end_date')
 
+def filtered_tickets(status=None, start=None, end=None):
+    """Tickets matching the dashboard's status and creation-date filters."""
     tickets_qs = Ticket.objects.all()
 
-    if status_filter:
-        tickets_qs = tickets_qs.filter(status=status_filter)
+    if status:
+        tickets_qs = tickets_qs.filter(status=status)
 
-    if start_date:
-        tickets_qs = tickets_qs.filter(created_at__date__gte=start_date)
-    if end_date:
-        tickets_qs = tickets_qs.filter(created_at__date__lte=end_date)
+    if start:
+        tickets_qs = tickets_qs.filter(created_at__date__gte=start)
+    if end:
+        tickets_qs = tickets_qs.filter(created_at__date__lte=end)
+    return tickets_qs
 
-    total_tickets = tickets_qs.count()
 
-    status_counts = tickets_qs.values('status').annotate(count=Count('id'))
-    category_counts = tickets_qs.values('category__name').annotate(count=Count('id'))
+@login_required
+def staff_search_view(request):
+    """Ranked full-text search over tickets and their customers."""
+    get_object_or_404(StaffUser, user=request.user)
+
+    query = request.GET.get('q', '').strip()
+    page_size = settings.SEARCH_PAGE_SIZE
+    try:
+        page = max(1, min(int(request.GET.get('page', 1)), settings.SEARCH_MAX_PAGES))
+    except ValueError:
+        page = 1
+
+    results = []
+    if query:
+        # One extra row tells us whether there is a next page without a COUNT.
+        results = search.search(query, limit=page_size + 1, offset=(page - 1) * page_size)
+
+    return render(request, "tickets/staff_search.html", {
+        "query": query,
+        "results": results[:page_size],
+        "page": page,
+        "has_next": len(results) > page_size and page < settings.SEARCH_MAX_PAGES,
+    })
 
-    resolved_tickets = tickets_qs.filter(resolved_at__isnull=False)
-    avg_resolution = None
-    if resolved_tickets.exists():
-        durations = resolved_tickets.annotate(
-            duration=ExpressionWrapper(
-                F('resolved_at') - F('created_at'),
-                output_field=DurationField()
-            )
-        ).aggregate(Avg('duration'))
-        avg_resolution = durations['duration__avg']
-
-    now = timezone.now()
-    open_tickets = tickets_qs.filter(
-        status__in=['NEW', 'IN_PROGRESS', 'ESCALATED']
-    ).annotate(
-        age=ExpressionWrapper(
-            now - F('created_at'),
-            output_field=DurationField()
-        )
-    ).order_by('-age')[:50]
 
-    context = {
-        "total_tickets": total_tickets,
-        "status_counts": status_counts,
-        "category_counts": category_counts,
-        "avg_resolution": avg_resolution,
-        "open_tickets": open_tickets,
+@login_required
+def staff_picker_view(request):
+    """JSON typeahead over the staff directory for the escalation picker."""
+    get_object_or_404(StaffUser, user=request.user)
+
+    results = directory.search(request.GET.get('q', ''), request.GET.get('limit'))
+    response = JsonResponse({"results": results})
+    patch_cache_control(response, private=True, max_age=settings.STAFF_PICKER_CACHE_SECONDS)
+    return response
+
+
+def _feed_token_ok(request):
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return False
+    token = header[len('Bearer '):].strip()
+    return any(hmac.compare_digest(token, allowed) for allowed in settings.CHANGE_FEED_TOKENS)
+
+
+async def change_feed_view(request):
+    """
+    JSON page of ticket history events after ?cursor=<id>, for downstream
+    systems. With ?wait=<seconds> an empty page is held open (long poll)
+    until events arrive or the wait runs out. Async, so a waiting client
+    costs no worker thread under ASGI.
+    """
+    if not _feed_token_ok(request):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({"error": "authentication required"}, status=401)
+        if not user.is_staff and not user.is_superuser:
+            return JsonResponse({"error": "not authorized"}, status=403)
+
+    try:
+        cursor = max(0, int(request.GET.get('cursor') or 0))
+        wait = float(request.GET.get('wait') or 0)
+    except ValueError:
+        return JsonResponse({"error": "cursor must be an integer and wait a number"}, status=400)
+    wait = max(0.0, min(wait, settings.FEED_MAX_WAIT_SECONDS))
+
+    events, next_cursor, has_more = await feed.wait_for_page(cursor, request.GET.get('limit'), wait)
+    response = JsonResponse({"events": events, "next_cursor": next_cursor, "has_more": has_more})
+    patch_cache_control(response, private=True, no_store=True)
+    return response
+
+
+@login_required
+def dashboard_view(request):
+    if not request.user.is_staff and not request.user.is_superuser:
+        return render(request, "tickets/not_authorized.html", status=403)
+
+    # Filters from GET params
+    status_filter = request.GET.get('status')
+    start_date = request.GET.get('start_date')  # expected format: YYYY-MM-DD
+    end_date = request.GET.get('end_date')
+    start = parse_date_param(start_date)
+    end = parse_date_param(end_date)
+
+    context, outcome = dashboard.cached_context(
+        filtered_tickets(status_filter, start, end), status=status_filter or None, start=start, end=end,
+    )
+    context.update({
         "status_filter": status_filter or "",
         "start_date": start_date or "",
         "end_date": end_date or "",
-    }
-    return render(request, "tickets/dashboard.html", context)
+    })
+    response = render(request, "tickets/dashboard.html", context)
+    response['X-Dashboard-Cache'] = outcome
+    return response
+
+@login_required
+def dashboard_export_view(request):
+    """Stream the dashboard's tickets as CSV, optionally with each ticket's history."""
+    if not request.user.is_staff and not request.user.is_superuser:
+        return render(request, "tickets/not_authorized.html", status=403)
+
+    # Streamed after the view returns, so bind the queryset to the replica now.
+    with routing.reporting():
+        tickets_qs = routing.for_reporting(filtered_tickets(
+            request.GET.get('status'),
+            parse_date_param(request.GET.get('start_date')),
+            parse_date_param(request.GET.get('end_date')),
+        ))
+    include_history = request.GET.get('include_history') == '1'
+
+    response = StreamingHttpResponse(
+        ticket_csv_rows(tickets_qs, include_history=include_history),
+        content_type="text/csv",
+    )
+    filename = f"tickets-{timezone.localdate():%Y%m%d}.csv"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
 
 @login_required
 def post_login_redirect_view(request):
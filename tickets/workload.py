@@ -0,0 +1,132 @@
+# tickets/workload.py
+"""
+Open-ticket counters per staff member and per category, by status.
+
+StaffWorkload and CategoryWorkload hold one row per (staff, status) and
+(category, status) for the open statuses. tickets.tracking moves a
+ticket's contribution on every create, assignment, status change,
+escalation and delete, with F() updates in the same transaction, so a
+workload figure is one indexed read instead of a COUNT over Ticket.
+
+The assignment strategies order staff by the sum of their StaffWorkload
+rows (tickets.assignment.open_tickets), so these are the only open-ticket
+counters. `check()` compares every counter with a fresh count;
+`reconcile()` writes the fresh counts back (`manage.py reconcile_workload`).
+"""
+from collections import Counter, defaultdict, namedtuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import CategoryWorkload, StaffWorkload, Ticket
+
+Drift = namedtuple('Drift', ['counter', 'key', 'status', 'recorded', 'actual'])
+
+
+def _deltas(removed, added):
+    staff, categories = Counter(), Counter()
+    for sign, states in ((-1, removed), (1, added)):
+        for state in states:
+            if state.status not in Ticket.OPEN_STATUSES:
+                continue
+            categories[(state.category_id or 0, state.status)] += sign
+            if state.assigned_to_id:
+                staff[(state.assigned_to_id, state.status)] += sign
+    return staff, categories
+
+
+def _bump(model, lookup, delta):
+    rows = model.objects.filter(**lookup)
+    if rows.update(ticket_count=F('ticket_count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(ticket_count=delta, **lookup)
+    except IntegrityError:
+        # Created concurrently by another request.
+        rows.update(ticket_count=F('ticket_count') + delta)
+
+
+def record(removed=(), added=()):
+    """Move the open-ticket contributions of TicketStates, one statement per changed counter."""
+    staff, categories = _deltas(removed, added)
+    for (staff_id, status), delta in staff.items():
+        if delta:
+            _bump(StaffWorkload, {'staff_id': staff_id, 'status': status}, delta)
+    for (category_key, status), delta in categories.items():
+        if delta:
+            _bump(CategoryWorkload, {'category_key': category_key, 'status': status}, delta)
+
+
+def staff_counts(staff):
+    """{status: open tickets} for one staff member, every open status present."""
+    counts = dict.fromkeys(Ticket.OPEN_STATUSES, 0)
+    counts.update(StaffWorkload.objects.filter(staff=staff).values_list('status', 'ticket_count'))
+    return counts
+
+
+def category_counts():
+    """{category_key: {status: open tickets}} for categories with open tickets."""
+    counts = defaultdict(lambda: dict.fromkeys(Ticket.OPEN_STATUSES, 0))
+    for key, status, count in CategoryWorkload.objects.filter(ticket_count__gt=0).values_list(
+        'category_key', 'status', 'ticket_count'
+    ):
+        counts[key][status] = count
+    return dict(counts)
+
+
+def actual():
+    """Fresh (staff, category) counts from Ticket, keyed like the counters."""
+    open_tickets = Ticket.objects.filter(status__in=Ticket.OPEN_STATUSES).order_by()
+    staff = {
+        (row['current_assigned_to'], row['status']): row['n']
+        for row in open_tickets.filter(current_assigned_to__isnull=False)
+        .values('current_assigned_to', 'status').annotate(n=Count('id'))
+    }
+    categories = {
+        (row['category'] or 0, row['status']): row['n']
+        for row in open_tickets.values('category', 'status').annotate(n=Count('id'))
+    }
+    return staff, categories
+
+
+def check(fresh=None):
+    """Every counter that differs from a fresh count (`actual()`), as Drift rows."""
+    staff, categories = fresh or actual()
+    drift = []
+    comparisons = (
+        ('staff', staff, StaffWorkload.objects.values_list('staff_id', 'status', 'ticket_count')),
+        ('category', categories,
+         CategoryWorkload.objects.values_list('category_key', 'status', 'ticket_count')),
+    )
+    for name, fresh, recorded_rows in comparisons:
+        recorded = {(key, status): count for key, status, count in recorded_rows}
+        for key, status in sorted(set(fresh) | set(recorded), key=str):
+            if fresh.get((key, status), 0) != recorded.get((key, status), 0):
+                drift.append(Drift(name, key, status, recorded.get((key, status), 0),
+                                   fresh.get((key, status), 0)))
+    return drift
+
+
+def reconcile():
+    """Replace every counter with a fresh count. Returns the drift that was repaired."""
+    with transaction.atomic():
+        # Writers bump these rows with F() updates in their transaction, so
+        # locking them holds those off between count and write.
+        list(StaffWorkload.objects.select_for_update().values_list('pk', flat=True))
+        list(CategoryWorkload.objects.select_for_update().values_list('pk', flat=True))
+        staff, categories = fresh = actual()
+        drift = check(fresh)
+        if not drift:
+            return drift
+        StaffWorkload.objects.all().delete()
+        StaffWorkload.objects.bulk_create([
+            StaffWorkload(staff_id=staff_id, status=status, ticket_count=count)
+            for (staff_id, status), count in staff.items()
+        ])
+        CategoryWorkload.objects.all().delete()
+        CategoryWorkload.objects.bulk_create([
+            CategoryWorkload(category_key=key, status=status, ticket_count=count)
+            for (key, status), count in categories.items()
+        ])
+    return drift